@@ -0,0 +1,137 @@
+import random
+from dataclasses import dataclass, field
+from typing import Iterator, List
+
+TOPICS = {
+    "health": ["doctor", "appointment", "blood", "pressure", "sleep", "vitamin", "exercise", "diet",
+               "prescription", "clinic", "therapy", "allergy", "insurance", "checkup"],
+    "finance": ["budget", "invoice", "tax", "refund", "salary", "mortgage", "savings", "stock",
+                "portfolio", "expense", "receipt", "loan", "interest", "pension"],
+    "work": ["meeting", "deadline", "roadmap", "sprint", "review", "manager", "launch", "customer",
+             "contract", "quarter", "hiring", "milestone", "standup", "retrospective"],
+    "research": ["transformer", "attention", "causality", "dataset", "benchmark", "gradient",
+                 "embedding", "retrieval", "ablation", "baseline", "hypothesis", "experiment"],
+    "travel": ["flight", "hotel", "passport", "itinerary", "visa", "luggage", "train", "museum",
+               "booking", "airport", "reservation", "beach", "mountain", "tour"],
+    "personal": ["birthday", "family", "garden", "recipe", "movie", "book", "friend", "gift",
+                 "wedding", "concert", "holiday", "dinner", "photo", "journal"],
+}
+
+FILLER = ["the", "a", "and", "of", "to", "in", "for", "with", "on", "about", "from", "next",
+          "last", "week", "notes", "plan", "follow", "up", "check", "update"]
+
+
+@dataclass
+class SyntheticDoc:
+    """A generated document ready to be saved through the memory pipeline."""
+    name: str
+    kind: str  # "note", "txt" or "pdf"
+    category: str
+    title: str
+    tags: List[str]
+    text: str
+    data: bytes = field(default=b"", repr=False)
+
+
+def _sentence(rng: random.Random, topic_words: List[str]) -> str:
+    words = [rng.choice(topic_words) if rng.random() < 0.4 else rng.choice(FILLER)
+             for _ in range(rng.randint(8, 18))]
+    return " ".join(words).capitalize() + "."
+
+
+def _text(rng: random.Random, topic_words: List[str], min_words: int, max_words: int) -> str:
+    target = rng.randint(min_words, max_words)
+    sentences = []
+    count = 0
+    while count < target:
+        sentence = _sentence(rng, topic_words)
+        sentences.append(sentence)
+        count += len(sentence.split())
+    return " ".join(sentences)
+
+
+def render_pdf(text: str) -> bytes:
+    """Render text into a simple multi-page PDF.
+
+    Args:
+        text: Text content
+
+    Returns:
+        PDF file bytes
+    """
+    import pymupdf
+
+    doc = pymupdf.open()
+    words = text.split()
+    for start in range(0, max(len(words), 1), 400):
+        page = doc.new_page()
+        page.insert_textbox(pymupdf.Rect(50, 50, 550, 800), " ".join(words[start:start + 400]), fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+def generate_corpus(num_docs: int, seed: int = 42, note_ratio: float = 0.3, pdf_ratio: float = 0.1,
+                    min_words: int = 80, max_words: int = 900, start: int = 0) -> Iterator[SyntheticDoc]:
+    """Generate a deterministic stream of synthetic notes, text files and PDFs.
+
+    Args:
+        num_docs: Number of documents to generate
+        seed: Random seed so runs are reproducible
+        note_ratio: Fraction of manual notes
+        pdf_ratio: Fraction of PDF files
+        min_words: Minimum words per document
+        max_words: Maximum words per document
+        start: Index of the first document, used to continue a stream
+
+    Yields:
+        SyntheticDoc objects
+    """
+    for i in range(start, start + num_docs):
+        rng = random.Random(seed * 1_000_003 + i)
+        category = rng.choice(list(TOPICS))
+        topic_words = TOPICS[category]
+        text = _text(rng, topic_words, min_words, max_words)
+        tags = rng.sample(topic_words, 2)
+        title = f"{category.capitalize()} {' '.join(tags)} #{i}"
+
+        roll = rng.random()
+        if roll < note_ratio:
+            yield SyntheticDoc(f"note_{i}.txt", "note", category, title, tags, text, text.encode("utf-8"))
+        elif roll < note_ratio + pdf_ratio:
+            yield SyntheticDoc(f"doc_{i}.pdf", "pdf", category, title, tags, text, render_pdf(text))
+        else:
+            yield SyntheticDoc(f"doc_{i}.txt", "txt", category, title, tags, text, text.encode("utf-8"))
+
+
+def generate_queries(num_queries: int, seed: int = 7) -> List[str]:
+    """Generate natural-language style queries over the synthetic topics.
+
+    Args:
+        num_queries: Number of queries
+        seed: Random seed
+
+    Returns:
+        List of query strings
+    """
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(num_queries):
+        topic_words = TOPICS[rng.choice(list(TOPICS))]
+        queries.append(f"What did I note about {' and '.join(rng.sample(topic_words, 3))}?")
+    return queries
+
+
+def generate_users(num_users: int, docs_per_user: int, seed: int = 42) -> Iterator[tuple]:
+    """Generate several synthetic users, each with their own corpus.
+
+    Args:
+        num_users: Number of users
+        docs_per_user: Documents per user
+        seed: Base random seed
+
+    Yields:
+        Tuples of (user_id, iterator of SyntheticDoc)
+    """
+    for u in range(num_users):
+        yield f"bench_user_{u}", generate_corpus(docs_per_user, seed=seed + u)
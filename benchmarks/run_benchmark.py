@@ -0,0 +1,340 @@
+"""End-to-end benchmark for the MemoBrain ingest and retrieval pipeline.
+
+Generates a synthetic user, ingests it through the real core pipeline against a
+local stub embedding/chat server, and reports throughput, latency and storage
+figures at each corpus size checkpoint.
+
+Example:
+    python -m benchmarks.run_benchmark --sizes 100 1000 --latency-ms 20 --output bench.json
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.corpus import generate_corpus, generate_queries
+from benchmarks.stub_server import start_stub_server
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+RESULT_SCHEMA_VERSION = 1
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Return the peak resident set size of this process in MB, if available."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def file_size(path: Path) -> int:
+    return path.stat().st_size if path.exists() else 0
+
+
+class BenchUpload(io.BytesIO):
+    """In-memory stand-in for a Streamlit UploadedFile."""
+
+    def __init__(self, data: bytes, name: str):
+        super().__init__(data)
+        self.name = name
+
+
+def ingest_docs(docs: list, user_id: str, scratch_dir: Path):
+    """Run synthetic documents through the ingest pipeline.
+
+    Notes go through save_note one by one; files are saved with
+    save_uploaded_file, or save_uploaded_files when more than one is given.
+    """
+    from core.memory_handler import save_note, save_uploaded_file, save_uploaded_files
+    from core.preprocess import extract_text
+
+    uploads = []
+    for doc in docs:
+        if doc.kind == "note":
+            save_note(doc.text, doc.title, list(doc.tags), doc.category, "", user_id)
+            continue
+
+        scratch_path = scratch_dir / doc.name
+        scratch_path.write_bytes(doc.data)
+        extracted_text = extract_text(scratch_path, doc.kind)
+        scratch_path.unlink()
+        uploads.append({
+            "file": BenchUpload(doc.data, doc.name),
+            "title": doc.title,
+            "tags": list(doc.tags),
+            "category": doc.category,
+            "notes": "",
+            "extracted_text": extracted_text
+        })
+
+    if len(uploads) == 1:
+        u = uploads[0]
+        save_uploaded_file(u["file"], u["title"], u["tags"], u["category"], u["notes"],
+                           user_id, u["extracted_text"])
+    elif uploads:
+        save_uploaded_files(uploads, user_id)
+
+
+def measure_parse_time(path: Path, repeats: int = 3) -> float:
+    """Median wall time in seconds to read and parse a JSON file."""
+    if not path.exists():
+        return 0.0
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        with open(path, "r") as f:
+            json.load(f)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def measure_queries(queries: List[str], user_id: str, top_k: int) -> Dict[str, float]:
+    """Time retrieve_relevant_chunks over a list of queries."""
+    from core.retriever import retrieve_relevant_chunks
+
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        retrieve_relevant_chunks(query, user_id=user_id, top_k=top_k)
+        timings.append(time.perf_counter() - start)
+    return {
+        "query_count": len(timings),
+        "query_p50_ms": percentile(timings, 50) * 1000,
+        "query_p99_ms": percentile(timings, 99) * 1000,
+        "query_mean_ms": (statistics.mean(timings) * 1000) if timings else 0.0
+    }
+
+
+def _chunk_identity(chunk: dict) -> tuple:
+    return (chunk.get("memory_id"), chunk.get("text"))
+
+
+def measure_retrieval_modes(queries: List[str], user_id: str, top_k: int,
+                            doc_k: Optional[int] = None, search_dim: Optional[int] = None) -> Dict[str, Any]:
+    """Compare flat, hierarchical and compact search latency, and their recall.
+
+    Queries are embedded once up front so only the searches are timed.
+    Recall@k is the share of the flat top-k chunks that a mode also returns.
+    """
+    from core.retriever import embed_queries, search_chunks
+
+    options: Dict[str, Any] = {"doc_k": doc_k} if doc_k else {}
+    if search_dim:
+        options["search_dim"] = search_dim
+    vectors = embed_queries(queries)
+    timings: Dict[str, List[float]] = {"flat": [], "hierarchical": [], "compact": []}
+    # The first search per mode loads the index, metadata and document index
+    warmup = {}
+    for mode in timings:
+        start = time.perf_counter()
+        search_chunks(vectors[:1], user_id, top_k, mode=mode, **options)
+        warmup[mode] = time.perf_counter() - start
+
+    recalls: Dict[str, List[float]] = {"hierarchical": [], "compact": []}
+    for vector in vectors:
+        results = {}
+        for mode, mode_timings in timings.items():
+            start = time.perf_counter()
+            results[mode] = search_chunks(vector[None, :], user_id, top_k, mode=mode, **options)[0]
+            mode_timings.append(time.perf_counter() - start)
+        expected = {_chunk_identity(r) for r in results["flat"]}
+        if expected:
+            for mode, mode_recalls in recalls.items():
+                found = {_chunk_identity(r) for r in results[mode]}
+                mode_recalls.append(len(expected & found) / len(expected))
+
+    report: Dict[str, Any] = {}
+    for mode, mode_timings in timings.items():
+        report[f"{mode}_warmup_ms"] = warmup[mode] * 1000
+        report[f"{mode}_p50_ms"] = percentile(mode_timings, 50) * 1000
+        report[f"{mode}_p99_ms"] = percentile(mode_timings, 99) * 1000
+    for mode, mode_recalls in recalls.items():
+        report[f"{mode}_recall_at_k"] = statistics.mean(mode_recalls) if mode_recalls else None
+    return report
+
+
+def run_benchmark(sizes: List[int], user_id: str = "bench_user", num_queries: int = 50,
+                  top_k: int = 5, seed: int = 42, batch_size: int = 1, doc_k: Optional[int] = None,
+                  search_dim: Optional[int] = None) -> Dict[str, Any]:
+    """Ingest a growing synthetic corpus and measure each size checkpoint.
+
+    Must be called with the working directory set to a scratch location, since
+    user data lives under the relative data/users path, and with
+    OPENAI_BASE_URL pointing at a running stub server (see main), whose
+    latency applies to every request.
+
+    Args:
+        sizes: Corpus sizes (documents) at which to take measurements
+        user_id: Synthetic user identifier
+        num_queries: Queries timed at each checkpoint
+        top_k: Results per query
+        seed: Corpus random seed
+        batch_size: Files saved per save_uploaded_files call (1 = one call per file)
+        doc_k: Documents searched by hierarchical retrieval (default: the retriever's)
+        search_dim: Dimensions of the compact index (default: the retriever's)
+
+    Returns:
+        Machine-readable results dictionary
+    """
+    from core.user_paths import (
+        get_compact_index_path, get_faiss_index_path, get_metadata_path, get_memory_index_path
+    )
+
+    scratch_dir = Path("bench_scratch")
+    scratch_dir.mkdir(exist_ok=True)
+    queries = generate_queries(num_queries, seed=seed)
+
+    checkpoints = []
+    ingested = 0
+    kinds: Dict[str, int] = {}
+    for size in sorted(set(sizes)):
+        batch = size - ingested
+        start = time.perf_counter()
+        pending = []
+        for doc in generate_corpus(batch, seed=seed, start=ingested):
+            pending.append(doc)
+            kinds[doc.kind] = kinds.get(doc.kind, 0) + 1
+            if len(pending) >= batch_size:
+                ingest_docs(pending, user_id, scratch_dir)
+                pending = []
+        if pending:
+            ingest_docs(pending, user_id, scratch_dir)
+        ingest_seconds = time.perf_counter() - start
+        ingested = size
+
+        result = {
+            "documents": size,
+            "documents_by_kind": dict(kinds),
+            "ingest_batch_docs": batch,
+            "ingest_batch_seconds": ingest_seconds,
+            "ingest_docs_per_sec": batch / ingest_seconds if ingest_seconds > 0 else 0.0,
+            "memory_index_parse_seconds": measure_parse_time(get_memory_index_path(user_id)),
+            "memory_index_bytes": file_size(get_memory_index_path(user_id)),
+            "metadata_bytes": file_size(get_metadata_path(user_id)),
+            "faiss_index_bytes": file_size(get_faiss_index_path(user_id)),
+        }
+        result.update(measure_queries(queries, user_id, top_k))
+        result["retrieval_modes"] = measure_retrieval_modes(queries, user_id, top_k, doc_k, search_dim)
+        result["compact_index_bytes"] = file_size(get_compact_index_path(user_id))
+        result["peak_rss_mb"] = peak_rss_mb()
+        checkpoints.append(result)
+        logger.info(
+            f"{size} docs: {result['ingest_docs_per_sec']:.1f} docs/s, "
+            f"query p50 {result['query_p50_ms']:.1f} ms, p99 {result['query_p99_ms']:.1f} ms, "
+            f"search flat/hierarchical/compact p50 {result['retrieval_modes']['flat_p50_ms']:.2f}/"
+            f"{result['retrieval_modes']['hierarchical_p50_ms']:.2f}/"
+            f"{result['retrieval_modes']['compact_p50_ms']:.2f} ms"
+        )
+
+    return {"checkpoints": checkpoints}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="MemoBrain end-to-end benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Corpus sizes at which to measure (cumulative)")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Artificial latency of the stub embedding/chat server")
+    parser.add_argument("--queries", type=int, default=50, help="Queries timed per checkpoint")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Documents ingested per batch (uses save_uploaded_files when > 1)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--doc-k", type=int, default=None,
+                        help="Documents searched by hierarchical retrieval (default: MEMOBRAIN_HIER_DOC_K)")
+    parser.add_argument("--search-dim", type=int, default=None,
+                        help="Dimensions of the compact index (default: MEMOBRAIN_SEARCH_DIM)")
+    parser.add_argument("--workdir", type=str, default=None,
+                        help="Scratch directory for user data (default: a fresh temp dir)")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Write JSON results here instead of stdout")
+    parser.add_argument("--metrics-file", type=str, default=None,
+                        help="Also write per-stage histograms in Prometheus text format")
+    args = parser.parse_args(argv)
+
+    output_path = Path(args.output).resolve() if args.output else None
+    metrics_path = Path(args.metrics_file).resolve() if args.metrics_file else None
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="memobrain_bench_")).resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    server = start_stub_server(latency_ms=args.latency_ms)
+    # The core modules build their OpenAI clients at import, so point them at
+    # the stub before anything from core is imported.
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    os.environ["OPENAI_API_KEY"] = "stub-key"
+    if metrics_path:
+        os.environ["MEMOBRAIN_METRICS"] = "1"
+    os.chdir(workdir)
+
+    started = time.time()
+    try:
+        results = run_benchmark(args.sizes, num_queries=args.queries,
+                                top_k=args.top_k, seed=args.seed, batch_size=args.batch_size,
+                                doc_k=args.doc_k, search_dim=args.search_dim)
+    finally:
+        server.shutdown()
+
+    report = {
+        "schema_version": RESULT_SCHEMA_VERSION,
+        "benchmark": "end_to_end",
+        "started_at": datetime.fromtimestamp(started).isoformat(),
+        "duration_seconds": time.time() - started,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "config": {
+            "sizes": sorted(set(args.sizes)),
+            "latency_ms": args.latency_ms,
+            "queries": args.queries,
+            "top_k": args.top_k,
+            "batch_size": args.batch_size,
+            "doc_k": args.doc_k,
+            "search_dim": args.search_dim,
+            "seed": args.seed,
+            "workdir": str(workdir)
+        },
+        **results
+    }
+
+    if metrics_path:
+        from core.metrics import write_prometheus
+        write_prometheus(metrics_path)
+        logger.info(f"Stage metrics written to {metrics_path}")
+
+    payload = json.dumps(report, indent=2)
+    if output_path:
+        output_path.write_text(payload)
+        logger.info(f"Results written to {output_path}")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
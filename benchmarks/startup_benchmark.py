@@ -0,0 +1,156 @@
+"""Cold start benchmark for the Streamlit app.
+
+Starts a fresh Python process per run, executes ui/app.py with Streamlit's
+AppTest harness and reports the time from process start to the rendered
+login screen, the heavy libraries loaded by then, and optionally the time
+to render a page after logging in.
+
+Example:
+    python -m benchmarks.startup_benchmark --runs 5 --page "📊 Dashboard" --output startup.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+APP_PATH = REPO_ROOT / "ui" / "app.py"
+# Libraries that are slow to import and not needed for the login screen
+# (Streamlit itself imports plotly)
+HEAVY_MODULES = [
+    "openai", "faiss", "plotly", "pandas", "networkx", "pymupdf", "pymupdf4llm",
+    "pytesseract", "pdf2image", "streamlit_option_menu"
+]
+
+
+def _child(page: Optional[str]) -> None:
+    """Render the app in this (fresh) process and print the timings as JSON."""
+    started = time.time()
+    from streamlit.testing.v1 import AppTest
+    harness_loaded = time.time()
+
+    at = AppTest.from_file(str(APP_PATH), default_timeout=300)
+    at.run()
+    login_rendered = time.time()
+    result: Dict[str, Any] = {
+        "child_started": started,
+        "harness_import_ms": (harness_loaded - started) * 1000,
+        "login_rendered": login_rendered,
+        "login_run_ms": (login_rendered - harness_loaded) * 1000,
+        "heavy_modules_at_login": [m for m in HEAVY_MODULES if m in sys.modules],
+        "errors": [e.message for e in at.exception]
+    }
+    if page:
+        at.session_state["user_id"] = "startup_bench_user"
+        at.session_state["current_page"] = page
+        start = time.time()
+        at.run()
+        result["page_run_ms"] = (time.time() - start) * 1000
+        result["heavy_modules_after_page"] = [m for m in HEAVY_MODULES if m in sys.modules]
+        result["errors"] += [e.message for e in at.exception]
+    print(json.dumps(result))
+
+
+def measure_startup(runs: int, workdir: Path, page: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Run the app cold in runs fresh processes.
+
+    Returns:
+        Per-run timings; time_to_login_ms includes interpreter start-up
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH")]))
+    env.setdefault("OPENAI_API_KEY", "startup-bench-key")
+    # The app loads its images relative to the working directory
+    screenshots = workdir / "screenshots"
+    if not screenshots.exists():
+        screenshots.symlink_to(REPO_ROOT / "screenshots", target_is_directory=True)
+    command = [sys.executable, "-m", "benchmarks.startup_benchmark", "--child"]
+    if page:
+        command += ["--page", page]
+
+    results = []
+    for run in range(runs):
+        start = time.time()
+        completed = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Startup run {run} failed:\n{completed.stderr}")
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        result["time_to_login_ms"] = (result.pop("login_rendered") - start) * 1000
+        result["interpreter_start_ms"] = (result.pop("child_started") - start) * 1000
+        if result["errors"]:
+            logger.warning(f"Run {run} raised: {result['errors']}")
+        logger.info(f"Run {run}: login screen after {result['time_to_login_ms']:.0f} ms")
+        results.append(result)
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="MemoBrain cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes to start")
+    parser.add_argument("--page", type=str, default=None,
+                        help='Also render this page after login, e.g. "📊 Dashboard"')
+    parser.add_argument("--workdir", type=str, default=None,
+                        help="Scratch directory for user data (default: a fresh temp dir)")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Write JSON results here instead of stdout")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args.page)
+        return
+
+    from benchmarks.run_benchmark import RESULT_SCHEMA_VERSION, percentile
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="memobrain_startup_")).resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+    started = time.time()
+    runs = measure_startup(args.runs, workdir, args.page)
+
+    summary: Dict[str, Any] = {}
+    for key in ("time_to_login_ms", "interpreter_start_ms", "harness_import_ms", "login_run_ms", "page_run_ms"):
+        values = [r[key] for r in runs if key in r]
+        if values:
+            summary[f"{key}_p50"] = percentile(values, 50)
+            summary[f"{key}_min"] = min(values)
+    report = {
+        "schema_version": RESULT_SCHEMA_VERSION,
+        "benchmark": "startup",
+        "started_at": datetime.fromtimestamp(started).isoformat(),
+        "duration_seconds": time.time() - started,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count()
+        },
+        "config": {
+            "runs": args.runs,
+            "page": args.page,
+            "workdir": str(workdir)
+        },
+        "summary": summary,
+        "runs": runs
+    }
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload)
+        logger.info(f"Results written to {args.output}")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
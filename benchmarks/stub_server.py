@@ -0,0 +1,172 @@
+import argparse
+import hashlib
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+import numpy as np
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIM = 1536
+# Width of the first band of dimensions in stub vectors, and the weight of
+# each band relative to the one before it
+PREFIX_DIM = 64
+BAND_DECAY = 0.7
+
+
+def _prefix_bounds(dim: int) -> List[int]:
+    """Upper bounds of the nested prefixes a stub vector is built from: 64, 128, 256, ..., dim."""
+    bounds = []
+    bound = PREFIX_DIM
+    while bound < dim:
+        bounds.append(bound)
+        bound *= 2
+    bounds.append(dim)
+    return bounds
+
+
+def fake_embedding(text: str, dim: int = EMBEDDING_DIM) -> List[float]:
+    """Build a deterministic bag-of-words embedding for a text.
+
+    Each word is hashed into one signed bucket per band of dimensions
+    ([0, 64), [64, 128), [128, 256), ...), with less weight in later bands.
+    Texts sharing vocabulary end up close together, and like the
+    text-embedding-3 models the leading dimensions carry most of the
+    signal, so a truncated vector still ranks texts much like the full one
+    and compact search recall can be compared.
+
+    Args:
+        text: Text to embed
+        dim: Embedding dimension
+
+    Returns:
+        Unit-length embedding as a list of floats
+    """
+    vec = np.zeros(dim, dtype=np.float32)
+    bounds = _prefix_bounds(dim)
+    for word in text.lower().split():
+        lower = 0
+        for band, upper in enumerate(bounds):
+            digest = hashlib.md5(f"{band}:{word}".encode("utf-8")).digest()
+            bucket = lower + int.from_bytes(digest[:4], "little") % (upper - lower)
+            weight = BAND_DECAY ** band
+            vec[bucket] += weight if digest[4] & 1 else -weight
+            lower = upper
+    norm = np.linalg.norm(vec)
+    if norm > 0:
+        vec /= norm
+    return vec.tolist()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible handler for embeddings and chat completions."""
+
+    latency: float = 0.0
+    dim: int = EMBEDDING_DIM
+    # Keep connections open between requests, like the real API; without
+    # Nagle's algorithm so the separately written headers and body are not
+    # held back on a kept-alive connection
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+    def _send_json(self, payload: dict, status: int = 200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if self.path.endswith("/embeddings"):
+            inputs = request.get("input", [])
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            dim = request.get("dimensions") or self.dim
+            self._send_json({
+                "object": "list",
+                "model": request.get("model", "stub-embedding"),
+                "data": [
+                    {"object": "embedding", "index": i, "embedding": fake_embedding(text, dim)}
+                    for i, text in enumerate(inputs)
+                ],
+                "usage": {"prompt_tokens": 0, "total_tokens": 0}
+            })
+        elif self.path.endswith("/chat/completions"):
+            messages = request.get("messages", [])
+            prompt = messages[-1]["content"] if messages else ""
+            words = prompt.split()
+            content = "\n".join(f"- {' '.join(words[i:i + 12])}" for i in range(0, min(len(words), 72), 12))
+            self._send_json({
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "stub-chat"),
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content or "- empty"}
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+            })
+        else:
+            self._send_json({"error": {"message": f"Unknown path {self.path}"}}, status=404)
+
+
+def start_stub_server(port: int = 0, latency_ms: float = 0.0,
+                      dim: int = EMBEDDING_DIM) -> ThreadingHTTPServer:
+    """Start the stub server in a background thread.
+
+    Args:
+        port: Port to bind on localhost, 0 picks a free port
+        latency_ms: Artificial latency added to every request
+        dim: Default embedding dimension
+
+    Returns:
+        Running server; its base URL is http://127.0.0.1:<port>/v1
+    """
+    handler = type("ConfiguredStubHandler", (StubHandler,), {
+        "latency": latency_ms / 1000.0,
+        "dim": dim
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logger.info(f"Stub LLM server listening on http://127.0.0.1:{server.server_port}/v1")
+    return server
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Stub OpenAI-compatible embedding/chat server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--dim", type=int, default=EMBEDDING_DIM)
+    args = parser.parse_args(argv)
+
+    server = start_stub_server(args.port, args.latency_ms, args.dim)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
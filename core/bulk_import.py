@@ -0,0 +1,227 @@
+"""Headless bulk importer for onboarding large document collections.
+
+Walks a directory tree, extracts text in a process pool, embeds in large
+batches and commits in groups through the normal memory pipeline. A
+checkpoint manifest lets an interrupted import resume where it stopped.
+
+Example:
+    python -m core.bulk_import ~/Documents/archive --user alice --workers 8
+"""
+import os
+import json
+import time
+import argparse
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from core.preprocess import extract_text
+from core.memory_handler import get_file_hash, save_uploaded_files
+from core.commit_queue import atomic_write_json, load_memory_index
+from core.user_paths import get_import_manifest_path
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {"pdf", "png", "jpg", "jpeg", "txt"}
+
+
+class LocalFile:
+    """File on disk exposing the parts of the Streamlit UploadedFile API the pipeline uses."""
+
+    def __init__(self, path: Path, data: bytes):
+        self.path = path
+        self.name = path.name
+        self._data = data
+
+    def getvalue(self) -> bytes:
+        return self._data
+
+
+def iter_source_files(source_dir: Path) -> Iterator[Path]:
+    """Yield supported files under a directory in a stable order.
+
+    Args:
+        source_dir: Root directory
+
+    Yields:
+        File paths
+    """
+    for root, dirs, files in os.walk(source_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if Path(name).suffix.lower().strip(".") in SUPPORTED_EXTENSIONS:
+                yield Path(root) / name
+
+
+def file_signature(path: Path) -> Dict[str, float]:
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def load_manifest(manifest_path: Path) -> Dict[str, dict]:
+    """Load the import checkpoint manifest.
+
+    Args:
+        manifest_path: Manifest location
+
+    Returns:
+        Mapping of absolute source path to its import record
+    """
+    if not manifest_path.exists():
+        return {}
+    try:
+        with open(manifest_path, "r") as f:
+            return json.load(f).get("files", {})
+    except json.JSONDecodeError:
+        logger.warning(f"Corrupted import manifest {manifest_path}, starting fresh")
+        return {}
+
+
+def save_manifest(manifest_path: Path, files: Dict[str, dict]) -> None:
+    atomic_write_json(manifest_path, {"updated_at": datetime.now().isoformat(), "files": files})
+
+
+def is_imported(path: Path, manifest: Dict[str, dict], memory_ids: Set[str]) -> bool:
+    record = manifest.get(str(path))
+    # A record whose memory is gone (deleted, or the user's memory wiped) is
+    # stale; the file then goes through the content hash check again
+    if not record or record.get("memory_id") not in memory_ids:
+        return False
+    signature = file_signature(path)
+    return record.get("size") == signature["size"] and record.get("mtime") == signature["mtime"]
+
+
+def _extract(path_str: str) -> Tuple[str, str]:
+    """Worker: extract text from one file.
+
+    Args:
+        path_str: File path
+
+    Returns:
+        Tuple of (file path, extracted text)
+    """
+    path = Path(path_str)
+    return path_str, extract_text(path, path.suffix)
+
+
+def _chunks(items: List[Path], size: int) -> Iterator[List[Path]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def bulk_import(source_dir: Path, user_id: str, workers: Optional[int] = None, group_size: int = 100,
+                category: str = "other", tags: Optional[List[str]] = None, summarize: bool = False,
+                manifest_path: Optional[Path] = None) -> Dict[str, float]:
+    """Import every supported file under a directory into a user's memory.
+
+    Args:
+        source_dir: Directory to import
+        user_id: User identifier
+        workers: Extraction processes (default: CPU count)
+        group_size: Files embedded and committed together
+        category: Category assigned to imported files
+        tags: Tags assigned to imported files
+        summarize: Generate auto summaries (one LLM call per long document)
+        manifest_path: Checkpoint manifest location (default: per-user import_manifest.json)
+
+    Returns:
+        Summary statistics for the run
+    """
+    source_dir = Path(source_dir).resolve()
+    manifest_path = Path(manifest_path) if manifest_path else get_import_manifest_path(user_id)
+    manifest = load_manifest(manifest_path)
+
+    # Files committed before an interrupted run could write its checkpoint
+    # are recognised by content hash and not imported twice
+    existing = {(m.get("source_hash"), m.get("filename")): m.get("id") for m in load_memory_index(user_id)}
+
+    all_files = list(iter_source_files(source_dir))
+    memory_ids = set(existing.values())
+    todo = [p for p in all_files if not is_imported(p, manifest, memory_ids)]
+    logger.info(f"Found {len(all_files)} files, {len(all_files) - len(todo)} already imported, {len(todo)} to go")
+
+    imported = skipped = 0
+    start = time.perf_counter()
+    groups = list(_chunks(todo, group_size))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Extract the next group while the current one is embedded and committed
+        pending = pool.map(_extract, [str(p) for p in groups[0]]) if groups else None
+        for i, group in enumerate(groups):
+            extracted = list(pending)
+            pending = pool.map(_extract, [str(p) for p in groups[i + 1]]) if i + 1 < len(groups) else None
+
+            batch = []
+            for path_str, text in extracted:
+                path = Path(path_str)
+                data = path.read_bytes()
+                key = (get_file_hash(data), path.name)
+                if key in existing:
+                    manifest[path_str] = {**file_signature(path), "memory_id": existing[key],
+                                          "imported_at": datetime.now().isoformat()}
+                    skipped += 1
+                    continue
+                batch.append({
+                    "file": LocalFile(path, data),
+                    "title": path.stem,
+                    "tags": list(tags or []),
+                    "category": category,
+                    "notes": f"Imported from {path.relative_to(source_dir)}",
+                    "extracted_text": text
+                })
+
+            if batch:
+                results = save_uploaded_files(batch, user_id, summarize=summarize)
+                for item, (entry, _) in zip(batch, results):
+                    manifest[str(item["file"].path)] = {**file_signature(item["file"].path), "memory_id": entry["id"],
+                                                        "imported_at": datetime.now().isoformat()}
+                    existing[(entry["source_hash"], entry["filename"])] = entry["id"]
+                imported += len(batch)
+
+            save_manifest(manifest_path, manifest)
+            elapsed = time.perf_counter() - start
+            done = imported + skipped
+            logger.info(f"Committed group {i + 1}/{len(groups)}: {done}/{len(todo)} files, "
+                        f"{done / elapsed:.1f} files/sec")
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "files_found": len(all_files),
+        "files_imported": imported,
+        "files_skipped": len(all_files) - len(todo) + skipped,
+        "seconds": elapsed,
+        "files_per_sec": imported / elapsed if elapsed > 0 else 0.0
+    }
+    logger.info(f"Imported {imported} files in {elapsed:.1f}s ({stats['files_per_sec']:.1f} files/sec)")
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Bulk import a directory tree into MemoBrain")
+    parser.add_argument("source_dir", type=Path, help="Directory to import")
+    parser.add_argument("--user", required=True, help="User ID to import into")
+    parser.add_argument("--workers", type=int, default=None, help="Extraction processes (default: CPU count)")
+    parser.add_argument("--group-size", type=int, default=100, help="Files embedded and committed together")
+    parser.add_argument("--category", default="other", help="Category for imported files")
+    parser.add_argument("--tags", default="", help="Comma-separated tags for imported files")
+    parser.add_argument("--summarize", action="store_true", help="Generate auto summaries for long documents")
+    parser.add_argument("--manifest", type=Path, default=None, help="Checkpoint manifest path")
+    args = parser.parse_args(argv)
+
+    if not args.source_dir.is_dir():
+        parser.error(f"{args.source_dir} is not a directory")
+
+    stats = bulk_import(
+        args.source_dir, args.user, workers=args.workers, group_size=args.group_size,
+        category=args.category, tags=[t.strip() for t in args.tags.split(",") if t.strip()],
+        summarize=args.summarize, manifest_path=args.manifest
+    )
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,473 @@
+import os
+import json
+import tempfile
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import faiss
+
+from core.user_paths import (
+    get_faiss_index_path,
+    get_metadata_path,
+    get_memory_index_path,
+    get_stats_path,
+    get_write_lock_path
+)
+from core.metrics import span, increment
+from core.memory_stats import StatsUpdater, compute_stats, contribution, read_stats_file, source_key
+from core.time_index import build_time_index, created_epoch, read_time_index_file, write_time_index
+from core.graph_index import build_graph_index, read_graph_index_file, write_graph_index
+from core.edge_store import append_edge_records, ensure_edge_log
+from core.doc_index import update_doc_index
+from core.compact_index import update_compact_index
+from core.embedding_config import EmbeddingMismatchError, read_index_embedding, write_index_embedding
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to in-process locking only
+    fcntl = None
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class MemoryMutation:
+    """A pending change to a user's FAISS index, chunk metadata, memory index and edges.
+
+    Mutations are queued per user and applied by whichever writer holds the
+    user's lock, so concurrent writers share one read-modify-write cycle.
+    """
+
+    def __init__(self,
+                 vectors: Optional[List[np.ndarray]] = None,
+                 metadatas: Optional[List[Dict[str, Any]]] = None,
+                 new_entries: Optional[List[Dict[str, Any]]] = None,
+                 updates: Optional[Dict[str, Callable[[Dict[str, Any]], None]]] = None,
+                 remove: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                 new_edges: Optional[List[Dict[str, Any]]] = None,
+                 removed_edge_ids: Optional[List[str]] = None,
+                 embedding: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            vectors: Embedding vectors to append to the FAISS index
+            metadatas: One chunk metadata dict per vector
+            new_entries: Memory entries to append to memory_index.json
+            updates: Memory id -> function mutating that entry in place
+            remove: Predicate selecting memory entries to delete
+            new_edges: Relationship edges to add to the edge store
+            removed_edge_ids: IDs of relationship edges to delete
+            embedding: Model tag ({"model", "dim"}) the vectors were embedded with
+        """
+        if len(vectors or []) != len(metadatas or []):
+            raise ValueError("vectors and metadatas must have the same length")
+        self.vectors = vectors or []
+        self.metadatas = metadatas or []
+        self.new_entries = new_entries or []
+        self.updates = updates or {}
+        self.remove = remove
+        self.new_edges = new_edges or []
+        self.removed_edge_ids = removed_edge_ids or []
+        self.embedding = embedding
+
+        # Filled in when the mutation is committed
+        self.assigned_ids: List[int] = []
+        self.updated_ids: List[str] = []
+        self.removed_entries: List[Dict[str, Any]] = []
+        self.error: Optional[BaseException] = None
+        self._done = threading.Event()
+
+    @property
+    def touches_vectors(self) -> bool:
+        return bool(self.vectors)
+
+    @property
+    def touches_memory_index(self) -> bool:
+        return bool(self.new_entries or self.updates or self.remove)
+
+    @property
+    def touches_edges(self) -> bool:
+        # New memories can carry relationships; removing memories removes their edges
+        return bool(self.new_edges or self.removed_edge_ids or self.removed_entries
+                    or any(entry.get("relationships") for entry in self.new_entries))
+
+
+class _UserQueue:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending: List[MemoryMutation] = []
+        self.leader_active = False
+
+
+_queues: Dict[str, _UserQueue] = {}
+_queues_lock = threading.Lock()
+
+
+def _get_queue(user_id: str) -> _UserQueue:
+    with _queues_lock:
+        if user_id not in _queues:
+            _queues[user_id] = _UserQueue()
+        return _queues[user_id]
+
+
+@contextmanager
+def user_write_lock(user_id: str):
+    """Hold the user's cross-process writer lock.
+
+    Only writers take this lock. Files are always replaced atomically, so
+    readers see either the old or the new version and never wait.
+
+    Args:
+        user_id: User identifier
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(get_write_lock_path(user_id), "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def atomic_write_json(path: Path, data: Any, indent: Optional[int] = None) -> None:
+    """Write JSON next to the target and atomically replace it.
+
+    The temp file lives in the same directory so os.replace never crosses
+    filesystems. Output is compact by default: serializing in one
+    json.dumps call without indentation uses the C encoder, which is several
+    times faster than json.dump for the multi-megabyte stores.
+
+    Args:
+        path: Destination file
+        data: JSON-serializable value
+        indent: Indentation passed to json.dumps
+    """
+    path = Path(path)
+    with tempfile.NamedTemporaryFile(mode='w', dir=path.parent, prefix=f".{path.name}.",
+                                     suffix=".tmp", delete=False) as tmp_file:
+        tmp_file.write(json.dumps(data, indent=indent))
+        tmp_path = tmp_file.name
+    os.replace(tmp_path, path)
+
+
+def atomic_write_index(index: faiss.Index, path: Path) -> None:
+    """Write a FAISS index next to the target and atomically replace it.
+
+    Args:
+        index: FAISS index
+        path: Destination file
+    """
+    temp_index_path = f"{path}.temp"
+    faiss.write_index(index, temp_index_path)
+    os.replace(temp_index_path, path)
+
+
+def load_memory_index(user_id: str) -> List[Dict[str, Any]]:
+    """Load a user's memory index, setting aside a corrupted file.
+
+    Args:
+        user_id: User identifier
+
+    Returns:
+        List of memory entries
+    """
+    memory_path = get_memory_index_path(user_id)
+    if not memory_path.exists():
+        return []
+    try:
+        with open(memory_path, "r") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        backup_path = memory_path.with_name(f"{memory_path.name}.corrupt-{datetime.now().strftime('%Y%m%d%H%M%S')}")
+        logger.warning(f"Corrupted memory index for user {user_id}, moved to {backup_path}. Creating new index.")
+        os.replace(memory_path, backup_path)
+        return []
+
+
+def _load_chunk_metadata(user_id: str) -> Dict[str, Any]:
+    metadata_path = get_metadata_path(user_id)
+    if not metadata_path.exists():
+        return {}
+    try:
+        with open(metadata_path, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"Error loading metadata, creating new: {str(e)}")
+        return {}
+
+
+def _apply_vectors(user_id: str, batch: List[MemoryMutation]) -> None:
+    index_path = get_faiss_index_path(user_id)
+    metadata_path = get_metadata_path(user_id)
+
+    index = faiss.read_index(str(index_path)) if index_path.exists() else None
+    index_embedding = read_index_embedding(user_id) if index is not None else None
+    metadata_store = _load_chunk_metadata(user_id)
+    first_id = index.ntotal if index is not None else 0
+
+    for mutation in batch:
+        vectors_array = np.array(mutation.vectors).astype("float32")
+        if index is None:
+            index = faiss.IndexFlatL2(vectors_array.shape[1])
+        # FAISS rows are numbered sequentially, so the next id is ntotal
+        base_id = index.ntotal
+        index.add(vectors_array)
+        mutation.assigned_ids = list(range(base_id, base_id + len(mutation.vectors)))
+        for idx, meta in zip(mutation.assigned_ids, mutation.metadatas):
+            metadata_store[str(idx)] = meta
+
+    atomic_write_index(index, index_path)
+    atomic_write_json(metadata_path, metadata_store)
+    if index_embedding is None:
+        embedding = next((m.embedding for m in batch if m.embedding), None)
+        if embedding:
+            write_index_embedding(user_id, embedding)
+    new_vectors = np.concatenate([np.array(m.vectors, dtype="float32") for m in batch])
+    # Fold the new vectors into the per-document means used by hierarchical retrieval
+    update_doc_index(user_id, first_id, new_vectors, [meta for m in batch for meta in m.metadatas])
+    # and append their truncated copies to the compact index
+    update_compact_index(user_id, first_id, new_vectors)
+
+
+def _apply_memory_index(user_id: str, batch: List[MemoryMutation]) -> None:
+    with span("memory_index_write"):
+        index = load_memory_index(user_id)
+        positions = {entry.get("id"): i for i, entry in enumerate(index)}
+        changed = False
+        # Seed a missing edge log from the relationships embedded in the
+        # entries before they change
+        ensure_edge_log(user_id, index)
+
+        # Keep the stats, time and graph index sidecars in step with the changes,
+        # unless they are missing or stale, in which case they are recomputed
+        # after the changes
+        current_source = source_key(user_id)
+        stats = read_stats_file(user_id)
+        updater = StatsUpdater(stats) if stats is not None and stats.get("source") == current_source else None
+        stored_times = read_time_index_file(user_id)
+        time_index = stored_times[0] if stored_times is not None and stored_times[1] == current_source else None
+        stored_graph = read_graph_index_file(user_id)
+        graph = stored_graph[0] if stored_graph is not None and stored_graph[1] == current_source else None
+
+        for mutation in batch:
+            for entry in mutation.new_entries:
+                positions[entry.get("id")] = len(index)
+                index.append(entry)
+                if updater:
+                    updater.add(entry)
+                if time_index is not None:
+                    time_index.add(entry)
+                if graph is not None:
+                    graph.add(entry)
+                changed = True
+            for memory_id, update in mutation.updates.items():
+                pos = positions.get(memory_id)
+                if pos is not None:
+                    before = contribution(index[pos]) if updater else None
+                    before_epoch = created_epoch(index[pos])
+                    update(index[pos])
+                    if updater:
+                        updater.update(before, index[pos])
+                    if time_index is not None:
+                        time_index.update(before_epoch, index[pos])
+                    if graph is not None:
+                        graph.update(index[pos])
+                    mutation.updated_ids.append(memory_id)
+                    changed = True
+            if mutation.remove is not None:
+                kept = []
+                for entry in index:
+                    if mutation.remove(entry):
+                        mutation.removed_entries.append(entry)
+                        if updater:
+                            updater.remove(entry)
+                        if time_index is not None:
+                            time_index.remove(entry.get("id"), created_epoch(entry))
+                        if graph is not None:
+                            graph.remove(entry)
+                    else:
+                        kept.append(entry)
+                if len(kept) != len(index):
+                    index = kept
+                    positions = {entry.get("id"): i for i, entry in enumerate(index)}
+                    changed = True
+
+        if changed:
+            atomic_write_json(get_memory_index_path(user_id), index)
+            if updater:
+                stats = updater.finish(index)
+            else:
+                stats = compute_stats(index, (stats or {}).get("version", 0) + 1)
+            stats["source"] = source_key(user_id)
+            atomic_write_json(get_stats_path(user_id), stats)
+            write_time_index(user_id, time_index if time_index is not None else build_time_index(index))
+            if graph is None:
+                graph = build_graph_index(index, (stored_graph[0].version if stored_graph else 0) + 1)
+            write_graph_index(user_id, graph)
+
+
+def _apply_edges(user_id: str, batch: List[MemoryMutation]) -> None:
+    records = []
+    for mutation in batch:
+        for entry in mutation.new_entries:
+            records.extend({"op": "add", "edge": dict(rel, source_id=rel.get("source_id", entry.get("id")))}
+                           for rel in entry.get("relationships") or [])
+        records.extend({"op": "add", "edge": edge} for edge in mutation.new_edges)
+        records.extend({"op": "remove", "id": edge_id} for edge_id in mutation.removed_edge_ids)
+        records.extend({"op": "remove_node", "memory_id": entry.get("id")} for entry in mutation.removed_entries)
+    append_edge_records(user_id, records)
+
+
+def _reject_mismatched(user_id: str, batch: List[MemoryMutation]) -> List[MemoryMutation]:
+    """Fail mutations whose vectors were embedded with another model than the index.
+
+    Vectors of different models must not share an index; a mismatch means
+    the index was re-embedded after the vectors were computed.
+    """
+    index_embedding = read_index_embedding(user_id)
+    if index_embedding is None:
+        return batch
+    kept = []
+    for mutation in batch:
+        if mutation.touches_vectors and mutation.embedding and mutation.embedding != index_embedding:
+            mutation.error = EmbeddingMismatchError(
+                f"Vectors embedded with {mutation.embedding} but the index uses {index_embedding}"
+            )
+        elif mutation.touches_vectors and not mutation.embedding and len(mutation.vectors[0]) != index_embedding["dim"]:
+            # Untagged vectors can only be checked by size; adding them would
+            # fail the whole batch
+            mutation.error = EmbeddingMismatchError(
+                f"Vectors have {len(mutation.vectors[0])} dimensions but the index uses {index_embedding}"
+            )
+        else:
+            kept.append(mutation)
+    return kept
+
+
+def _apply_batch(user_id: str, batch: List[MemoryMutation]) -> None:
+    with user_write_lock(user_id):
+        batch = _reject_mismatched(user_id, batch)
+        vector_batch = [m for m in batch if m.touches_vectors]
+        if vector_batch:
+            _apply_vectors(user_id, vector_batch)
+        index_batch = [m for m in batch if m.touches_memory_index]
+        if index_batch:
+            _apply_memory_index(user_id, index_batch)
+        edge_batch = [m for m in batch if m.touches_edges]
+        if edge_batch:
+            _apply_edges(user_id, edge_batch)
+    increment("commits_total")
+    increment("committed_mutations_total", len(batch))
+
+
+def _lead(user_id: str, queue: _UserQueue) -> None:
+    while True:
+        with queue.lock:
+            batch = queue.pending
+            queue.pending = []
+            if not batch:
+                queue.leader_active = False
+                return
+        try:
+            _apply_batch(user_id, batch)
+        except Exception as e:
+            logger.error(f"Error committing {len(batch)} change(s) for user {user_id}: {str(e)}")
+            for mutation in batch:
+                mutation.error = e
+        finally:
+            for mutation in batch:
+                mutation._done.set()
+
+
+def commit(user_id: str, mutation: MemoryMutation) -> MemoryMutation:
+    """Queue a mutation and block until it is durably written.
+
+    The first writer to arrive becomes the leader and commits everything
+    queued for the user in one write of each file; writers arriving in the
+    meantime are folded into the leader's next batch.
+
+    Args:
+        user_id: User identifier
+        mutation: Change to apply
+
+    Returns:
+        The mutation, with assigned_ids / updated_ids / removed_entries filled in
+
+    Raises:
+        Exception: Whatever the underlying write raised
+    """
+    queue = _get_queue(user_id)
+    with queue.lock:
+        queue.pending.append(mutation)
+        lead = not queue.leader_active
+        if lead:
+            queue.leader_active = True
+    if lead:
+        _lead(user_id, queue)
+    mutation._done.wait()
+    if mutation.error is not None:
+        raise mutation.error
+    return mutation
+
+
+def append_vectors(user_id: str, vectors: List[np.ndarray], metadatas: List[Dict[str, Any]],
+                   embedding: Optional[Dict[str, Any]] = None) -> List[int]:
+    """Append vectors and their chunk metadata to the user's FAISS store.
+
+    Args:
+        user_id: User identifier
+        vectors: Embedding vectors
+        metadatas: Chunk metadata, one per vector
+        embedding: Model tag the vectors were embedded with
+
+    Returns:
+        FAISS ids assigned to the vectors
+
+    Raises:
+        EmbeddingMismatchError: If the index uses another model
+    """
+    return commit(user_id, MemoryMutation(vectors=vectors, metadatas=metadatas, embedding=embedding)).assigned_ids
+
+
+def append_memory_entries(user_id: str, entries: List[Dict[str, Any]]) -> None:
+    """Append entries to the user's memory index.
+
+    Args:
+        user_id: User identifier
+        entries: Memory entries
+    """
+    commit(user_id, MemoryMutation(new_entries=entries))
+
+
+def update_memory_entry(user_id: str, memory_id: str, update: Callable[[Dict[str, Any]], None]) -> bool:
+    """Apply an in-place update to one memory entry.
+
+    Args:
+        user_id: User identifier
+        memory_id: ID of the entry to update
+        update: Function mutating the entry dict
+
+    Returns:
+        True if the entry was found and updated
+    """
+    return bool(commit(user_id, MemoryMutation(updates={memory_id: update})).updated_ids)
+
+
+def remove_memory_entries(user_id: str, predicate: Callable[[Dict[str, Any]], bool]) -> List[Dict[str, Any]]:
+    """Delete memory entries matching a predicate.
+
+    Args:
+        user_id: User identifier
+        predicate: Returns True for entries to delete
+
+    Returns:
+        The removed entries
+    """
+    return commit(user_id, MemoryMutation(remove=predicate)).removed_entries
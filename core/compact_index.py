@@ -0,0 +1,125 @@
+"""Reduced-dimension copy of a user's FAISS index for fast first-pass search.
+
+text-embedding-3 vectors are trained so that their leading dimensions,
+renormalized, are themselves a usable embedding (this is what the API's
+dimensions parameter returns). The compact index stores the first
+SEARCH_DIM dimensions of every vector in index_compact.faiss, row for row
+with index.faiss, so a search scans SEARCH_DIM-wide vectors and only the
+top candidates are re-ranked with their full vectors, read from the
+memory-mapped full index.
+
+Like the document index, it is appended to by the commit path, caught up
+from the full index by readers and removed when rows are renumbered.
+"""
+import os
+import logging
+from typing import Any, Dict, Optional
+
+import numpy as np
+import faiss
+
+from core.user_paths import get_compact_index_path, get_faiss_index_path
+from core.index_store import load_index, same_rows
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Dimensions of the compact index and the number of candidates per result
+# that are re-ranked with full vectors
+SEARCH_DIM = int(os.getenv("MEMOBRAIN_SEARCH_DIM", "256"))
+RERANK_FACTOR = int(os.getenv("MEMOBRAIN_RERANK_FACTOR", "4"))
+# Rows reconstructed from the full index per step when (re)building
+RECONSTRUCT_BATCH_SIZE = 4096
+
+
+def supports_truncation(embedding: Optional[Dict[str, Any]]) -> bool:
+    """Whether vectors of a model tag keep their meaning when truncated."""
+    return bool(embedding) and embedding["model"].startswith("text-embedding-3")
+
+
+def truncate(vectors: np.ndarray, dim: int) -> np.ndarray:
+    """Leading dim dimensions of each vector, renormalized to unit length."""
+    vectors = np.ascontiguousarray(np.asarray(vectors, dtype=np.float32)[:, :dim])
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def _catch_up(compact: faiss.Index, index: faiss.Index) -> None:
+    for start in range(compact.ntotal, index.ntotal, RECONSTRUCT_BATCH_SIZE):
+        stop = min(start + RECONSTRUCT_BATCH_SIZE, index.ntotal)
+        compact.add(truncate(index.reconstruct_n(start, stop - start), compact.d))
+
+
+def update_compact_index(user_id: str, base_id: int, vectors: np.ndarray) -> None:
+    """Append vectors added at full index row base_id to the stored compact index.
+
+    Called by the commit path with the user's writer lock held. A missing or
+    out-of-step compact index is left alone and rebuilt by the next reader.
+    """
+    from core.commit_queue import atomic_write_index
+    path = get_compact_index_path(user_id)
+    if not path.exists():
+        return
+    compact = faiss.read_index(str(path))
+    if compact.ntotal != base_id:
+        return
+    compact.add(truncate(vectors, compact.d))
+    atomic_write_index(compact, path)
+
+
+def remove_compact_index(user_id: str) -> None:
+    """Drop a user's compact index, e.g. after the full index rows were renumbered."""
+    path = get_compact_index_path(user_id)
+    if path.exists():
+        path.unlink()
+
+
+def load_compact_index(user_id: str, index: faiss.Index, dim: int = SEARCH_DIM) -> faiss.Index:
+    """Return a user's compact index, covering at least the rows of a loaded full index.
+
+    Memory-mapped and cached like the full index. Built, or caught up on
+    rows committed since it was stored, from the given full index without
+    holding the user's writer lock; the lock is only taken to store the
+    result, and only if the full index file still holds the rows it was
+    built from. Otherwise the in-memory copy is returned, which matches the
+    given index. It may cover rows committed after the given full index
+    was loaded.
+
+    Args:
+        user_id: User identifier
+        index: The user's full FAISS index
+        dim: Dimensions to keep
+
+    Returns:
+        Read-only compact FAISS index
+    """
+    path = get_compact_index_path(user_id)
+    compact = None
+    if path.exists():
+        compact = load_index(path)
+        if compact.d == dim and compact.ntotal >= index.ntotal:
+            return compact
+        compact = faiss.read_index(str(path)) if compact.d == dim else None
+    if compact is None:
+        compact = faiss.IndexFlatL2(dim)
+    rows = compact.ntotal
+    _catch_up(compact, index)
+
+    from core.commit_queue import atomic_write_index, user_write_lock
+    with user_write_lock(user_id):
+        faiss_path = get_faiss_index_path(user_id)
+        unchanged = faiss_path.exists() and same_rows(index, load_index(faiss_path), compact.ntotal)
+        stored = load_index(path) if unchanged and path.exists() else None
+        # Not stored if the commit path got further meanwhile
+        if unchanged and (stored is None or stored.d != dim or stored.ntotal < compact.ntotal):
+            logger.info(f"Indexed {dim}-dimension vectors of FAISS rows {rows}-{compact.ntotal} for user {user_id}")
+            atomic_write_index(compact, path)
+    if not unchanged:
+        # The full index was replaced after it was read, so the stored rows
+        # may belong to the new one: use the given index alone
+        if rows:
+            compact = faiss.IndexFlatL2(dim)
+            _catch_up(compact, index)
+        return compact
+    return load_index(path)
@@ -9,18 +9,33 @@ def delete_user_memory(user_id: str):
         print(f"User '{user_id}' not found.")
         return
 
-    # Delete FAISS index, metadata, and memory index.json
+    # Delete FAISS index, metadata, memory index.json, its sidecars, the edge log and the import checkpoint
     index_path = base_path / "index.faiss"
     metadata_path = base_path / "metadata.json"
     memory_index_path = base_path / "memory_index.json"
+    stats_path = base_path / "memory_stats.json"
+    time_index_path = base_path / "time_index.json"
+    graph_index_path = base_path / "graph_index.json"
+    graph_layout_path = base_path / "graph_layout.json"
+    edge_log_path = base_path / "edges.jsonl"
+    doc_index_path = base_path / "doc_index.npz"
+    index_info_path = base_path / "index_info.json"
+    compact_index_path = base_path / "index_compact.faiss"
+    import_manifest_path = base_path / "import_manifest.json"
 
-    for path in [index_path, metadata_path, memory_index_path]:
+    for path in [index_path, metadata_path, memory_index_path, stats_path, time_index_path,
+                 graph_index_path, graph_layout_path, edge_log_path, doc_index_path, index_info_path,
+                 compact_index_path, import_manifest_path]:
         if path.exists():
             path.unlink()
             print(f"✅ Deleted: {path}")
         else:
             print(f"⚠️ Not found: {path}")
 
+    # Drop an unfinished re-embedding job, thumbnails and cached preview pages
+    for directory in ["reembed", "thumbs", "previews"]:
+        shutil.rmtree(base_path / directory, ignore_errors=True)
+
     # Optionally remove the user directory if it's empty
     try:
         base_path.rmdir()
@@ -0,0 +1,231 @@
+"""Document-level vectors for two-stage (hierarchical) retrieval.
+
+Every document (memory, with its auto summary) is represented by the mean
+of its chunk vectors. Hierarchical retrieval searches these first and then
+runs the exact chunk search only over the chunks of the best documents, so
+its cost grows with the number of documents plus the chunks of a few of
+them instead of with every chunk in the library.
+
+The means are stored next to the FAISS index in doc_index.npz, with the
+document keys and chunk counts. FAISS rows are only ever
+appended, so the commit path folds new vectors into the means and readers
+catch up on rows added since the stored state; rebuild_index, which
+renumbers rows, removes the files so they are rebuilt.
+"""
+import os
+import threading
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import faiss
+
+from core.user_paths import get_doc_index_path, get_faiss_index_path
+from core.index_store import load_index, same_rows
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DOC_INDEX_SCHEMA_VERSION = 1
+# Rows reconstructed from the FAISS index per step when (re)building
+RECONSTRUCT_BATCH_SIZE = 4096
+
+_cache: Dict[str, Tuple[Tuple[int, int], "DocIndex"]] = {}
+_cache_lock = threading.Lock()
+
+
+def document_key(chunk: dict) -> str:
+    # Auto summaries are indexed under "<memory_id>_summary" but belong to
+    # the same document as the chunks they summarize
+    memory_id = str(chunk.get("memory_id") or chunk.get("filename") or "")
+    return memory_id[:-len("_summary")] if memory_id.endswith("_summary") else memory_id
+
+
+class DocIndex:
+    """Mean chunk vector and chunk count of every document, covering FAISS rows [0, rows)."""
+
+    def __init__(self, keys: Optional[List[str]] = None, counts: Optional[np.ndarray] = None,
+                 vectors: Optional[np.ndarray] = None, rows: int = 0):
+        self.keys = keys or []
+        self.counts = counts if counts is not None else np.zeros(0, dtype=np.int64)
+        self.vectors = vectors
+        self.rows = rows
+        self.positions = {key: i for i, key in enumerate(self.keys)}
+        self._unit: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add_rows(self, vectors: np.ndarray, metadatas: List[Optional[Dict[str, Any]]]) -> None:
+        """Fold the next FAISS rows into the document means.
+
+        Args:
+            vectors: Vectors of rows [rows, rows + len(vectors))
+            metadatas: Chunk metadata of each row, None for rows without any
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.rows += len(vectors)
+        grouped: Dict[str, List[int]] = {}
+        for i, meta in enumerate(metadatas):
+            if meta is not None:
+                grouped.setdefault(document_key(meta), []).append(i)
+        if not grouped:
+            return
+        if self.vectors is None:
+            self.vectors = np.zeros((0, vectors.shape[1]), dtype=np.float32)
+
+        new_keys = [key for key in grouped if key not in self.positions]
+        if new_keys:
+            for key in new_keys:
+                self.positions[key] = len(self.keys)
+                self.keys.append(key)
+            self.vectors = np.vstack([self.vectors, np.zeros((len(new_keys), self.vectors.shape[1]), dtype=np.float32)])
+            self.counts = np.concatenate([self.counts, np.zeros(len(new_keys), dtype=np.int64)])
+        for key, members in grouped.items():
+            pos = self.positions[key]
+            count = self.counts[pos]
+            # Running mean: m' = m + (sum(x) - n * m) / (count + n)
+            self.vectors[pos] += (vectors[members].sum(axis=0) - len(members) * self.vectors[pos]) / (count + len(members))
+            self.counts[pos] = count + len(members)
+        self._unit = None
+
+    def search(self, query_vecs: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Find the documents closest to each query by cosine similarity.
+
+        Means of many chunks are shorter than single chunk vectors, so they
+        are compared by direction rather than by L2 distance.
+
+        Returns:
+            (similarities, positions) arrays of shape (len(query_vecs), min(k, len(self)))
+        """
+        if not self.keys:
+            return (np.zeros((len(query_vecs), 0), dtype=np.float32),
+                    np.zeros((len(query_vecs), 0), dtype=np.int64))
+        if self._unit is None:
+            norms = np.linalg.norm(self.vectors, axis=1, keepdims=True)
+            self._unit = np.ascontiguousarray(self.vectors / np.where(norms == 0, 1.0, norms), dtype=np.float32)
+        queries = np.ascontiguousarray(query_vecs, dtype=np.float32)
+        return faiss.knn(queries, self._unit, min(k, len(self.keys)), metric=faiss.METRIC_INNER_PRODUCT)
+
+
+def _catch_up(doc_index: DocIndex, index: faiss.Index, metadata: Dict[str, Any]) -> None:
+    # metadata.json is written after the FAISS index, so the newest rows may
+    # not have metadata yet; they are picked up on a later call
+    end = index.ntotal
+    while end > doc_index.rows and str(end - 1) not in metadata:
+        end -= 1
+    for start in range(doc_index.rows, end, RECONSTRUCT_BATCH_SIZE):
+        stop = min(start + RECONSTRUCT_BATCH_SIZE, end)
+        doc_index.add_rows(index.reconstruct_n(start, stop - start),
+                           [metadata.get(str(row)) for row in range(start, stop)])
+
+
+def read_doc_index(user_id: str) -> Optional[DocIndex]:
+    """Read a user's stored document index, or None if it is missing or unreadable."""
+    path = get_doc_index_path(user_id)
+    if not path.exists():
+        return None
+    try:
+        with np.load(path) as data:
+            if int(data["schema_version"]) != DOC_INDEX_SCHEMA_VERSION:
+                return None
+            keys = data["keys"].tolist()
+            return DocIndex(keys, data["counts"], data["vectors"] if keys else None, int(data["rows"]))
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable document index for user {user_id}: {str(e)}")
+        return None
+
+
+def write_doc_index(user_id: str, doc_index: DocIndex) -> None:
+    # One file, replaced atomically, so keys, means and rows always match
+    path = get_doc_index_path(user_id)
+    tmp_path = path.with_name(f".{path.name}.tmp.npz")
+    np.savez(
+        tmp_path,
+        schema_version=DOC_INDEX_SCHEMA_VERSION,
+        rows=doc_index.rows,
+        keys=np.array(doc_index.keys, dtype=str),
+        counts=doc_index.counts,
+        vectors=doc_index.vectors if doc_index.vectors is not None else np.zeros((0, 0), dtype=np.float32)
+    )
+    os.replace(tmp_path, path)
+
+
+def update_doc_index(user_id: str, base_id: int, vectors: np.ndarray, metadatas: List[Dict[str, Any]]) -> None:
+    """Fold vectors appended at FAISS row base_id into the stored document index.
+
+    Called by the commit path with the user's writer lock held. A missing or
+    out-of-step index is left alone and rebuilt by the next reader.
+    """
+    doc_index = read_doc_index(user_id)
+    if doc_index is None or doc_index.rows != base_id:
+        return
+    doc_index.add_rows(vectors, metadatas)
+    write_doc_index(user_id, doc_index)
+
+
+def remove_doc_index(user_id: str) -> None:
+    """Drop a user's document index, e.g. after the FAISS rows were renumbered."""
+    path = get_doc_index_path(user_id)
+    if path.exists():
+        path.unlink()
+    with _cache_lock:
+        _cache.pop(user_id, None)
+
+
+def load_doc_index(user_id: str, index: faiss.Index, metadata: Dict[str, Any]) -> DocIndex:
+    """Return a user's document index, up to date with a loaded FAISS index.
+
+    Shared between callers and must not be mutated. Rows added since the
+    stored state are reconstructed from the given FAISS index and folded
+    in, and a missing index is built, without holding the user's writer
+    lock; the lock is only taken to store the result, and only if the FAISS
+    file still holds the rows it was built from. A stored index may cover
+    rows committed after the given FAISS index was loaded.
+
+    Args:
+        user_id: User identifier
+        index: The user's FAISS index
+        metadata: The user's chunk metadata
+
+    Returns:
+        Document index
+    """
+    path = get_doc_index_path(user_id)
+    doc_index = None
+    if path.exists():
+        stat = path.stat()
+        file_key = (stat.st_mtime_ns, stat.st_size)
+        with _cache_lock:
+            cached = _cache.get(user_id)
+        if cached is not None and cached[0] == file_key and cached[1].rows >= index.ntotal:
+            return cached[1]
+        doc_index = read_doc_index(user_id)
+        if doc_index is not None and doc_index.rows >= index.ntotal:
+            with _cache_lock:
+                _cache[user_id] = (file_key, doc_index)
+            return doc_index
+
+    if doc_index is None:
+        doc_index = DocIndex()
+    rows = doc_index.rows
+    _catch_up(doc_index, index, metadata)
+    if doc_index.rows == rows:
+        return doc_index
+
+    from core.commit_queue import user_write_lock
+    with user_write_lock(user_id):
+        faiss_path = get_faiss_index_path(user_id)
+        unchanged = faiss_path.exists() and same_rows(index, load_index(faiss_path), doc_index.rows)
+        stored = read_doc_index(user_id) if unchanged else None
+        # Not stored if the commit path got further meanwhile
+        if unchanged and (stored is None or stored.rows < doc_index.rows):
+            logger.info(f"Indexed documents of FAISS rows {rows}-{doc_index.rows} for user {user_id}")
+            write_doc_index(user_id, doc_index)
+    if not unchanged and rows:
+        # The FAISS index was replaced after it was read, so the stored means
+        # may belong to the new one: use the given index alone
+        doc_index = DocIndex()
+        _catch_up(doc_index, index, metadata)
+    return doc_index
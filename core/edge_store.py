@@ -0,0 +1,264 @@
+"""Per-user store of typed relationship edges between memories.
+
+Edges live in an append-only log, data/users/<id>/edges.jsonl, with one
+record per line:
+
+    {"op": "add", "edge": {"id": ..., "source_id": ..., "target_id": ..., "type": ..., ...}}
+    {"op": "remove", "id": <edge id>}
+    {"op": "remove_node", "memory_id": <memory id>}
+
+so adding a relationship appends one line instead of rewriting
+memory_index.json. Writes go through the commit queue; readers replay only
+the records appended since their last load. The store keeps forward and
+reverse adjacency, so incoming and outgoing edges and k-hop traversals cost
+O(edges visited).
+
+Relationships stored inside memory entries by earlier versions are copied
+into the log the first time it is needed.
+"""
+import os
+import json
+import threading
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from core.user_paths import get_edge_log_path
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# The log is compacted once it holds this many more records than live edges
+COMPACT_MIN_DEAD_RECORDS = 1000
+
+_cache: Dict[str, Tuple[int, int, "EdgeStore"]] = {}
+_cache_lock = threading.Lock()
+
+
+class EdgeStore:
+    """Typed, directed relationship edges with forward and reverse adjacency."""
+
+    def __init__(self):
+        self.edges: Dict[str, Dict[str, Any]] = {}
+        self.forward: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.reverse: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # Changes whenever the edges may have; survives log compaction
+        self.version = 0
+        # Records in the log, live or not
+        self.records = 0
+
+    def __len__(self) -> int:
+        return len(self.edges)
+
+    def copy(self) -> "EdgeStore":
+        store = EdgeStore()
+        store.edges = dict(self.edges)
+        store.forward = {k: dict(v) for k, v in self.forward.items()}
+        store.reverse = {k: dict(v) for k, v in self.reverse.items()}
+        store.version = self.version
+        store.records = self.records
+        return store
+
+    def add(self, edge: Dict[str, Any]) -> None:
+        self.remove(edge["id"])
+        self.edges[edge["id"]] = edge
+        self.forward.setdefault(edge["source_id"], {})[edge["id"]] = edge
+        self.reverse.setdefault(edge["target_id"], {})[edge["id"]] = edge
+
+    def remove(self, edge_id: str) -> Optional[Dict[str, Any]]:
+        edge = self.edges.pop(edge_id, None)
+        if edge is None:
+            return None
+        for adjacency, memory_id in ((self.forward, edge["source_id"]), (self.reverse, edge["target_id"])):
+            bucket = adjacency.get(memory_id)
+            if bucket is not None:
+                bucket.pop(edge_id, None)
+                if not bucket:
+                    del adjacency[memory_id]
+        return edge
+
+    def remove_node(self, memory_id: str) -> List[Dict[str, Any]]:
+        """Remove every edge from or to a memory."""
+        edge_ids = list(self.forward.get(memory_id, {})) + list(self.reverse.get(memory_id, {}))
+        return [edge for edge in (self.remove(edge_id) for edge_id in edge_ids) if edge is not None]
+
+    def apply(self, record: Dict[str, Any]) -> None:
+        op = record.get("op")
+        if op == "add":
+            self.add(record["edge"])
+        elif op == "remove":
+            self.remove(record["id"])
+        elif op == "remove_node":
+            self.remove_node(record["memory_id"])
+        elif op == "compact":
+            self.version = record.get("version", 0)
+            return
+        self.version += 1
+        self.records += 1
+
+    def out_edges(self, memory_id: str, types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        edges = self.forward.get(memory_id, {}).values()
+        return [e for e in edges if not types or e.get("type") in types]
+
+    def in_edges(self, memory_id: str, types: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        edges = self.reverse.get(memory_id, {}).values()
+        return [e for e in edges if not types or e.get("type") in types]
+
+    def neighbors(self, memory_id: str, hops: int = 1, types: Optional[List[str]] = None,
+                  direction: str = "both") -> Dict[str, int]:
+        """Find the memories within a number of relationship hops.
+
+        Breadth-first over the adjacency maps, so the cost is proportional to
+        the edges visited, not to the size of the graph.
+
+        Args:
+            memory_id: Memory to start from
+            hops: Largest number of edges to follow
+            types: Relationship types to follow (default: all)
+            direction: "out" follows edges forward, "in" backward, "both" either way
+
+        Returns:
+            Mapping of reachable memory id to its hop distance, without memory_id itself
+        """
+        allowed = set(types) if types else None
+        distances = {memory_id: 0}
+        frontier = [memory_id]
+        for depth in range(1, hops + 1):
+            next_frontier = []
+            for node in frontier:
+                steps = []
+                if direction in ("out", "both"):
+                    steps.extend((e, e["target_id"]) for e in self.forward.get(node, {}).values())
+                if direction in ("in", "both"):
+                    steps.extend((e, e["source_id"]) for e in self.reverse.get(node, {}).values())
+                for edge, other in steps:
+                    if other in distances or (allowed is not None and edge.get("type") not in allowed):
+                        continue
+                    distances[other] = depth
+                    next_frontier.append(other)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        del distances[memory_id]
+        return distances
+
+    def iter_edges(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.edges.values())
+
+
+def _seed_records(index: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    records = []
+    for entry in index:
+        for rel in entry.get("relationships") or []:
+            edge = dict(rel)
+            edge.setdefault("source_id", entry.get("id"))
+            records.append({"op": "add", "edge": edge})
+    return records
+
+
+def _write_records(handle, records: List[Dict[str, Any]]) -> None:
+    handle.write("".join(json.dumps(record) + "\n" for record in records))
+
+
+def ensure_edge_log(user_id: str, index: Optional[List[Dict[str, Any]]] = None) -> None:
+    """Create the edge log, copying relationships stored in memory entries.
+
+    The caller must hold the user's writer lock.
+
+    Args:
+        user_id: User identifier
+        index: The current memory index, loaded if omitted
+    """
+    path = get_edge_log_path(user_id)
+    if path.exists():
+        return
+    if index is None:
+        from core.commit_queue import load_memory_index
+        index = load_memory_index(user_id)
+    records = _seed_records(index)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w") as f:
+        _write_records(f, records)
+    os.replace(tmp_path, path)
+    if records:
+        logger.info(f"Migrated {len(records)} relationship(s) of user {user_id} into {path.name}")
+
+
+def append_edge_records(user_id: str, records: List[Dict[str, Any]]) -> None:
+    """Append records to the edge log. The caller must hold the user's writer lock."""
+    if not records:
+        return
+    ensure_edge_log(user_id)
+    with open(get_edge_log_path(user_id), "a") as f:
+        _write_records(f, records)
+
+
+def _read_from(path, offset: int, store: EdgeStore) -> int:
+    """Apply the complete records after offset; return the offset after the last one."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    for line in data[:end].splitlines():
+        if line.strip():
+            try:
+                store.apply(json.loads(line))
+            except (json.JSONDecodeError, KeyError) as e:
+                logger.warning(f"Skipping bad record in {path}: {str(e)}")
+    return offset + end
+
+
+def compact_edge_log(user_id: str, store: EdgeStore) -> None:
+    """Rewrite the edge log with one record per live edge. The caller must hold the user's writer lock."""
+    path = get_edge_log_path(user_id)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w") as f:
+        _write_records(f, [{"op": "compact", "version": store.version - len(store)}]
+                       + [{"op": "add", "edge": edge} for edge in store.iter_edges()])
+    os.replace(tmp_path, path)
+
+
+def load_edge_store(user_id: str) -> EdgeStore:
+    """Return a user's edge store, reading only what was appended since the last call.
+
+    The returned store is shared and must not be mutated.
+
+    Args:
+        user_id: User identifier
+
+    Returns:
+        Edge store
+    """
+    path = get_edge_log_path(user_id)
+    if not path.exists():
+        from core.commit_queue import user_write_lock
+        with user_write_lock(user_id):
+            ensure_edge_log(user_id)
+
+    stat = path.stat()
+    with _cache_lock:
+        cached = _cache.get(user_id)
+    if cached is not None and cached[0] == stat.st_ino and cached[1] == stat.st_size:
+        return cached[2]
+
+    if cached is not None and cached[0] == stat.st_ino and cached[1] < stat.st_size:
+        # Appended to since the last load: replay only the new records, on a
+        # copy so callers still holding the old store are not affected
+        store = cached[2].copy()
+        offset = _read_from(path, cached[1], store)
+    else:
+        store = EdgeStore()
+        offset = _read_from(path, 0, store)
+        if store.records - len(store) > max(COMPACT_MIN_DEAD_RECORDS, len(store)):
+            from core.commit_queue import user_write_lock
+            with user_write_lock(user_id):
+                current = path.stat()
+                if current.st_ino == stat.st_ino and current.st_size == offset:
+                    compact_edge_log(user_id, store)
+                    store.records = len(store)
+                    stat = path.stat()
+                    offset = stat.st_size
+
+    with _cache_lock:
+        _cache[user_id] = (stat.st_ino, offset, store)
+    return store
@@ -1,12 +1,9 @@
 import os
-import json
 import numpy as np
-import faiss
-from openai import OpenAI
-from dotenv import load_dotenv
-from core.user_paths import get_faiss_index_path, get_metadata_path
-import tempfile
-import shutil
+from core.metrics import timed, increment
+from core.commit_queue import append_vectors
+from core.embedding_config import EmbeddingMismatchError, default_embedding, request_options, user_embedding
+from core.llm_client import embed
 import logging
 from typing import List, Dict, Any, Union, Optional
 
@@ -14,93 +11,79 @@ from typing import List, Dict, Any, Union, Optional
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-load_dotenv()
+# Maximum number of inputs sent in one embeddings request
+EMBED_BATCH_SIZE = int(os.getenv("MEMOBRAIN_EMBED_BATCH_SIZE", "256"))
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
-def embed_text(texts: Union[str, List[str]]) -> List[np.ndarray]:
+@timed("embed_text")
+def embed_text(texts: Union[str, List[str]], embedding: Optional[Dict[str, Any]] = None,
+               strict: bool = False) -> List[np.ndarray]:
     """Generate embeddings for text using OpenAI's embedding model.
     
+    Large inputs are split into requests of EMBED_BATCH_SIZE texts. Empty
+    texts are not sent and get zero vectors.
+    
     Args:
         texts: Single text string or list of text strings
+        embedding: Model tag ({"model", "dim"}) to embed with (default: EMBEDDING_MODEL)
+        strict: Raise on provider errors instead of returning zero vectors
         
     Returns:
         List of embedding vectors as numpy arrays
     """
     if isinstance(texts, str):
         texts = [texts]
+    embedding = embedding or default_embedding()
         
     # Handle empty input
     if not texts or all(not t.strip() for t in texts):
         logger.warning("Attempted to embed empty text")
-        # Return zero vectors of appropriate dimension (1536 for text-embedding-3-small)
-        return [np.zeros(1536, dtype=np.float32) for _ in range(len(texts))]
+        return [np.zeros(embedding["dim"], dtype=np.float32) for _ in range(len(texts))]
     
-    try:
-        response = client.embeddings.create(
-            model="text-embedding-3-small",
-            input=texts
-        )
-        return [np.array(e.embedding, dtype=np.float32) for e in response.data]
-    except Exception as e:
-        logger.error(f"Error generating embeddings: {str(e)}")
-        # Return zero vectors as fallback
-        return [np.zeros(1536, dtype=np.float32) for _ in range(len(texts))]
+    # Return zero vectors of appropriate dimension for empty texts and as fallback
+    vectors = [np.zeros(embedding["dim"], dtype=np.float32) for _ in range(len(texts))]
+    positions = [i for i, t in enumerate(texts) if t.strip()]
+
+    for start in range(0, len(positions), EMBED_BATCH_SIZE):
+        batch_positions = positions[start:start + EMBED_BATCH_SIZE]
+        try:
+            response = embed(
+                input=[texts[i] for i in batch_positions],
+                **request_options(embedding)
+            )
+            increment("embedded_texts_total", len(batch_positions))
+            for i, e in zip(batch_positions, response.data):
+                vectors[i] = np.array(e.embedding, dtype=np.float32)
+        except Exception as e:
+            logger.error(f"Error generating embeddings: {str(e)}")
+            increment("embedding_failures_total")
+            if strict:
+                raise
+    return vectors
 
-def save_to_faiss(vectors: List[np.ndarray], metadatas: List[Dict[str, Any]], user_id: str) -> bool:
+@timed("save_to_faiss")
+def save_to_faiss(vectors: List[np.ndarray], metadatas: List[Dict[str, Any]], user_id: str,
+                  embedding: Optional[Dict[str, Any]] = None) -> bool:
     """Save vectors and metadata to FAISS index and JSON file.
     
+    The write goes through the per-user commit queue, so concurrent savers
+    are serialized under the user's writer lock and coalesced into a single
+    rewrite of index.faiss and metadata.json.
+    
     Args:
         vectors: List of embedding vectors
         metadatas: List of metadata dictionaries
         user_id: User identifier
+        embedding: Model tag the vectors were embedded with
         
     Returns:
         True if successful, False otherwise
     """
-    index_path = get_faiss_index_path(user_id)
-    metadata_path = get_metadata_path(user_id)
-    
     try:
-        # Load or create index
-        if not os.path.exists(index_path):
-            # Create new index with appropriate dimension
-            index = faiss.IndexFlatL2(len(vectors[0]))
-            index_id = 0
-            metadata_store = {}
-        else:
-            # Load existing index
-            index = faiss.read_index(str(index_path))
-            try:
-                with open(metadata_path, "r") as f:
-                    metadata_store = json.load(f)
-            except Exception as e:
-                logger.error(f"Error loading metadata, creating new: {str(e)}")
-                metadata_store = {}
-
-            # Get next available ID
-            index_id = max(map(int, metadata_store.keys() or ["0"])) + 1
-
-        # Add vectors to FAISS with proper type conversion
-        vectors_array = np.array(vectors).astype("float32")
-        index.add(vectors_array)
-        
-        # Write index with atomic pattern
-        temp_index_path = f"{index_path}.temp"
-        faiss.write_index(index, temp_index_path)
-        os.replace(temp_index_path, index_path)
-
-        # Add metadata with atomic write
-        for i, meta in enumerate(metadatas):
-            metadata_store[str(index_id + i)] = meta
-
-        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-            json.dump(metadata_store, tmp_file, indent=2)
-            tmp_path = tmp_file.name
-        
-        shutil.move(tmp_path, metadata_path)
+        append_vectors(user_id, vectors, metadatas, embedding)
         return True
         
+    except EmbeddingMismatchError:
+        raise
     except Exception as e:
         logger.error(f"Error saving to FAISS: {str(e)}")
         return False
@@ -122,23 +105,17 @@ def embed_and_store(chunks: Union[List[str], List[Dict[str, Any]]], user_id: str
     # Extract text for embedding
     texts = [c["text"] for c in chunks]
     
-    # Generate embeddings
-    vectors = embed_text(texts)
+    # Generate embeddings with the model of the user's index
+    embedding = user_embedding(user_id)
+    vectors = embed_text(texts, embedding)
     
     # Save to FAISS
-    save_to_faiss(vectors, chunks, user_id)
+    try:
+        save_to_faiss(vectors, chunks, user_id, embedding)
+    except EmbeddingMismatchError:
+        # The user's index was re-embedded with another model meanwhile
+        embedding = user_embedding(user_id)
+        vectors = embed_text(texts, embedding)
+        save_to_faiss(vectors, chunks, user_id, embedding)
     
     return vectors
-
-
-def embed_text_list(text_list: List[str]) -> List[np.ndarray]:  
-    """Legacy support function for embedding text lists.
-    
-    Args:
-        text_list: List of text strings to embed
-        
-    Returns:
-        List of embedding vectors
-    """
-    return embed_text(text_list)
-
@@ -0,0 +1,74 @@
+"""Embedding model configuration and the model tag of each user's index.
+
+New users are embedded with EMBEDDING_MODEL. Every index records the model
+and dimension its vectors were built with in index_info.json, and queries
+and new ingests for a user always use the tagged model, so changing
+EMBEDDING_MODEL never mixes vector spaces: existing users keep their model
+until core.reembed migrates them.
+"""
+import os
+import json
+import logging
+from typing import Any, Dict, Optional
+
+from core.user_paths import get_faiss_index_path, get_index_info_path
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = os.getenv("MEMOBRAIN_EMBEDDING_MODEL", "text-embedding-3-small")
+NATIVE_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536
+}
+# text-embedding-3 models can return shortened vectors
+EMBEDDING_DIM = int(os.getenv("MEMOBRAIN_EMBEDDING_DIM", str(NATIVE_DIMENSIONS.get(EMBEDDING_MODEL, 1536))))
+
+# Indexes written before vectors were tagged
+LEGACY_EMBEDDING = {"model": "text-embedding-3-small", "dim": 1536}
+
+
+class EmbeddingMismatchError(ValueError):
+    """Vectors were embedded with a different model than the index they are added to."""
+
+
+def default_embedding() -> Dict[str, Any]:
+    return {"model": EMBEDDING_MODEL, "dim": EMBEDDING_DIM}
+
+
+def request_options(embedding: Dict[str, Any]) -> Dict[str, Any]:
+    """Keyword arguments for client.embeddings.create producing vectors of a tag."""
+    options = {"model": embedding["model"]}
+    if embedding["model"].startswith("text-embedding-3"):
+        options["dimensions"] = embedding["dim"]
+    return options
+
+
+def read_index_embedding(user_id: str) -> Optional[Dict[str, Any]]:
+    """Return the model tag of a user's index, or None if the user has no index yet.
+
+    Indexes from before tagging are reported as LEGACY_EMBEDDING.
+    """
+    path = get_index_info_path(user_id)
+    try:
+        with open(path, "r") as f:
+            info = json.load(f)
+        return {"model": info["model"], "dim": info["dim"]}
+    except FileNotFoundError:
+        pass
+    except (json.JSONDecodeError, KeyError, OSError) as e:
+        logger.warning(f"Ignoring unreadable index info for user {user_id}: {str(e)}")
+    return dict(LEGACY_EMBEDDING) if get_faiss_index_path(user_id).exists() else None
+
+
+def user_embedding(user_id: str) -> Dict[str, Any]:
+    """The model tag to embed a user's queries and new memories with."""
+    return read_index_embedding(user_id) or default_embedding()
+
+
+def write_index_embedding(user_id: str, embedding: Dict[str, Any]) -> None:
+    # Imported lazily: commit_queue imports this module
+    from core.commit_queue import atomic_write_json
+    atomic_write_json(get_index_info_path(user_id), {"model": embedding["model"], "dim": embedding["dim"]})
@@ -0,0 +1,329 @@
+import json
+import threading
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from core.user_paths import get_graph_index_path, get_graph_layout_path
+from core.memory_stats import source_key
+from core.edge_store import EdgeStore
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+GRAPH_SCHEMA_VERSION = 2
+# Spring layout iterations for a full layout and for an incremental update
+LAYOUT_ITERATIONS = 50
+INCREMENTAL_ITERATIONS = 20
+LAYOUT_SEED = 42
+
+_cache: Dict[str, Tuple[Tuple[int, int], "GraphIndex"]] = {}
+_cache_lock = threading.Lock()
+
+
+def _node(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "title": entry.get("title", "Untitled"),
+        "category": entry.get("category", "uncategorized"),
+        "importance": entry.get("importance", 3)
+    }
+
+
+class GraphIndex:
+    """The nodes of a user's relationship graph, indexed by memory id.
+
+    Holds the node attributes the graph views display, so titles are dict
+    lookups instead of scans of the memory index; the edges live in the
+    edge store. version changes whenever nodes are added or removed and,
+    with the edge store's version, keys the cached layouts.
+    """
+
+    def __init__(self, nodes: Optional[Dict[str, Dict[str, Any]]] = None, version: int = 0):
+        self.nodes = nodes or {}
+        self.version = version
+        # Source key of the memory index file this was loaded for
+        self.source: Any = None
+
+    def title(self, memory_id: str) -> str:
+        node = self.nodes.get(memory_id)
+        return node["title"] if node else "Untitled"
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        memory_id = entry.get("id")
+        self.nodes[memory_id] = _node(entry)
+        self.version += 1
+
+    def remove(self, entry: Dict[str, Any]) -> None:
+        memory_id = entry.get("id")
+        self.nodes.pop(memory_id, None)
+        self.version += 1
+
+    def update(self, entry: Dict[str, Any]) -> None:
+        """Refresh the attributes of a memory changed in place."""
+        self.nodes[entry.get("id")] = _node(entry)
+
+    def iter_edges(self, edges: EdgeStore) -> Iterator[Dict[str, Any]]:
+        """Yield the edges of the store whose source and target both exist."""
+        for edge in edges.iter_edges():
+            if edge["source_id"] in self.nodes and edge["target_id"] in self.nodes:
+                yield edge
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "schema_version": GRAPH_SCHEMA_VERSION,
+            "version": self.version,
+            "nodes": self.nodes
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GraphIndex":
+        return cls(data["nodes"], data.get("version", 0))
+
+
+def build_graph_index(index: List[Dict[str, Any]], version: int = 0) -> GraphIndex:
+    """Build the graph index for a whole memory index.
+
+    Args:
+        index: Memory entries
+        version: Version to assign
+
+    Returns:
+        Graph index
+    """
+    graph = GraphIndex()
+    for entry in index:
+        graph.add(entry)
+    graph.version = version
+    return graph
+
+
+def read_graph_index_file(user_id: str) -> Optional[Tuple[GraphIndex, Any]]:
+    """Read a user's stored graph index.
+
+    Returns:
+        Tuple of (graph index, source key it was built from), or None if it
+        is missing or unreadable
+    """
+    path = get_graph_index_path(user_id)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        logger.warning(f"Ignoring unreadable graph index for user {user_id}: {str(e)}")
+        return None
+    if data.get("schema_version") != GRAPH_SCHEMA_VERSION:
+        return None
+    return GraphIndex.from_dict(data), data.get("source")
+
+
+def write_graph_index(user_id: str, graph: GraphIndex) -> None:
+    # Imported lazily: commit_queue imports this module
+    from core.commit_queue import atomic_write_json
+    data = graph.to_dict()
+    data["source"] = source_key(user_id)
+    atomic_write_json(get_graph_index_path(user_id), data)
+
+
+def load_graph_index(user_id: str) -> GraphIndex:
+    """Return a user's graph index.
+
+    Parsed once per change and shared between reruns; the returned object
+    must not be mutated. Rebuilt once and saved if it is missing or stale.
+
+    Args:
+        user_id: User identifier
+
+    Returns:
+        Graph index
+    """
+    path = get_graph_index_path(user_id)
+    key = source_key(user_id)
+    if key is None:
+        return GraphIndex()
+
+    if path.exists():
+        stat = path.stat()
+        file_key = (stat.st_mtime_ns, stat.st_size)
+        with _cache_lock:
+            cached = _cache.get(user_id)
+        if cached is not None and cached[0] == file_key and cached[1].source == key:
+            return cached[1]
+        stored = read_graph_index_file(user_id)
+        if stored is not None and stored[1] == key:
+            graph = stored[0]
+            graph.source = key
+            with _cache_lock:
+                _cache[user_id] = (file_key, graph)
+            return graph
+
+    from core.commit_queue import load_memory_index, user_write_lock
+    with user_write_lock(user_id):
+        stored = read_graph_index_file(user_id)
+        key = source_key(user_id)
+        if stored is not None and stored[1] == key:
+            graph = stored[0]
+        else:
+            previous_version = stored[0].version if stored else 0
+            graph = build_graph_index(load_memory_index(user_id), previous_version + 1)
+            write_graph_index(user_id, graph)
+    graph.source = key
+    return graph
+
+
+def _edge_pairs(graph: GraphIndex, edges: EdgeStore) -> set:
+    """Undirected edges as sorted id pairs, self-loops dropped."""
+    return {
+        tuple(sorted((edge["source_id"], edge["target_id"])))
+        for edge in graph.iter_edges(edges)
+        if edge["source_id"] != edge["target_id"]
+    }
+
+
+def _fruchterman_reingold(pos: np.ndarray, edges: np.ndarray, moving: np.ndarray,
+                          iterations: int, temperature: float) -> np.ndarray:
+    """Run Fruchterman-Reingold force-directed iterations on the moving nodes.
+
+    Repulsion is computed for the moving nodes against every node in row
+    blocks, so memory stays bounded and an incremental update costs
+    O(moving x nodes) per iteration instead of O(nodes^2). Needs only numpy,
+    unlike networkx's spring_layout, which requires scipy above 500 nodes.
+
+    Args:
+        pos: Node positions, shape (n, 2); updated in place
+        edges: Node index pairs, shape (m, 2)
+        moving: Indexes of the nodes allowed to move
+        iterations: Number of iterations
+        temperature: Largest step in the first iteration, cooled linearly
+
+    Returns:
+        The updated positions
+    """
+    n = len(pos)
+    k = 1.0 / np.sqrt(n)
+    is_moving = np.zeros(n, dtype=bool)
+    is_moving[moving] = True
+    # Only edges touching a moving node exert forces that matter
+    edges = edges[is_moving[edges[:, 0]] | is_moving[edges[:, 1]]] if len(edges) else edges
+    dt = temperature / (iterations + 1)
+    block = max(1, (1 << 22) // max(n, 1))
+
+    for _ in range(iterations):
+        disp = np.zeros((len(moving), 2))
+        for start in range(0, len(moving), block):
+            rows = moving[start:start + block]
+            dx = pos[rows, 0, None] - pos[None, :, 0]
+            dy = pos[rows, 1, None] - pos[None, :, 1]
+            # Repulsion k^2 / d along each unit vector: sum_j w_ij * (p_i - p_j)
+            weights = k * k / np.maximum(dx * dx + dy * dy, 1e-4)
+            disp[start:start + len(rows)] = pos[rows] * weights.sum(axis=1, keepdims=True) - weights @ pos
+
+        # Attraction along edges
+        if len(edges):
+            delta = pos[edges[:, 0]] - pos[edges[:, 1]]
+            pull = delta * (np.linalg.norm(delta, axis=1, keepdims=True) / k)
+            full = np.zeros((n, 2))
+            np.add.at(full, edges[:, 0], -pull)
+            np.add.at(full, edges[:, 1], pull)
+            disp += full[moving]
+
+        length = np.maximum(np.linalg.norm(disp, axis=1, keepdims=True), 1e-2)
+        pos[moving] += disp * (temperature / length)
+        temperature -= dt
+    return pos
+
+
+def compute_layout(graph: GraphIndex, edge_store: EdgeStore,
+                   previous: Optional[Dict[str, Any]] = None) -> Dict[str, List[float]]:
+    """Lay out the relationship graph, reusing a previous layout if given.
+
+    With a previous layout only new nodes and the endpoints of added or
+    removed edges move; every other node keeps its position, so adding an
+    edge does not reshuffle the graph and costs a few iterations.
+
+    Args:
+        graph: Graph index
+        edge_store: The user's relationship edges
+        previous: Stored layout of an earlier graph version
+
+    Returns:
+        Mapping of memory id to [x, y]
+    """
+    ids = list(graph.nodes)
+    if not ids:
+        return {}
+    position_of = {memory_id: i for i, memory_id in enumerate(ids)}
+    pairs = _edge_pairs(graph, edge_store)
+    edges = np.array([(position_of[a], position_of[b]) for a, b in pairs], dtype=np.int64).reshape(-1, 2)
+    rng = np.random.default_rng(LAYOUT_SEED)
+
+    old_positions = (previous or {}).get("positions", {})
+    placed = [i for i, memory_id in enumerate(ids) if memory_id in old_positions]
+    if not placed:
+        pos = rng.uniform(0, 1, (len(ids), 2))
+        _fruchterman_reingold(pos, edges, np.arange(len(ids)), LAYOUT_ITERATIONS, 0.1)
+        # Center and scale into [-1, 1]
+        pos -= pos.mean(axis=0)
+        pos /= max(np.abs(pos).max(), 1e-9)
+        return {memory_id: [float(x), float(y)] for memory_id, (x, y) in zip(ids, pos)}
+
+    changed = pairs ^ {tuple(edge) for edge in (previous or {}).get("edges", [])}
+    moving = {i for i, memory_id in enumerate(ids) if memory_id not in old_positions}
+    moving |= {position_of[memory_id] for edge in changed for memory_id in edge if memory_id in position_of}
+    pos = np.zeros((len(ids), 2))
+    for i in placed:
+        pos[i] = old_positions[ids[i]]
+    if moving:
+        # Start new nodes next to their already placed neighbours
+        neighbours: Dict[int, List[int]] = {}
+        for a, b in edges.tolist():
+            neighbours.setdefault(a, []).append(b)
+            neighbours.setdefault(b, []).append(a)
+        for i in sorted(moving):
+            if ids[i] in old_positions:
+                continue
+            anchors = [pos[j] for j in neighbours.get(i, []) if ids[j] in old_positions]
+            center = np.mean(anchors, axis=0) if anchors else rng.uniform(-1, 1, 2)
+            pos[i] = center + rng.normal(0, 0.05, 2)
+        _fruchterman_reingold(pos, edges, np.array(sorted(moving)), INCREMENTAL_ITERATIONS, 0.05)
+    return {memory_id: [float(x), float(y)] for memory_id, (x, y) in zip(ids, pos)}
+
+
+def load_layout(user_id: str, graph: GraphIndex, edge_store: EdgeStore) -> Dict[str, List[float]]:
+    """Return the cached layout for a graph version, updating it if the graph changed.
+
+    Args:
+        user_id: User identifier
+        graph: The user's graph index
+        edge_store: The user's relationship edges
+
+    Returns:
+        Mapping of memory id to [x, y]
+    """
+    from core.commit_queue import atomic_write_json
+    path = get_graph_layout_path(user_id)
+    graph_key = [graph.version, len(graph.nodes), edge_store.version]
+    previous = None
+    if path.exists():
+        try:
+            with open(path, "r") as f:
+                previous = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"Ignoring unreadable graph layout for user {user_id}: {str(e)}")
+        if previous and previous.get("schema_version") != GRAPH_SCHEMA_VERSION:
+            previous = None
+    if previous and previous.get("graph") == graph_key:
+        return previous["positions"]
+
+    positions = compute_layout(graph, edge_store, previous)
+    edges = sorted(_edge_pairs(graph, edge_store))
+    atomic_write_json(path, {
+        "schema_version": GRAPH_SCHEMA_VERSION,
+        "graph": graph_key,
+        "positions": positions,
+        "edges": [list(edge) for edge in edges]
+    })
+    return positions
@@ -0,0 +1,170 @@
+import os
+import json
+import threading
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Tuple, Union
+
+import numpy as np
+import faiss
+
+from core.metrics import increment
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Number of indexes kept open per process. Memory-mapped indexes cost little
+# more than their file descriptor, the page cache holds the actual data.
+INDEX_CACHE_SIZE = int(os.getenv("MEMOBRAIN_INDEX_CACHE_SIZE", "32"))
+MMAP_ENABLED = os.getenv("MEMOBRAIN_INDEX_MMAP", "1").lower() not in ("0", "false", "no")
+
+_cache: "OrderedDict[str, Tuple[Tuple[int, int, int], faiss.Index]]" = OrderedDict()
+_metadata_cache: "OrderedDict[str, Tuple[Tuple[int, int, int], Dict[str, Any]]]" = OrderedDict()
+_rows_cache: Dict[str, Tuple[Tuple[int, int, int], Dict[str, List[int]]]] = {}
+_lock = threading.Lock()
+
+
+def _file_key(path: Path) -> Tuple[int, int, int]:
+    stat = path.stat()
+    # Writers replace the file atomically, so a new inode means a new index
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def read_index_mmap(path: Union[str, Path]) -> faiss.Index:
+    """Open a FAISS index for searching without copying it into memory.
+
+    Flat indexes are mapped zero-copy with IO_FLAG_MMAP_IFC, so their pages
+    load lazily and are shared through the OS page cache by every session
+    and process reading the same file. Falls back to a regular read if the
+    index type cannot be mapped.
+
+    The returned index is read-only; writers must use faiss.read_index.
+
+    Args:
+        path: Index file
+
+    Returns:
+        FAISS index
+    """
+    if MMAP_ENABLED:
+        try:
+            return faiss.read_index(str(path), faiss.IO_FLAG_MMAP_IFC)
+        except (RuntimeError, AttributeError) as e:
+            logger.debug(f"Memory-mapping {path} failed, reading it instead: {str(e)}")
+    return faiss.read_index(str(path))
+
+
+def load_index(path: Union[str, Path]) -> faiss.Index:
+    """Return a cached read-only index for a file, reopening it when it changes.
+
+    Args:
+        path: Index file
+
+    Returns:
+        FAISS index
+    """
+    path = Path(path)
+    key = _file_key(path)
+    cache_key = str(path.resolve())
+    with _lock:
+        cached = _cache.get(cache_key)
+        if cached is not None and cached[0] == key:
+            _cache.move_to_end(cache_key)
+            increment("index_cache_hits_total")
+            return cached[1]
+
+    increment("index_cache_misses_total")
+    index = read_index_mmap(path)
+    with _lock:
+        _cache[cache_key] = (key, index)
+        _cache.move_to_end(cache_key)
+        while len(_cache) > INDEX_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
+
+
+def same_rows(index: faiss.Index, other: faiss.Index, rows: int, samples: int = 8) -> bool:
+    """Whether two indexes hold the same vectors in rows [0, rows), checked on a sample of rows.
+
+    Used to tell whether an index was only appended to since a snapshot of
+    it was read, or replaced with renumbered rows (rebuild, re-embedding).
+    """
+    if index is other or rows == 0:
+        return True
+    if other.ntotal < rows or other.d != index.d:
+        return False
+    for row in {int(r) for r in np.linspace(0, rows - 1, min(samples, rows))}:
+        if not np.array_equal(index.reconstruct(row), other.reconstruct(row)):
+            return False
+    return True
+
+
+def load_metadata(path: Union[str, Path]) -> Dict[str, Any]:
+    """Return the cached chunk metadata for a file, reloading it when it changes.
+
+    The returned dict is shared between callers and must not be mutated;
+    copy individual entries before changing them.
+
+    Args:
+        path: metadata.json file
+
+    Returns:
+        Mapping of FAISS row id (as a string) to chunk metadata
+    """
+    path = Path(path)
+    key = _file_key(path)
+    cache_key = str(path.resolve())
+    with _lock:
+        cached = _metadata_cache.get(cache_key)
+        if cached is not None and cached[0] == key:
+            _metadata_cache.move_to_end(cache_key)
+            return cached[1]
+
+    with open(path, "r") as f:
+        metadata = json.load(f)
+    with _lock:
+        _metadata_cache[cache_key] = (key, metadata)
+        _metadata_cache.move_to_end(cache_key)
+        while len(_metadata_cache) > INDEX_CACHE_SIZE:
+            _metadata_cache.popitem(last=False)
+    return metadata
+
+
+def load_memory_rows(path: Union[str, Path]) -> Dict[str, List[int]]:
+    """Return the FAISS rows of each memory in a chunk metadata file.
+
+    Derived from the cached metadata and rebuilt only when it is reloaded.
+
+    Args:
+        path: metadata.json file
+
+    Returns:
+        Mapping of memory id (or filename, for chunks without one) to row ids
+    """
+    metadata = load_metadata(path)
+    cache_key = str(Path(path).resolve())
+    with _lock:
+        loaded = _metadata_cache.get(cache_key)
+        # File key of the metadata just returned, if it is still the cached one
+        key = loaded[0] if loaded is not None and loaded[1] is metadata else None
+        cached = _rows_cache.get(cache_key)
+        if key is not None and cached is not None and cached[0] == key:
+            return cached[1]
+
+    rows: Dict[str, List[int]] = {}
+    for row, meta in metadata.items():
+        rows.setdefault(str(meta.get("memory_id") or meta.get("filename") or ""), []).append(int(row))
+    if key is not None:
+        with _lock:
+            _rows_cache[cache_key] = (key, rows)
+    return rows
+
+
+def clear_index_cache() -> None:
+    """Drop every cached index and metadata store."""
+    with _lock:
+        _cache.clear()
+        _metadata_cache.clear()
+        _rows_cache.clear()
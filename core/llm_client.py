@@ -0,0 +1,182 @@
+"""Shared OpenAI client for embeddings and chat completions.
+
+Every module calls the API through one client, created on first use, so
+its HTTP connection pool keeps connections to the provider warm:
+back-to-back embedding and chat calls reuse an open TLS connection instead
+of each module's client setting up its own.
+
+embed() and chat() apply a timeout per call type and retry transient
+failures (timeouts, connection errors, 408/409/429 and 5xx responses) with
+exponential backoff and full jitter, honouring Retry-After up to the
+largest delay. The SDK's own retries are disabled so attempts are counted
+once.
+
+Every attempt first waits for the process-wide rate limiter
+(core.rate_limiter) in the priority class of its kind, so interactive
+queries and chat go ahead of ingestion and summarization when the request
+or token budget runs short. A 429 pauses all callers for its delay.
+
+Configuration (environment):
+    MEMOBRAIN_LLM_MAX_CONNECTIONS / _MAX_KEEPALIVE / _KEEPALIVE_EXPIRY: pool size and idle lifetime
+    MEMOBRAIN_LLM_CONNECT_TIMEOUT: seconds to establish a connection
+    MEMOBRAIN_<KIND>_TIMEOUT: seconds for a call of each kind in CALL_TIMEOUTS
+    MEMOBRAIN_LLM_MAX_RETRIES / _RETRY_BASE_DELAY / _RETRY_MAX_DELAY: retry policy
+    MEMOBRAIN_LLM_COMPLETION_TOKENS: tokens reserved for a chat answer without max_tokens
+"""
+import os
+import time
+import random
+import threading
+import logging
+from typing import Any, Callable, Optional
+
+from core.metrics import increment, observe
+from core.rate_limiter import BACKGROUND, FOREGROUND, INTERACTIVE, get_rate_limiter
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MAX_CONNECTIONS = int(os.getenv("MEMOBRAIN_LLM_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE = int(os.getenv("MEMOBRAIN_LLM_MAX_KEEPALIVE", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("MEMOBRAIN_LLM_KEEPALIVE_EXPIRY", "120"))
+CONNECT_TIMEOUT = float(os.getenv("MEMOBRAIN_LLM_CONNECT_TIMEOUT", "5"))
+
+# Seconds per call type: interactive calls fail fast, batch calls get longer
+CALL_TIMEOUTS = {
+    "embedding": float(os.getenv("MEMOBRAIN_EMBEDDING_TIMEOUT", "60")),
+    "query": float(os.getenv("MEMOBRAIN_QUERY_TIMEOUT", "10")),
+    "chat": float(os.getenv("MEMOBRAIN_CHAT_TIMEOUT", "60")),
+    "summary": float(os.getenv("MEMOBRAIN_SUMMARY_TIMEOUT", "60")),
+    "metadata": float(os.getenv("MEMOBRAIN_METADATA_TIMEOUT", "10"))
+}
+
+MAX_RETRIES = int(os.getenv("MEMOBRAIN_LLM_MAX_RETRIES", "3"))
+RETRY_BASE_DELAY = float(os.getenv("MEMOBRAIN_LLM_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("MEMOBRAIN_LLM_RETRY_MAX_DELAY", "8"))
+TRANSIENT_STATUS_CODES = {408, 409, 429}
+
+# Rate limiter priority per call type: a user is waiting on queries and chat
+CALL_PRIORITIES = {
+    "embedding": BACKGROUND,
+    "query": INTERACTIVE,
+    "chat": INTERACTIVE,
+    "summary": BACKGROUND,
+    "metadata": FOREGROUND
+}
+# Rough token counting for the limiter, corrected with the reported usage
+CHARS_PER_TOKEN = 4
+COMPLETION_TOKENS = int(os.getenv("MEMOBRAIN_LLM_COMPLETION_TOKENS", "500"))
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the shared OpenAI client, creating it on first use.
+
+    Imported lazily: openai takes about half a second to import.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                import openai
+                from dotenv import load_dotenv
+                load_dotenv()
+                # Limits is the pool config class of whichever HTTP library this openai version uses
+                limits = type(openai.DEFAULT_CONNECTION_LIMITS)(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE,
+                    keepalive_expiry=KEEPALIVE_EXPIRY
+                )
+                _client = openai.OpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    max_retries=0,
+                    timeout=openai.Timeout(CALL_TIMEOUTS["chat"], connect=CONNECT_TIMEOUT),
+                    http_client=openai.DefaultHttpxClient(limits=limits)
+                )
+    return _client
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a failed call may succeed if retried."""
+    import openai
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in TRANSIENT_STATUS_CODES or error.status_code >= 500
+    return False
+
+
+def retry_delay(attempt: int, error: Optional[Exception] = None) -> float:
+    """Seconds to wait before retry number attempt (0-based): full jitter, at most RETRY_MAX_DELAY."""
+    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            delay = max(delay, min(float(retry_after), RETRY_MAX_DELAY))
+        except ValueError:
+            pass
+    return delay
+
+
+def estimate_tokens(**kwargs) -> int:
+    """Approximate tokens of an embedding or chat call from its arguments."""
+    texts = kwargs.get("input", [])
+    if isinstance(texts, str):
+        texts = [texts]
+    chars = sum(len(t) for t in texts if isinstance(t, str))
+    messages = kwargs.get("messages")
+    if messages is not None:
+        chars += sum(len(str(m.get("content") or "")) for m in messages)
+        return chars // CHARS_PER_TOKEN + (kwargs.get("max_tokens") or COMPLETION_TOKENS)
+    return chars // CHARS_PER_TOKEN
+
+
+def call(kind: str, create: Callable[..., Any], **kwargs) -> Any:
+    """Make an API call with the timeout of its kind, retrying transient failures.
+
+    Args:
+        kind: Call type, a key of CALL_TIMEOUTS
+        create: SDK method to call
+        **kwargs: Arguments of the SDK method
+
+    Returns:
+        The SDK response
+    """
+    import openai
+    timeout = openai.Timeout(CALL_TIMEOUTS[kind], connect=CONNECT_TIMEOUT)
+    labels = {"call": kind}
+    limiter = get_rate_limiter()
+    tokens = estimate_tokens(**kwargs)
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.acquire(CALL_PRIORITIES.get(kind, FOREGROUND), tokens)
+        start = time.perf_counter()
+        try:
+            response = create(timeout=timeout, **kwargs)
+            observe(kind, time.perf_counter() - start, name="llm_call_duration_seconds")
+            limiter.record_usage(tokens, getattr(getattr(response, "usage", None), "total_tokens", None))
+            return response
+        except Exception as e:
+            if attempt == MAX_RETRIES or not is_transient(e):
+                increment("llm_call_failures_total", labels=labels)
+                raise
+            delay = retry_delay(attempt, e)
+            if isinstance(e, openai.RateLimitError):
+                # Over the provider's limit: hold back every caller, not just this one
+                limiter.pause(delay)
+            increment("llm_call_retries_total", labels=labels)
+            logger.warning(f"Retrying {kind} call in {delay:.2f}s after {type(e).__name__}: {str(e)}")
+            time.sleep(delay)
+
+
+def embed(kind: str = "embedding", **kwargs) -> Any:
+    """client.embeddings.create through the shared client, see call."""
+    return call(kind, get_client().embeddings.create, **kwargs)
+
+
+def chat(kind: str = "chat", **kwargs) -> Any:
+    """client.chat.completions.create through the shared client, see call."""
+    return call(kind, get_client().chat.completions.create, **kwargs)
@@ -1,27 +1,27 @@
 import os
-import json
 import hashlib
 from pathlib import Path
 from datetime import datetime
-import shutil
 import tempfile
 from typing import Tuple, Dict, List, Optional, Any, Union
 import uuid
 from enum import Enum
+from concurrent.futures import Future, ThreadPoolExecutor
 
 from core.preprocess import extract_text, chunk_text
-from core.embedder import embed_and_store
-from core.user_paths import (
-    get_user_data_dir,
-    get_memory_index_path
+from core.embedder import EMBED_BATCH_SIZE, embed_text
+from core.commit_queue import (
+    MemoryMutation,
+    commit,
+    update_memory_entry
 )
-from dotenv import load_dotenv
-from openai import OpenAI
+from core.user_paths import get_user_data_dir
+from core.embedding_config import EmbeddingMismatchError, user_embedding
+from core.thumbnails import schedule_thumbnails
+from core.metrics import timed, increment
+from core.llm_client import chat
 import numpy as np
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 class MemoryType(Enum):
     DOCUMENT = "document"
     IMAGE = "image"
@@ -43,6 +43,13 @@ class MemoryImportance(Enum):
 DATA_DIR = Path("data")
 DATA_DIR.mkdir(exist_ok=True)
 
+# Ingest stages that wait on the API run concurrently, each stage in its
+# own pool so chunk embedding never queues behind a batch's summaries; only
+# the calling thread waits on their futures
+INGEST_WORKERS = int(os.getenv("MEMOBRAIN_INGEST_WORKERS", "4"))
+_summary_pool = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest-summary")
+_embedding_pool = ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest-embed")
+
 def get_file_hash(file_bytes: bytes) -> str:
     """Generate a unique hash for file content.
     
@@ -71,6 +78,7 @@ def sanitize_vector(v: Union[np.ndarray, list]) -> list:
     return v
 
 
+@timed("auto_summarize")
 def auto_summarize(text: str, filename: str) -> Optional[str]:
     """Generate an automatic summary of document content using GPT.
     
@@ -93,7 +101,8 @@ def auto_summarize(text: str, filename: str) -> Optional[str]:
     )
 
     try:
-        response = client.chat.completions.create(
+        response = chat(
+            "summary",
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": "You are a concise and analytical summarization agent."},
@@ -173,53 +182,74 @@ def create_memory_relationship(source_id: str, target_id: str, relationship_type
         "created_at": datetime.now().isoformat()
     }
 
-def save_uploaded_file(uploaded_file, title: str, tags: list, category: str, 
-                      notes: str, user_id: str, extracted_text: str) -> Tuple[dict, Optional[str]]:
-    """Process and save an uploaded file with enhanced metadata.
+def read_upload_bytes(uploaded_file) -> bytes:
+    """Read the full contents of an uploaded file regardless of its read position.
     
     Args:
-        uploaded_file: Streamlit uploaded file object
-        title: User-provided title
-        tags: List of tags
-        category: File category
-        notes: Additional notes
-        user_id: User identifier
-        extracted_text: Pre-extracted text content
+        uploaded_file: Streamlit uploaded file object or any binary file object
         
     Returns:
-        Tuple of (file entry dict, summary text or None)
+        File bytes
     """
-    # Generate unique memory ID
-    memory_id = str(uuid.uuid4())
+    if hasattr(uploaded_file, "getvalue"):
+        return uploaded_file.getvalue()
+    return uploaded_file.read()
+
+
+def store_user_file(file_bytes: bytes, filename: str, user_id: str) -> Tuple[Path, str]:
+    """Write file bytes into the user's docs directory under a content-hashed name.
     
-    # Read file bytes only once
-    file_bytes = uploaded_file.read()
+    Args:
+        file_bytes: Raw file bytes
+        filename: Original file name
+        user_id: User identifier
+        
+    Returns:
+        Tuple of (stored file path, file hash)
+    """
     file_hash = get_file_hash(file_bytes)
-
-    # Prepare file path
-    ext = Path(uploaded_file.name).suffix.lower().strip(".")
-    filename = f"{file_hash}_{uploaded_file.name}"
-    file_path = get_user_data_dir(user_id) / filename
+    file_path = get_user_data_dir(user_id) / f"{file_hash}_{filename}"
     
-    # Use atomic write with temporary file
-    with tempfile.NamedTemporaryFile(delete=False) as tmp_file:
+    # Use atomic write with temporary file in the destination directory
+    with tempfile.NamedTemporaryFile(dir=file_path.parent, delete=False) as tmp_file:
         tmp_file.write(file_bytes)
         tmp_path = tmp_file.name
     
     # Move the temp file to the final location (atomic operation)
-    shutil.move(tmp_path, file_path)
+    os.replace(tmp_path, file_path)
+    return file_path, file_hash
+
 
-    # Process text into chunks with enhanced metadata
-    raw_chunks = chunk_text(extracted_text)
-    chunks = [{
+def build_chunk_metadatas(raw_chunks: List[str], memory_id: str, filename: str, title: str,
+                          tags: list, category: str, notes: str, file_size: int,
+                          file_path: Path, user_id: str, source: str = "file_upload") -> List[dict]:
+    """Build the per-chunk metadata stored alongside each FAISS vector.
+    
+    Args:
+        raw_chunks: Chunk texts
+        memory_id: ID of the memory the chunks belong to
+        filename: Original file name
+        title: User-provided title
+        tags: List of tags
+        category: File category
+        notes: Additional notes
+        file_size: File size in bytes
+        file_path: Stored file location
+        user_id: User identifier
+        source: How the memory was created
+        
+    Returns:
+        List of chunk metadata dicts, each carrying its text
+    """
+    return [{
         "text": c,
         "title": title or "",
         "tags": tags or [],
         "category": category or "",
         "notes": notes or "",
-        "filename": uploaded_file.name,
+        "filename": filename,
         "date_uploaded": datetime.now().isoformat(),
-        "file_size": len(file_bytes),
+        "file_size": file_size,
         "memory_id": memory_id,
         "version": 1,
         "access_count": 0,
@@ -228,39 +258,85 @@ def save_uploaded_file(uploaded_file, title: str, tags: list, category: str,
         "context": {
             "created_at": datetime.now().isoformat(),
             "created_by": user_id,
-            "source": "file_upload",
+            "source": source,
             "location": str(file_path)
         }
     } for c in raw_chunks]
 
-    # Generate embeddings
-    chunk_vectors = embed_and_store(chunks, user_id)
-
-    # Generate summary if possible
-    summary = auto_summarize(extracted_text, uploaded_file.name)
-    if summary:
-        summary_chunks = [{
-            "text": summary,
-            "title": f"Summary of {title or uploaded_file.name}",
-            "tags": tags + ["summary"],
-            "category": category,
-            "notes": "Auto-generated summary for this document.",
-            "filename": uploaded_file.name,
-            "date_uploaded": datetime.now().isoformat(),
-            "file_size": len(file_bytes),
-            "memory_id": f"{memory_id}_summary",
-            "version": 1,
-            "access_count": 0,
-            "last_accessed": datetime.now().isoformat(),
-            "relationships": [create_memory_relationship(f"{memory_id}_summary", memory_id, "summarizes")],
-            "context": {
-                "created_at": datetime.now().isoformat(),
-                "created_by": user_id,
-                "source": "auto_summary",
-                "location": str(file_path)
-            }
-        }]
-        embed_and_store(summary_chunks, user_id)
+
+def build_summary_chunks(summary: str, memory_id: str, filename: str, title: str, tags: list,
+                         category: str, file_size: int, file_path: Path, user_id: str) -> List[dict]:
+    """Build the chunk metadata for an auto-generated document summary.
+    
+    Args:
+        summary: Summary text
+        memory_id: ID of the summarized memory
+        filename: Original file name
+        title: User-provided title
+        tags: List of tags
+        category: File category
+        file_size: File size in bytes
+        file_path: Stored file location
+        user_id: User identifier
+        
+    Returns:
+        List with a single summary chunk metadata dict
+    """
+    return [{
+        "text": summary,
+        "title": f"Summary of {title or filename}",
+        "tags": (tags or []) + ["summary"],
+        "category": category,
+        "notes": "Auto-generated summary for this document.",
+        "filename": filename,
+        "date_uploaded": datetime.now().isoformat(),
+        "file_size": file_size,
+        "memory_id": f"{memory_id}_summary",
+        "version": 1,
+        "access_count": 0,
+        "last_accessed": datetime.now().isoformat(),
+        "relationships": [create_memory_relationship(f"{memory_id}_summary", memory_id, "summarizes")],
+        "context": {
+            "created_at": datetime.now().isoformat(),
+            "created_by": user_id,
+            "source": "auto_summary",
+            "location": str(file_path)
+        }
+    }]
+
+
+def build_memory_entry(memory_id: str, filename: str, file_path: Path, file_hash: str,
+                       file_size: int, title: str, tags: list, category: str, notes: str,
+                       extracted_text: str, chunks: List[dict], chunk_vectors: List[np.ndarray],
+                       user_id: str, source: str = "file_upload",
+                       summary_chunks: Optional[List[dict]] = None,
+                       summary_vectors: Optional[List[np.ndarray]] = None,
+                       embedding: Optional[dict] = None) -> dict:
+    """Build the memory index entry for a stored file.
+    
+    Args:
+        memory_id: Memory identifier
+        filename: Original file name
+        file_path: Stored file location
+        file_hash: Content hash of the file
+        file_size: File size in bytes
+        title: User-provided title
+        tags: List of tags
+        category: File category
+        notes: Additional notes
+        extracted_text: Text extracted from the file
+        chunks: Chunk metadata dicts
+        chunk_vectors: One embedding vector per chunk
+        user_id: User identifier
+        source: How the memory was created
+        summary_chunks: Auto summary chunk metadata dicts, if any
+        summary_vectors: One embedding vector per summary chunk
+        embedding: Model tag the vectors were embedded with
+        
+    Returns:
+        Memory entry dict
+    """
+    ext = Path(filename).suffix.lower().strip(".")
 
     # Calculate memory importance
     importance = calculate_memory_importance(extracted_text, {
@@ -269,10 +345,9 @@ def save_uploaded_file(uploaded_file, title: str, tags: list, category: str,
         "notes": notes
     })
 
-    # Create enhanced entry
-    entry = {
+    return {
         "id": memory_id,
-        "filename": uploaded_file.name,
+        "filename": filename,
         "filetype": ext,
         "filepath": str(file_path),
         "text_preview": extracted_text[:500],
@@ -281,12 +356,18 @@ def save_uploaded_file(uploaded_file, title: str, tags: list, category: str,
             {"text": chunk, "vector": sanitize_vector(vec)}
             for chunk, vec in zip(chunks, chunk_vectors)
         ],
+        # Kept so the FAISS index can be rebuilt without re-embedding
+        "summary_chunks": [
+            {"text": chunk, "vector": sanitize_vector(vec)}
+            for chunk, vec in zip(summary_chunks or [], summary_vectors or [])
+        ],
+        "embedding": embedding,
         "source_hash": file_hash,
         "title": title or "",
         "tags": tags or [],
         "category": category or "",
         "notes": notes or "",
-        "file_size": len(file_bytes),
+        "file_size": file_size,
         "preview_type": "text" if ext in ["txt", "pdf"] else "image" if ext in ["png", "jpg", "jpeg"] else "none",
         "importance": importance.value,
         "version": 1,
@@ -296,7 +377,7 @@ def save_uploaded_file(uploaded_file, title: str, tags: list, category: str,
         "context": {
             "created_at": datetime.now().isoformat(),
             "created_by": user_id,
-            "source": "file_upload",
+            "source": source,
             "location": str(file_path)
         },
         "temporal_metadata": {
@@ -307,30 +388,163 @@ def save_uploaded_file(uploaded_file, title: str, tags: list, category: str,
         }
     }
 
-    # Save with atomic write pattern
-    memory_path = get_memory_index_path(user_id)
-    try:
-        if memory_path.exists():
-            with open(memory_path, "r") as f:
-                try:
-                    index = json.load(f)
-                except json.JSONDecodeError:
-                    print(f"Warning: Corrupted memory index for user {user_id}. Creating new index.")
-                    index = []
-        else:
-            index = []
-    except Exception as e:
-        print(f"Error loading memory index: {str(e)}")
-        index = []
 
-    with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-        json.dump(index + [entry], tmp_file, indent=2)
-        tmp_path = tmp_file.name
+def _submit_embedding(texts: List[str], embedding: Dict[str, Any]) -> List[Future]:
+    """Embed texts in the embedding pool, one request of EMBED_BATCH_SIZE texts per future."""
+    return [_embedding_pool.submit(embed_text, texts[i:i + EMBED_BATCH_SIZE], embedding)
+            for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+
+
+@timed("save_uploaded_files")
+def save_uploaded_files(batch: List[dict], user_id: str,
+                        summarize: bool = True) -> List[Tuple[dict, Optional[str]]]:
+    """Process and save several uploaded files with a single commit.
+    
+    Ingestion runs as a small stage graph: each file is stored and chunked,
+    and its summary is requested as soon as its text is known. Chunks are
+    embedded, in parallel requests of EMBED_BATCH_SIZE, as soon as a
+    request's worth has been chunked, while the summaries are generated,
+    and the summaries are embedded together once they are all in, so a
+    file takes about as long as its slowest API calls rather than the sum
+    of them. index.faiss, metadata.json and memory_index.json are each
+    rewritten once for the whole batch.
     
-    # Atomic replace
-    shutil.move(tmp_path, memory_path)
+    Args:
+        batch: One dict per file with keys "file" (uploaded file object),
+            "title", "tags", "category", "notes" and "extracted_text"
+        user_id: User identifier
+        summarize: Whether to generate auto summaries for long documents
+        
+    Returns:
+        List of (file entry dict, summary text or None), in batch order
+    """
+    # Chunks and summaries are embedded with the model of the user's index
+    embedding = user_embedding(user_id)
+    chunk_texts: List[str] = []
+    chunk_futures: List[Future] = []
+    prepared = []
+    for item in batch:
+        uploaded_file = item["file"]
+        file_bytes = read_upload_bytes(uploaded_file)
+        file_path, file_hash = store_user_file(file_bytes, uploaded_file.name, user_id)
+        memory_id = str(uuid.uuid4())
+        tags = item.get("tags") or []
+        extracted_text = item.get("extracted_text", "")
+
+        # Start the summary while the remaining files are stored and chunked
+        summary_future = _summary_pool.submit(auto_summarize, extracted_text, uploaded_file.name) if summarize else None
+
+        # Process text into chunks with enhanced metadata
+        chunks = build_chunk_metadatas(
+            chunk_text(extracted_text), memory_id, uploaded_file.name, item.get("title"), tags,
+            item.get("category"), item.get("notes"), len(file_bytes), file_path, user_id
+        )
+
+        # Embed every full request's worth of chunks while the remaining
+        # files are stored and chunked
+        chunk_texts += [c["text"] for c in chunks]
+        submitted = len(chunk_futures) * EMBED_BATCH_SIZE
+        full = submitted + (len(chunk_texts) - submitted) // EMBED_BATCH_SIZE * EMBED_BATCH_SIZE
+        chunk_futures += _submit_embedding(chunk_texts[submitted:full], embedding)
+
+        prepared.append({
+            "item": item,
+            "memory_id": memory_id,
+            "filename": uploaded_file.name,
+            "file_path": file_path,
+            "file_hash": file_hash,
+            "file_size": len(file_bytes),
+            "tags": tags,
+            "extracted_text": extracted_text,
+            "chunks": chunks,
+            "summary_future": summary_future
+        })
+
+    # The rest of the chunks, embedded while the summaries are still being written
+    chunk_futures += _submit_embedding(chunk_texts[len(chunk_futures) * EMBED_BATCH_SIZE:], embedding)
+
+    for p in prepared:
+        item = p["item"]
+        p["summary"] = p.pop("summary_future").result() if p["summary_future"] else None
+        p["summary_chunks"] = build_summary_chunks(
+            p["summary"], p["memory_id"], p["filename"], item.get("title"), p["tags"],
+            item.get("category"), p["file_size"], p["file_path"], user_id
+        ) if p["summary"] else []
+    summary_texts = [c["text"] for p in prepared for c in p["summary_chunks"]]
+    summary_vectors = embed_text(summary_texts, embedding) if summary_texts else []
+    chunk_vectors = [v for f in chunk_futures for v in f.result()]
+
+    # A re-embedding job may switch the user's model between embedding and
+    # committing; the commit is then rejected and the batch embedded again
+    for attempt in range(2):
+        all_metadatas = []
+        all_vectors = []
+        results = []
+        entries = []
+        chunk_offset = 0
+        summary_offset = 0
+        for p in prepared:
+            file_chunk_vectors = chunk_vectors[chunk_offset:chunk_offset + len(p["chunks"])]
+            chunk_offset += len(p["chunks"])
+            file_summary_vectors = summary_vectors[summary_offset:summary_offset + len(p["summary_chunks"])]
+            summary_offset += len(p["summary_chunks"])
+            all_metadatas += p["chunks"] + p["summary_chunks"]
+            all_vectors += list(file_chunk_vectors) + list(file_summary_vectors)
+            item = p["item"]
+            entry = build_memory_entry(
+                p["memory_id"], p["filename"], p["file_path"], p["file_hash"], p["file_size"],
+                item.get("title"), p["tags"], item.get("category"), item.get("notes"),
+                p["extracted_text"], p["chunks"], file_chunk_vectors, user_id,
+                summary_chunks=p["summary_chunks"], summary_vectors=file_summary_vectors, embedding=embedding
+            )
+            entries.append(entry)
+            results.append((entry, p["summary"]))
+
+        # Commit vectors, chunk metadata and memory entries once for the batch
+        try:
+            commit(user_id, MemoryMutation(vectors=all_vectors, metadatas=all_metadatas, new_entries=entries,
+                                           embedding=embedding))
+            break
+        except EmbeddingMismatchError:
+            if attempt:
+                raise
+            embedding = user_embedding(user_id)
+            chunk_vectors = [v for f in _submit_embedding(chunk_texts, embedding) for v in f.result()]
+            summary_vectors = embed_text(summary_texts, embedding) if summary_texts else []
+
+    # Thumbnails are rendered in the background; views pick them up once ready
+    schedule_thumbnails(user_id, entries)
 
-    return entry, summary
+    for entry in entries:
+        increment("files_ingested_total", labels={"filetype": entry["filetype"]})
+    return results
+
+
+@timed("save_uploaded_file")
+def save_uploaded_file(uploaded_file, title: str, tags: list, category: str, 
+                      notes: str, user_id: str, extracted_text: str) -> Tuple[dict, Optional[str]]:
+    """Process and save an uploaded file with enhanced metadata.
+    
+    Args:
+        uploaded_file: Streamlit uploaded file object
+        title: User-provided title
+        tags: List of tags
+        category: File category
+        notes: Additional notes
+        user_id: User identifier
+        extracted_text: Pre-extracted text content
+        
+    Returns:
+        Tuple of (file entry dict, summary text or None)
+    """
+    return save_uploaded_files([{
+        "file": uploaded_file,
+        "title": title,
+        "tags": tags,
+        "category": category,
+        "notes": notes,
+        "extracted_text": extracted_text
+    }], user_id)[0]
 
 def update_memory_access(memory_id: str, user_id: str) -> None:
     """Update access statistics for a memory.
@@ -339,26 +553,13 @@ def update_memory_access(memory_id: str, user_id: str) -> None:
         memory_id: ID of the memory to update
         user_id: User identifier
     """
-    memory_path = get_memory_index_path(user_id)
-    if not memory_path.exists():
-        return
-
-    with open(memory_path, "r") as f:
-        index = json.load(f)
-
-    for entry in index:
-        if entry["id"] == memory_id:
-            entry["access_count"] += 1
-            entry["last_accessed"] = datetime.now().isoformat()
-            entry["temporal_metadata"]["last_accessed"] = datetime.now().isoformat()
-            entry["temporal_metadata"]["access_count"] += 1
-            break
+    def touch(entry: dict) -> None:
+        entry["access_count"] += 1
+        entry["last_accessed"] = datetime.now().isoformat()
+        entry["temporal_metadata"]["last_accessed"] = datetime.now().isoformat()
+        entry["temporal_metadata"]["access_count"] += 1
 
-    with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-        json.dump(index, tmp_file, indent=2)
-        tmp_path = tmp_file.name
-    
-    shutil.move(tmp_path, memory_path)
+    update_memory_entry(user_id, memory_id, touch)
 
 def add_memory_relationship(source_id: str, target_id: str, relationship_type: str, 
                           description: str, user_id: str) -> None:
@@ -371,22 +572,91 @@ def add_memory_relationship(source_id: str, target_id: str, relationship_type: s
         description: Description of the relationship
         user_id: User identifier
     """
-    memory_path = get_memory_index_path(user_id)
-    if not memory_path.exists():
-        return
+    relationship = create_memory_relationship(source_id, target_id, relationship_type, description)
 
-    with open(memory_path, "r") as f:
-        index = json.load(f)
+    # Appended to the edge store; memory_index.json is not rewritten
+    commit(user_id, MemoryMutation(new_edges=[relationship]))
 
-    relationship = create_memory_relationship(source_id, target_id, relationship_type, description)
+def save_note(note_text: str, title: str, tags: list, category: str,
+              notes: str, user_id: str) -> dict:
+    """Embed and save a manually written memory note.
     
-    for entry in index:
-        if entry["id"] == source_id:
-            entry["relationships"].append(relationship)
-            break
-
-    with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-        json.dump(index, tmp_file, indent=2)
-        tmp_path = tmp_file.name
+    The chunk vectors and the memory index entry are committed together
+    under the user's writer lock.
     
-    shutil.move(tmp_path, memory_path)
+    Args:
+        note_text: Note content
+        title: User-provided title
+        tags: List of tags
+        category: Note category
+        notes: Additional notes
+        user_id: User identifier
+        
+    Returns:
+        The saved memory entry
+    """
+    memory_id = str(uuid.uuid4())
+    chunks = chunk_text(note_text)
+    embedding = user_embedding(user_id)
+    vectors = embed_text(chunks, embedding)
+
+    chunk_metadatas = [{
+        "text": c,
+        "title": title or "",
+        "tags": tags or [],
+        "category": category or "",
+        "notes": notes or "",
+        "filename": "",
+        "date_uploaded": datetime.now().isoformat(),
+        "memory_id": memory_id
+    } for c in chunks]
+
+    entry = {
+        "id": memory_id,
+        "filename": f"user_note_{datetime.now().isoformat()}.txt",
+        "filetype": "txt",
+        "filepath": "",
+        "text_preview": note_text[:500],
+        "date_uploaded": datetime.now().isoformat(),
+        "embedding_chunks": [
+            {"text": c, "vector": sanitize_vector(v)}
+            for c, v in zip(chunks, vectors)
+        ],
+        "embedding": embedding,
+        "source_hash": hashlib.md5(note_text.encode()).hexdigest(),
+        "title": title,
+        "tags": tags,
+        "category": category,
+        "notes": notes,
+        "file_size": len(note_text.encode()),
+        "importance": MemoryImportance.MEDIUM.value,
+        "version": 1,
+        "access_count": 0,
+        "last_accessed": datetime.now().isoformat(),
+        "relationships": [],
+        "context": {
+            "created_at": datetime.now().isoformat(),
+            "created_by": user_id,
+            "source": "manual_note",
+            "location": ""
+        },
+        "temporal_metadata": {
+            "created_at": datetime.now().isoformat(),
+            "modified_at": datetime.now().isoformat(),
+            "last_accessed": datetime.now().isoformat(),
+            "access_count": 0
+        }
+    }
+
+    try:
+        commit(user_id, MemoryMutation(vectors=vectors, metadatas=chunk_metadatas, new_entries=[entry],
+                                       embedding=embedding))
+    except EmbeddingMismatchError:
+        # The user's index was re-embedded with another model meanwhile
+        embedding = user_embedding(user_id)
+        vectors = embed_text(chunks, embedding)
+        entry["embedding"] = embedding
+        entry["embedding_chunks"] = [{"text": c, "vector": sanitize_vector(v)} for c, v in zip(chunks, vectors)]
+        commit(user_id, MemoryMutation(vectors=vectors, metadatas=chunk_metadatas, new_entries=[entry],
+                                       embedding=embedding))
+    return entry
@@ -0,0 +1,240 @@
+import json
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from core.user_paths import get_memory_index_path, get_stats_path
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 2: dropped with_relationships; relationships live in the edge store
+STATS_SCHEMA_VERSION = 2
+# Most recently accessed memories kept in the sidecar
+RECENT_SIZE = 20
+
+
+def empty_stats() -> Dict[str, Any]:
+    return {
+        "schema_version": STATS_SCHEMA_VERSION,
+        "version": 0,
+        "source": None,
+        "total_memories": 0,
+        "total_size": 0,
+        "categories": {},
+        "importance": {},
+        "tags": {},
+        "last_accessed_days": {},
+        "recent": []
+    }
+
+
+def _last_accessed(entry: Dict[str, Any]) -> str:
+    return entry.get("temporal_metadata", {}).get("last_accessed", "")
+
+
+def contribution(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Summarize what one memory entry adds to the stats.
+
+    Captured before and after an in-place update so the change can be
+    applied as a delta.
+
+    Args:
+        entry: Memory entry
+
+    Returns:
+        The entry's contribution
+    """
+    return {
+        "size": entry.get("file_size", 0) or 0,
+        "category": entry.get("category", "uncategorized"),
+        "importance": str(entry.get("importance", 3)),
+        "tags": list(entry.get("tags") or []),
+        "day": _last_accessed(entry)[:10],
+        "recent": {
+            "id": entry.get("id"),
+            "title": entry.get("title", "Untitled"),
+            "category": entry.get("category", "uncategorized"),
+            "text_preview": (entry.get("text_preview") or "")[:200],
+            "last_accessed": _last_accessed(entry),
+            "access_count": entry.get("access_count", 0),
+            "importance": entry.get("importance", 3)
+        }
+    }
+
+
+def _bump(counts: Dict[str, int], key: str, delta: int) -> None:
+    value = counts.get(key, 0) + delta
+    if value > 0:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
+
+def _apply(stats: Dict[str, Any], c: Dict[str, Any], sign: int) -> None:
+    stats["total_memories"] += sign
+    stats["total_size"] += sign * c["size"]
+    _bump(stats["categories"], c["category"], sign)
+    _bump(stats["importance"], c["importance"], sign)
+    for tag in c["tags"]:
+        _bump(stats["tags"], tag, sign)
+    if c["day"]:
+        _bump(stats["last_accessed_days"], c["day"], sign)
+
+
+class StatsUpdater:
+    """Applies memory index changes to the stats sidecar as O(1) deltas.
+
+    Only the recent list can need a rescan: when one of its members is
+    removed or ages out, it is refilled from the index that the writer
+    already holds in memory.
+    """
+
+    def __init__(self, stats: Dict[str, Any]):
+        self.stats = stats
+        self.recent_dirty = False
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        c = contribution(entry)
+        _apply(self.stats, c, 1)
+        self._upsert_recent(c["recent"])
+
+    def remove(self, entry: Dict[str, Any]) -> None:
+        c = contribution(entry)
+        _apply(self.stats, c, -1)
+        recent = self.stats["recent"]
+        kept = [r for r in recent if r["id"] != c["recent"]["id"]]
+        if len(kept) != len(recent):
+            self.stats["recent"] = kept
+            self.recent_dirty = True
+
+    def update(self, before: Dict[str, Any], entry: Dict[str, Any]) -> None:
+        after = contribution(entry)
+        _apply(self.stats, before, -1)
+        _apply(self.stats, after, 1)
+        self._upsert_recent(after["recent"])
+
+    def _upsert_recent(self, item: Dict[str, Any]) -> None:
+        recent = [r for r in self.stats["recent"] if r["id"] != item["id"]]
+        was_member = len(recent) != len(self.stats["recent"])
+        recent.append(item)
+        recent.sort(key=lambda r: r["last_accessed"], reverse=True)
+        if len(recent) > RECENT_SIZE:
+            # A member whose timestamp moved backwards may have lost its place
+            # to an entry outside the list
+            if was_member and recent[-1]["id"] == item["id"]:
+                self.recent_dirty = True
+            del recent[RECENT_SIZE:]
+        self.stats["recent"] = recent
+
+    def finish(self, index: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Refill the recent list if needed and bump the stats version.
+
+        Args:
+            index: The memory index after the changes
+
+        Returns:
+            Updated stats
+        """
+        if self.recent_dirty or (len(self.stats["recent"]) < RECENT_SIZE
+                                 and len(self.stats["recent"]) < len(index)):
+            self.stats["recent"] = _recent_from_index(index)
+        self.stats["version"] += 1
+        return self.stats
+
+
+def _recent_from_index(index: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    top = heapq.nlargest(RECENT_SIZE, index, key=_last_accessed)
+    return [contribution(e)["recent"] for e in top]
+
+
+def compute_stats(index: List[Dict[str, Any]], version: int = 0) -> Dict[str, Any]:
+    """Compute stats from scratch for a whole memory index.
+
+    Args:
+        index: Memory entries
+        version: Version to assign
+
+    Returns:
+        Stats dict
+    """
+    stats = empty_stats()
+    for entry in index:
+        _apply(stats, contribution(entry), 1)
+    stats["recent"] = _recent_from_index(index)
+    stats["version"] = version
+    return stats
+
+
+def source_key(user_id: str) -> Optional[List[int]]:
+    """Identify the memory index file the stats were computed from."""
+    path = get_memory_index_path(user_id)
+    if not path.exists():
+        return None
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def read_stats_file(user_id: str) -> Optional[Dict[str, Any]]:
+    path = get_stats_path(user_id)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r") as f:
+            stats = json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        logger.warning(f"Ignoring unreadable stats for user {user_id}: {str(e)}")
+        return None
+    if stats.get("schema_version") != STATS_SCHEMA_VERSION:
+        return None
+    return stats
+
+
+def load_stats(user_id: str) -> Dict[str, Any]:
+    """Return a user's memory statistics.
+
+    Reads the sidecar maintained by the commit path. If it is missing or
+    was computed from a different memory index file (e.g. one edited by
+    hand), it is recomputed once and saved.
+
+    Args:
+        user_id: User identifier
+
+    Returns:
+        Stats dict with a "version" that changes whenever the stats do
+    """
+    stats = read_stats_file(user_id)
+    key = source_key(user_id)
+    if stats is not None and stats.get("source") == key:
+        return stats
+    if key is None:
+        return empty_stats()
+
+    # Imported lazily: commit_queue imports this module
+    from core.commit_queue import atomic_write_json, load_memory_index, user_write_lock
+    with user_write_lock(user_id):
+        stats = read_stats_file(user_id)
+        key = source_key(user_id)
+        if stats is not None and stats.get("source") == key:
+            return stats
+        previous_version = stats.get("version", 0) if stats else 0
+        stats = compute_stats(load_memory_index(user_id), previous_version + 1)
+        stats["source"] = key
+        atomic_write_json(get_stats_path(user_id), stats)
+    return stats
+
+
+def recent_activity(stats: Dict[str, Any], days: int = 7) -> int:
+    """Count memories last accessed within the given number of calendar days.
+
+    Args:
+        stats: Stats dict
+        days: Window length
+
+    Returns:
+        Memory count
+    """
+    cutoff = (datetime.now() - timedelta(days=days)).date().isoformat()
+    return sum(count for day, count in stats["last_accessed_days"].items() if day >= cutoff)
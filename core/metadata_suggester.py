@@ -1,17 +1,12 @@
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
 import json
 import logging
 from typing import Dict, Any, Optional
+from core.llm_client import chat
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-load_dotenv()
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 def generate_metadata(text: str, filename: str) -> Dict[str, Any]:
     """Generate suggested metadata based on file content.
     
@@ -48,7 +43,8 @@ def generate_metadata(text: str, filename: str) -> Dict[str, Any]:
     )
 
     try:
-        response = client.chat.completions.create(
+        response = chat(
+            "metadata",
             model="gpt-4o-mini",
             messages=[
                 {"role": "system", "content": """
@@ -69,8 +65,7 @@ def generate_metadata(text: str, filename: str) -> Dict[str, Any]:
                 Ensure your output is *only* the JSON object, with no conversational text or markdown wrappers.
                 """},
                 {"role": "user", "content": prompt}
-            ],
-            timeout=10  # Add timeout to prevent hanging
+            ]
         )
 
         raw_content = response.choices[0].message.content.strip()
@@ -0,0 +1,307 @@
+import os
+import time
+import threading
+import logging
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+METRIC_PREFIX = "memobrain"
+
+# Histogram bucket upper bounds in seconds, tuned for anything from a chunking
+# pass (milliseconds) to an OCR run or LLM call (tens of seconds)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_enabled = os.getenv("MEMOBRAIN_METRICS", "").lower() in ("1", "true", "yes")
+_lock = threading.Lock()
+_NULL_SPAN = nullcontext()
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative latency histogram in the Prometheus bucket layout."""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+
+# name -> labels -> metric
+_histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+_counters: Dict[str, Dict[LabelKey, float]] = {}
+_gauges: Dict[str, Dict[LabelKey, float]] = {}
+
+
+def metrics_enabled() -> bool:
+    """Return True if metric collection is switched on."""
+    return _enabled
+
+
+def enable_metrics(enabled: bool = True) -> None:
+    """Turn metric collection on or off at runtime.
+
+    Args:
+        enabled: New state
+    """
+    global _enabled
+    _enabled = enabled
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items())) if labels else ()
+
+
+def observe(stage: str, seconds: float, name: str = "stage_duration_seconds") -> None:
+    """Record one duration observation for a pipeline stage.
+
+    Args:
+        stage: Stage label, e.g. "embed_text"
+        seconds: Observed duration
+        name: Histogram name without the memobrain_ prefix
+    """
+    if not _enabled:
+        return
+    key = _label_key({"stage": stage})
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        if key not in series:
+            series[key] = Histogram()
+        series[key].observe(seconds)
+
+
+def increment(name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None) -> None:
+    """Increase a counter.
+
+    Args:
+        name: Counter name without the memobrain_ prefix, ending in _total
+        value: Amount to add
+        labels: Optional label values
+    """
+    if not _enabled:
+        return
+    key = _label_key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0.0) + value
+
+
+def set_gauge(name: str, value: float, labels: Optional[Dict[str, str]] = None) -> None:
+    """Set a gauge to an absolute value.
+
+    Args:
+        name: Gauge name without the memobrain_ prefix
+        value: New value
+        labels: Optional label values
+    """
+    if not _enabled:
+        return
+    with _lock:
+        _gauges.setdefault(name, {})[_label_key(labels)] = value
+
+
+@contextmanager
+def _timed_span(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        increment("stage_errors_total", labels={"stage": stage})
+        raise
+    finally:
+        observe(stage, time.perf_counter() - start)
+
+
+def span(stage: str):
+    """Context manager timing a block as one pipeline stage.
+
+    Returns a shared no-op context when metrics are disabled, so wrapping hot
+    paths costs a flag check and nothing more.
+
+    Args:
+        stage: Stage label
+
+    Returns:
+        Context manager
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _timed_span(stage)
+
+
+def timed(stage: str):
+    """Decorator timing every call of a function as a pipeline stage.
+
+    Args:
+        stage: Stage label
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _timed_span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def reset_metrics() -> None:
+    """Drop all collected series."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+def render_prometheus() -> str:
+    """Render all collected metrics in the Prometheus text exposition format.
+
+    Returns:
+        Exposition text
+    """
+    lines = []
+    with _lock:
+        for name, series in sorted(_histograms.items()):
+            full_name = f"{METRIC_PREFIX}_{name}"
+            lines.append(f"# TYPE {full_name} histogram")
+            for key, hist in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(hist.buckets, hist.counts):
+                    cumulative += count
+                    lines.append(f"{full_name}_bucket{_format_labels(key, ('le', _format_bound(bound)))} {cumulative}")
+                lines.append(f"{full_name}_bucket{_format_labels(key, ('le', '+Inf'))} {hist.count}")
+                lines.append(f"{full_name}_sum{_format_labels(key)} {hist.total}")
+                lines.append(f"{full_name}_count{_format_labels(key)} {hist.count}")
+        for kind, store in (("counter", _counters), ("gauge", _gauges)):
+            for name, series in sorted(store.items()):
+                full_name = f"{METRIC_PREFIX}_{name}"
+                lines.append(f"# TYPE {full_name} {kind}")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{full_name}{_format_labels(key)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: Union[str, Path]) -> None:
+    """Write the current metrics to a file, e.g. for the node_exporter textfile collector.
+
+    Args:
+        path: Destination file, replaced atomically
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(path.name + ".temp")
+    temp_path.write_text(render_prometheus(), encoding="utf-8")
+    os.replace(temp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_file_writer: Optional[threading.Thread] = None
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve /metrics over HTTP from a daemon thread. Safe to call repeatedly.
+
+    Args:
+        port: Port to listen on
+        host: Interface to bind, localhost by default
+
+    Returns:
+        The running server
+    """
+    global _server
+    with _lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+            logger.info(f"Metrics available at http://{host}:{port}/metrics")
+    return _server
+
+
+def start_metrics_file_writer(path: Union[str, Path], interval: float = 15.0) -> None:
+    """Periodically write metrics to a file from a daemon thread. Safe to call repeatedly.
+
+    Args:
+        path: Destination file
+        interval: Seconds between writes
+    """
+    global _file_writer
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            try:
+                write_prometheus(path)
+            except Exception as e:
+                logger.error(f"Error writing metrics file: {str(e)}")
+
+    with _lock:
+        if _file_writer is None:
+            _file_writer = threading.Thread(target=loop, daemon=True)
+            _file_writer.start()
+
+
+def start_exporters_from_env() -> None:
+    """Start the exporters configured by environment variables.
+
+    MEMOBRAIN_METRICS=1 enables collection, MEMOBRAIN_METRICS_PORT serves
+    /metrics on localhost and MEMOBRAIN_METRICS_FILE writes a text file.
+    """
+    if not _enabled:
+        return
+    port = os.getenv("MEMOBRAIN_METRICS_PORT")
+    if port:
+        try:
+            start_metrics_server(int(port))
+        except OSError as e:
+            # Another process (e.g. a second Streamlit worker) already owns the port
+            logger.warning(f"Could not start metrics server on port {port}: {str(e)}")
+    metrics_file = os.getenv("MEMOBRAIN_METRICS_FILE")
+    if metrics_file:
+        start_metrics_file_writer(metrics_file, float(os.getenv("MEMOBRAIN_METRICS_INTERVAL", "15")))
@@ -1,12 +1,11 @@
-import pymupdf4llm
-import pytesseract
-from pdf2image import convert_from_path
-from PIL import Image
+# pymupdf4llm, pytesseract and pdf2image take about a second to import
+# together, so they are imported by the functions that use them
 from pathlib import Path
 import os
 import platform
 from typing import List, Optional
 import logging
+from core.metrics import timed
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -22,6 +21,7 @@ def get_poppler_path() -> Optional[str]:
         return os.path.join(os.getcwd(), "poppler", "bin")
     return None
 
+@timed("extract_text")
 def extract_text(file_path: Path, ext: str) -> str:
     """Extract text from various file types.
     
@@ -60,12 +60,14 @@ def extract_pdf_text(file_path: Path) -> str:
     Returns:
         Extracted text content
     """
+    import pymupdf4llm
     try:
         return pymupdf4llm.to_markdown(str(file_path))
     except Exception as e:
         logger.error(f"Error extracting PDF text: {str(e)}")
         return ""
 
+@timed("ocr")
 def extract_pdf_text_with_ocr(file_path: Path) -> str:
     """Extract text from PDF using OCR as a fallback method.
     
@@ -75,6 +77,8 @@ def extract_pdf_text_with_ocr(file_path: Path) -> str:
     Returns:
         Extracted text content
     """
+    import pytesseract
+    from pdf2image import convert_from_path
     try:
         pages = convert_from_path(file_path, dpi=300, poppler_path=get_poppler_path())
         text = ""
@@ -85,6 +89,7 @@ def extract_pdf_text_with_ocr(file_path: Path) -> str:
         logger.error(f"Error extracting PDF text with OCR: {str(e)}")
         return ""
 
+@timed("ocr")
 def extract_image_text(file_path: Path) -> str:
     """Extract text from images using OCR.
     
@@ -94,6 +99,8 @@ def extract_image_text(file_path: Path) -> str:
     Returns:
         Extracted text content
     """
+    import pytesseract
+    from PIL import Image
     try:
         image = Image.open(file_path)
         return pytesseract.image_to_string(image).strip()
@@ -101,6 +108,7 @@ def extract_image_text(file_path: Path) -> str:
         logger.error(f"Error extracting image text: {str(e)}")
         return ""
 
+@timed("chunk_text")
 def chunk_text(text: str, max_words: int = 200, overlap: int = 40) -> List[str]:
     """Split text into overlapping word chunks for better semantic search.
     
@@ -0,0 +1,123 @@
+"""Bounded, paged previews of text and PDF files.
+
+Previews never read a whole file: text files are read one byte range at a
+time and PDFs one page at a time. Extracted PDF page text is cached on disk
+under the file's source_hash, so paging back and forth, or reopening the
+preview in another session, does not parse the page again.
+"""
+import os
+import shutil
+import tempfile
+import logging
+from pathlib import Path
+from typing import Optional, Union
+
+from core.user_paths import get_preview_cache_dir
+from core.metrics import increment, timed
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Bytes of a text file shown per preview page
+TEXT_PAGE_SIZE = int(os.getenv("MEMOBRAIN_PREVIEW_PAGE_BYTES", str(32 * 1024)))
+
+
+def _is_continuation(byte: int) -> bool:
+    return byte & 0xC0 == 0x80
+
+
+def text_page_count(path: Union[str, Path], page_size: int = TEXT_PAGE_SIZE) -> int:
+    size = os.path.getsize(path)
+    return max(1, -(-size // page_size))
+
+
+def read_text_page(path: Union[str, Path], page: int, page_size: int = TEXT_PAGE_SIZE) -> str:
+    """Read one page of a text file.
+
+    Pages are fixed byte ranges. A UTF-8 character that straddles a page
+    boundary is shown on the page where it starts, so consecutive pages
+    join up to the original text.
+
+    Args:
+        path: Text file
+        page: Zero-based page number
+        page_size: Bytes per page
+
+    Returns:
+        Decoded page text
+    """
+    start = page * page_size
+    with open(path, "rb") as f:
+        f.seek(start)
+        # A UTF-8 character is at most 4 bytes, so 3 extra bytes complete
+        # the last one
+        data = f.read(page_size + 3)
+    head = 0
+    if start:
+        while head < min(3, len(data)) and _is_continuation(data[head]):
+            head += 1
+    end = min(page_size, len(data))
+    while end < len(data) and _is_continuation(data[end]):
+        end += 1
+    return data[head:end].decode("utf-8", errors="replace")
+
+
+def pdf_page_count(path: Union[str, Path]) -> int:
+    import pymupdf
+    # Opening only reads the cross-reference table, not the pages
+    with pymupdf.open(str(path)) as doc:
+        return doc.page_count
+
+
+@timed("preview_pdf_page")
+def _extract_pdf_page(path: Union[str, Path], page: int) -> str:
+    import pymupdf
+    with pymupdf.open(str(path)) as doc:
+        return doc[page].get_text(sort=True)
+
+
+def _page_cache_path(user_id: str, source_hash: str, page: int) -> Path:
+    path = get_preview_cache_dir(user_id) / source_hash
+    path.mkdir(exist_ok=True)
+    return path / f"page_{page}.txt"
+
+
+def remove_preview_cache(user_id: str, source_hash: str) -> None:
+    """Delete the cached page text of a file, once no memory has that content any more."""
+    if source_hash:
+        shutil.rmtree(get_preview_cache_dir(user_id) / source_hash, ignore_errors=True)
+
+
+def read_pdf_page(path: Union[str, Path], page: int, user_id: Optional[str] = None,
+                  source_hash: Optional[str] = None) -> str:
+    """Return the text of one PDF page.
+
+    Args:
+        path: PDF file
+        page: Zero-based page number
+        user_id: User identifier, enables the page text cache
+        source_hash: Content hash of the file, enables the page text cache
+
+    Returns:
+        Page text
+    """
+    if not (user_id and source_hash):
+        return _extract_pdf_page(path, page)
+
+    cache_path = _page_cache_path(user_id, source_hash, page)
+    try:
+        text = cache_path.read_text(encoding="utf-8")
+        increment("preview_cache_hits_total")
+        return text
+    except FileNotFoundError:
+        increment("preview_cache_misses_total")
+
+    text = _extract_pdf_page(path, page)
+    with tempfile.NamedTemporaryFile(mode="w", encoding="utf-8", dir=cache_path.parent,
+                                     prefix=f".{cache_path.name}.", suffix=".tmp", delete=False) as tmp_file:
+        tmp_file.write(text)
+        tmp_path = tmp_file.name
+    os.replace(tmp_path, cache_path)
+    return text
+
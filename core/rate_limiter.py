@@ -0,0 +1,169 @@
+"""Process-wide, priority-aware rate limiting of API calls.
+
+Two token buckets, requests per minute and tokens per minute, are shared by
+every call in the process. Callers wait in one queue ordered by priority
+class and then arrival, and only the head of the queue may take from the
+buckets, so an interactive question waiting behind bulk ingestion gets the
+next free slot. Token costs are estimated before a call and corrected with
+the provider's reported usage afterwards; a 429 response pauses everyone
+for its back-off delay instead of letting each caller retry into the limit.
+
+Configuration (environment; 0 disables a limit):
+    MEMOBRAIN_LLM_RPM: requests per minute
+    MEMOBRAIN_LLM_TPM: tokens per minute
+
+Queue depth per priority (llm_queue_depth) and the time spent waiting
+(llm_rate_limit_wait_seconds) are exported through core.metrics.
+"""
+import os
+import time
+import heapq
+import itertools
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from core.metrics import increment, observe, set_gauge
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Defaults match the provider's lowest paid tier for embeddings
+REQUESTS_PER_MINUTE = float(os.getenv("MEMOBRAIN_LLM_RPM", "3000"))
+TOKENS_PER_MINUTE = float(os.getenv("MEMOBRAIN_LLM_TPM", "1000000"))
+
+# Priority classes, most urgent first
+INTERACTIVE = 0
+FOREGROUND = 1
+BACKGROUND = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", FOREGROUND: "foreground", BACKGROUND: "background"}
+
+
+class TokenBucket:
+    """Capacity refilled continuously at capacity per minute; the level may go negative (debt)."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount (at most the capacity) is available; 0 if it is now."""
+        if self.unlimited:
+            return 0.0
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        if not self.unlimited:
+            self.level -= amount
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits with a priority queue.
+
+    Args:
+        requests_per_minute: Request budget, 0 for unlimited
+        tokens_per_minute: Token budget, 0 for unlimited
+    """
+
+    def __init__(self, requests_per_minute: float = REQUESTS_PER_MINUTE,
+                 tokens_per_minute: float = TOKENS_PER_MINUTE):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0.0
+        self._condition = threading.Condition()
+        self._queue: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._depth: Dict[int, int] = {}
+
+    @property
+    def unlimited(self) -> bool:
+        return self.requests.unlimited and self.tokens.unlimited
+
+    def _set_depth(self, priority: int, change: int) -> None:
+        self._depth[priority] = self._depth.get(priority, 0) + change
+        set_gauge("llm_queue_depth", self._depth[priority], labels={"priority": PRIORITY_NAMES.get(priority, str(priority))})
+
+    def acquire(self, priority: int = FOREGROUND, tokens: float = 0) -> float:
+        """Wait for a request slot and tokens, ahead of every less urgent caller.
+
+        Args:
+            priority: Priority class, lower is more urgent
+            tokens: Estimated tokens of the call
+
+        Returns:
+            Seconds waited
+        """
+        start = time.monotonic()
+        if self.unlimited and self.paused_until <= start:
+            return 0.0
+        with self._condition:
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._queue, ticket)
+            self._set_depth(priority, 1)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self.requests.refill(now)
+                    self.tokens.refill(now)
+                    if self._queue[0] == ticket:
+                        wait = max(self.paused_until - now, self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                        if wait <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(tokens)
+                            break
+                    else:
+                        wait = None
+                    # Woken early when the queue or the pause changes
+                    self._condition.wait(wait)
+            finally:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+                self._set_depth(priority, -1)
+                self._condition.notify_all()
+
+        waited = time.monotonic() - start
+        name = PRIORITY_NAMES.get(priority, str(priority))
+        observe(name, waited, name="llm_rate_limit_wait_seconds")
+        if waited > 0.001:
+            increment("llm_rate_limited_total", labels={"priority": name})
+        return waited
+
+    def record_usage(self, estimated: float, actual: Optional[float]) -> None:
+        """Correct the token bucket once a call reports its actual usage."""
+        if actual is None or self.tokens.unlimited:
+            return
+        with self._condition:
+            self.tokens.take(actual - estimated)
+            self._condition.notify_all()
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller back for a while, e.g. after the provider answered 429."""
+        with self._condition:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self._condition.notify_all()
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide rate limiter."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
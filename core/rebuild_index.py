@@ -0,0 +1,263 @@
+"""Rebuild users' FAISS indexes and chunk metadata from memory_index.json.
+
+The vectors stored with every memory entry are reused, so no embedding API
+calls are made. memory_index.json is parsed one entry at a time and the
+chunk metadata is streamed to disk, so memory stays bounded by the FAISS
+index itself.
+
+Example:
+    python -m core.rebuild_index                # every user, in parallel
+    python -m core.rebuild_index --user alice   # a single user
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import faiss
+
+from core.commit_queue import atomic_write_index, user_write_lock
+from core.doc_index import remove_doc_index
+from core.compact_index import remove_compact_index
+from core.embedding_config import LEGACY_EMBEDDING, write_index_embedding
+from core.user_paths import get_faiss_index_path, get_memory_index_path, get_metadata_path
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+USERS_DIR = Path("data/users")
+READ_SIZE = 1 << 20
+ADD_BATCH_SIZE = 4096
+
+
+def iter_json_array(path: Path, read_size: int = READ_SIZE) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array without loading the whole file.
+
+    Args:
+        path: JSON file containing an array
+        read_size: Characters read per refill
+
+    Yields:
+        Parsed array elements
+
+    Raises:
+        ValueError: If the file is not a well-formed JSON array
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def fill(size: int = read_size) -> bool:
+            nonlocal buffer, pos, eof
+            if eof:
+                return False
+            data = f.read(size)
+            if not data:
+                eof = True
+                return False
+            buffer = buffer[pos:] + data
+            pos = 0
+            return True
+
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer) or not fill():
+                    return
+
+        skip_whitespace()
+        if pos >= len(buffer) or buffer[pos] != "[":
+            raise ValueError(f"{path} does not contain a JSON array")
+        pos += 1
+
+        expect_value = True
+        while True:
+            skip_whitespace()
+            if pos >= len(buffer):
+                raise ValueError(f"Unexpected end of {path}")
+            if buffer[pos] == "]":
+                return
+            if not expect_value:
+                if buffer[pos] != ",":
+                    raise ValueError(f"Expected ',' in {path}")
+                pos += 1
+                skip_whitespace()
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    # The element may be cut off at the end of the buffer; at
+                    # least double what is buffered so large entries are not
+                    # re-parsed once per read
+                    if not fill(max(read_size, len(buffer) - pos)):
+                        raise
+                    continue
+                # A number at the end of the buffer may continue in the next read
+                if end == len(buffer) and fill():
+                    continue
+                break
+            pos = end
+            expect_value = False
+            yield value
+
+
+def chunk_metadata(entry: Dict[str, Any], chunk: Any) -> Dict[str, Any]:
+    """Return the FAISS metadata for one stored chunk.
+
+    File uploads store the full chunk metadata dict as the chunk text; notes
+    store the plain chunk string, so its metadata is rebuilt from the entry.
+
+    Args:
+        entry: Memory entry the chunk belongs to
+        chunk: Stored chunk "text" value
+
+    Returns:
+        Chunk metadata dict
+    """
+    if isinstance(chunk, dict):
+        return chunk
+    is_note = entry.get("context", {}).get("source") == "manual_note"
+    return {
+        "text": chunk,
+        "title": entry.get("title") or "",
+        "tags": entry.get("tags") or [],
+        "category": entry.get("category") or "",
+        "notes": entry.get("notes") or "",
+        "filename": "" if is_note else entry.get("filename", ""),
+        "date_uploaded": entry.get("date_uploaded", ""),
+        "memory_id": entry.get("id")
+    }
+
+
+def rebuild_user_index(user_id: str) -> Dict[str, Any]:
+    """Rebuild one user's index.faiss and metadata.json from stored vectors.
+
+    Runs under the user's writer lock so no commit interleaves with the
+    rebuild; both files are replaced atomically.
+
+    Args:
+        user_id: User identifier
+
+    Returns:
+        Rebuild statistics
+    """
+    start = time.perf_counter()
+    memory_path = get_memory_index_path(user_id)
+    index_path = get_faiss_index_path(user_id)
+    metadata_path = get_metadata_path(user_id)
+    stats = {"user_id": user_id, "entries": 0, "vectors": 0, "skipped_chunks": 0}
+
+    with user_write_lock(user_id):
+        index = None
+        pending: List[List[float]] = []
+
+        def flush():
+            nonlocal index
+            if not pending:
+                return
+            vectors = np.array(pending, dtype="float32")
+            if index is None:
+                index = faiss.IndexFlatL2(vectors.shape[1])
+            index.add(vectors)
+            pending.clear()
+
+        with tempfile.NamedTemporaryFile(mode="w", dir=metadata_path.parent, prefix=f".{metadata_path.name}.",
+                                         suffix=".tmp", delete=False) as tmp_file:
+            tmp_path = tmp_file.name
+            try:
+                tmp_file.write("{")
+                dim = None
+                embedding = None
+                entries = iter_json_array(memory_path) if memory_path.exists() else iter([])
+                for entry in entries:
+                    stats["entries"] += 1
+                    # Entries from before tagging were embedded with the legacy model
+                    entry_embedding = entry.get("embedding") or LEGACY_EMBEDDING
+                    for chunk in entry.get("embedding_chunks", []) + entry.get("summary_chunks", []):
+                        vector = chunk.get("vector")
+                        if not vector or (dim is not None and (len(vector) != dim or entry_embedding != embedding)):
+                            stats["skipped_chunks"] += 1
+                            continue
+                        dim = len(vector)
+                        embedding = entry_embedding
+                        if stats["vectors"]:
+                            tmp_file.write(",")
+                        tmp_file.write(f'"{stats["vectors"]}":{json.dumps(chunk_metadata(entry, chunk.get("text")))}')
+                        pending.append(vector)
+                        stats["vectors"] += 1
+                        if len(pending) >= ADD_BATCH_SIZE:
+                            flush()
+                tmp_file.write("}")
+                flush()
+            except BaseException:
+                tmp_file.close()
+                os.remove(tmp_path)
+                raise
+
+        if index is not None:
+            atomic_write_index(index, index_path)
+            write_index_embedding(user_id, embedding)
+        elif index_path.exists():
+            os.remove(index_path)
+        os.replace(tmp_path, metadata_path)
+        # Rows were renumbered; the document and compact indexes are rebuilt on next use
+        remove_doc_index(user_id)
+        remove_compact_index(user_id)
+
+    stats["seconds"] = time.perf_counter() - start
+    if stats["skipped_chunks"]:
+        logger.warning(f"Skipped {stats['skipped_chunks']} chunk(s) without a usable vector for user {user_id}")
+    logger.info(f"Rebuilt index for user {user_id}: {stats['vectors']} vectors from "
+                f"{stats['entries']} entries in {stats['seconds']:.2f}s")
+    return stats
+
+
+def list_users() -> List[str]:
+    """Return the ids of all users with a memory index."""
+    if not USERS_DIR.exists():
+        return []
+    return sorted(p.name for p in USERS_DIR.iterdir() if (p / "memory_index.json").exists())
+
+
+def rebuild_all(user_ids: Optional[List[str]] = None, workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Rebuild several users' indexes in parallel, one user per process.
+
+    Args:
+        user_ids: Users to rebuild (default: every user)
+        workers: Worker processes (default: CPU count)
+
+    Returns:
+        Per-user rebuild statistics
+    """
+    user_ids = user_ids or list_users()
+    if len(user_ids) <= 1:
+        return [rebuild_user_index(u) for u in user_ids]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(rebuild_user_index, user_ids))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Rebuild FAISS indexes from stored memory vectors")
+    parser.add_argument("--user", action="append", dest="users", help="User to rebuild (repeatable, default: all)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = rebuild_all(args.users, args.workers)
+    total = sum(r["vectors"] for r in results)
+    print(f"✅ Rebuilt {len(results)} user index(es), {total} vectors in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
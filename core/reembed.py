@@ -0,0 +1,321 @@
+"""Migrate a user's memories to another embedding model in the background.
+
+Every stored chunk text is re-embedded with the target model into a shadow
+store under data/users/<id>/reembed/, while the existing index keeps
+serving queries and new ingests with the old model. Embedding is throttled
+to a number of texts per second so the job can run next to the app without
+exhausting the provider's rate limit.
+
+The shadow store is append-only (vectors.f32 plus one entries.jsonl line
+per re-embedded memory, written after its vectors), so an interrupted job
+resumes after the last memory it finished. Memories added since the job
+started are then caught up, still throttled and outside the user's writer
+lock, until only a few are left; those are embedded under the lock while
+the shadow index and chunk metadata are built and swapped in. Finally the
+memory entries get their new vectors so core.rebuild_index keeps working.
+
+Example:
+    MEMOBRAIN_EMBEDDING_MODEL=text-embedding-3-large python -m core.reembed --user alice --rate 500
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import faiss
+
+from core.commit_queue import (
+    MemoryMutation,
+    atomic_write_index,
+    atomic_write_json,
+    commit,
+    load_memory_index,
+    user_write_lock
+)
+from core.embedder import EMBED_BATCH_SIZE, embed_text
+from core.embedding_config import default_embedding, read_index_embedding, write_index_embedding
+from core.doc_index import remove_doc_index
+from core.compact_index import remove_compact_index
+from core.rebuild_index import ADD_BATCH_SIZE, chunk_metadata, iter_json_array, list_users
+from core.user_paths import get_faiss_index_path, get_memory_index_path, get_metadata_path, get_reembed_dir
+from core.metrics import increment
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Texts embedded per second; 0 disables throttling
+REEMBED_RATE = float(os.getenv("MEMOBRAIN_REEMBED_RATE", "200"))
+# Most texts embedded while holding the writer lock at swap time; with more
+# missing than this the lock is released and they are caught up first
+SWAP_MAX_TEXTS = int(os.getenv("MEMOBRAIN_REEMBED_SWAP_MAX_TEXTS", str(EMBED_BATCH_SIZE)))
+
+
+def chunk_texts(entry: Dict[str, Any]) -> List[str]:
+    """Texts of a memory's chunks and summary chunks, in FAISS row order."""
+    texts = []
+    for chunk in entry.get("embedding_chunks", []) + entry.get("summary_chunks", []):
+        text = chunk.get("text")
+        # File uploads store the whole chunk metadata dict as the chunk text
+        texts.append(text.get("text", "") if isinstance(text, dict) else (text or ""))
+    return texts
+
+
+class Throttle:
+    """Spaces out work so that at most rate items per second are processed."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.next_time = time.monotonic()
+
+    def wait(self, items: int) -> None:
+        if not self.rate:
+            return
+        now = time.monotonic()
+        if self.next_time > now:
+            time.sleep(self.next_time - now)
+        self.next_time = max(self.next_time, now) + items / self.rate
+
+
+class ShadowStore:
+    """Re-embedded vectors of a migration in progress, persisted for resuming."""
+
+    def __init__(self, user_id: str, embedding: Dict[str, Any]):
+        self.dir = get_reembed_dir(user_id)
+        self.embedding = embedding
+        self.vectors_path = self.dir / "vectors.f32"
+        self.entries_path = self.dir / "entries.jsonl"
+        manifest_path = self.dir / "manifest.json"
+
+        manifest = None
+        if manifest_path.exists():
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+        if manifest is None or manifest.get("embedding") != embedding:
+            # Nothing started yet, or a migration to another model: start over
+            self.clear()
+            self.dir.mkdir(parents=True, exist_ok=True)
+            atomic_write_json(manifest_path, {"embedding": embedding, "started_at": time.time()})
+
+        # memory id -> (first row, row count) in vectors.f32
+        self.offsets: Dict[str, Tuple[int, int]] = {}
+        self.rows = 0
+        if self.entries_path.exists():
+            with open(self.entries_path, "r") as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break
+                    record = json.loads(line)
+                    self.offsets[record["id"]] = (self.rows, record["count"])
+                    self.rows += record["count"]
+        # Drop vectors written after the last recorded memory by a crashed run
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(self.rows * self.row_bytes)
+
+    @property
+    def row_bytes(self) -> int:
+        return self.embedding["dim"] * 4
+
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self.offsets
+
+    def append(self, memory_ids: List[str], counts: List[int], vectors: np.ndarray) -> None:
+        """Persist the vectors of some memories; vectors first, so a crash never records missing ones."""
+        with open(self.vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        with open(self.entries_path, "a") as f:
+            for memory_id, count in zip(memory_ids, counts):
+                f.write(json.dumps({"id": memory_id, "count": count}) + "\n")
+                self.offsets[memory_id] = (self.rows, count)
+                self.rows += count
+            f.flush()
+            os.fsync(f.fileno())
+
+    def vectors(self, memory_id: str) -> np.ndarray:
+        start, count = self.offsets[memory_id]
+        with open(self.vectors_path, "rb") as f:
+            f.seek(start * self.row_bytes)
+            data = f.read(count * self.row_bytes)
+        return np.frombuffer(data, dtype=np.float32).reshape(count, self.embedding["dim"])
+
+    def clear(self) -> None:
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def _embed_into(shadow: ShadowStore, entries: List[Tuple[str, List[str]]], throttle: Optional[Throttle]) -> None:
+    texts = [text for _, entry_texts in entries for text in entry_texts]
+    if throttle:
+        throttle.wait(len(texts))
+    vectors = embed_text(texts, shadow.embedding, strict=True) if texts else []
+    array = np.array(vectors, dtype=np.float32).reshape(len(texts), shadow.embedding["dim"])
+    shadow.append([memory_id for memory_id, _ in entries], [len(t) for _, t in entries], array)
+    increment("reembedded_texts_total", len(texts))
+
+
+def _embed_batches(shadow: ShadowStore, entries: Iterable[Tuple[str, List[str]]], throttle: Optional[Throttle],
+                   batch_size: int) -> None:
+    pending: List[Tuple[str, List[str]]] = []
+    pending_texts = 0
+    for memory_id, texts in entries:
+        pending.append((memory_id, texts))
+        pending_texts += len(texts)
+        if pending_texts >= batch_size:
+            _embed_into(shadow, pending, throttle)
+            pending, pending_texts = [], 0
+    if pending:
+        _embed_into(shadow, pending, throttle)
+
+
+def _missing(index: List[Dict[str, Any]], shadow: ShadowStore) -> List[Tuple[str, List[str]]]:
+    """Memories not re-embedded yet, e.g. added since the job started, with their chunk texts."""
+    return [(entry.get("id"), chunk_texts(entry)) for entry in index if entry.get("id") not in shadow]
+
+
+def _set_vectors(entry: Dict[str, Any], vectors: np.ndarray, embedding: Dict[str, Any]) -> None:
+    for chunk, vector in zip(entry.get("embedding_chunks", []) + entry.get("summary_chunks", []), vectors):
+        chunk["vector"] = vector.tolist()
+    entry["embedding"] = dict(embedding)
+
+
+def _swap_locked(user_id: str, shadow: ShadowStore) -> Optional[Tuple[List[Dict[str, Any]], int, int]]:
+    """Build the shadow index and metadata and replace the serving ones.
+
+    Returns:
+        Tuple of (memory entries, vectors, memories embedded under the lock),
+        or None without swapping if too many memories are still missing
+    """
+    with user_write_lock(user_id):
+        index = load_memory_index(user_id)
+        missing = _missing(index, shadow)
+        if sum(len(texts) for _, texts in missing) > SWAP_MAX_TEXTS:
+            return None
+        # Few enough for about one request, so not throttled
+        _embed_batches(shadow, missing, None, EMBED_BATCH_SIZE)
+
+        shadow_index = faiss.IndexFlatL2(shadow.embedding["dim"])
+        metadata_store: Dict[str, Any] = {}
+        pending: List[np.ndarray] = []
+        for entry in index:
+            vectors = shadow.vectors(entry.get("id"))
+            chunks = entry.get("embedding_chunks", []) + entry.get("summary_chunks", [])
+            for chunk, vector in zip(chunks, vectors):
+                metadata_store[str(shadow_index.ntotal + len(pending))] = chunk_metadata(entry, chunk.get("text"))
+                pending.append(vector)
+            if len(pending) >= ADD_BATCH_SIZE:
+                shadow_index.add(np.array(pending))
+                pending = []
+        if pending:
+            shadow_index.add(np.array(pending))
+
+        # Swap: each file is replaced atomically; queries embedded with the
+        # old model in the instant between index and tag find no results
+        atomic_write_index(shadow_index, get_faiss_index_path(user_id))
+        atomic_write_json(get_metadata_path(user_id), metadata_store)
+        write_index_embedding(user_id, shadow.embedding)
+        remove_doc_index(user_id)
+        remove_compact_index(user_id)
+    return index, shadow_index.ntotal, len(missing)
+
+
+def _swap(user_id: str, shadow: ShadowStore, throttle: Optional[Throttle], batch_size: int) -> Dict[str, Any]:
+    """Catch up memories added during the job, then swap the shadow index in."""
+    caught_up = 0
+    while True:
+        # Memories added since the job started were embedded with the old
+        # model; they are embedded outside the writer lock, throttled, until
+        # few enough are left for the swap. Ingests racing the swap send it
+        # back here
+        missing = _missing(load_memory_index(user_id), shadow)
+        if sum(len(texts) for _, texts in missing) > SWAP_MAX_TEXTS:
+            _embed_batches(shadow, missing, throttle, batch_size)
+            caught_up += len(missing)
+            continue
+        swapped = _swap_locked(user_id, shadow)
+        if swapped is not None:
+            break
+    index, vectors, embedded = swapped
+
+    updates = {
+        entry.get("id"): (lambda e, v=shadow.vectors(entry.get("id")): _set_vectors(e, v, shadow.embedding))
+        for entry in index
+    }
+    # Outside the lock: commits take it themselves. The shadow store is kept
+    # until the entries are updated, so a crash here is finished by a rerun
+    commit(user_id, MemoryMutation(updates=updates))
+    shadow.clear()
+    return {"entries": len(index), "vectors": vectors, "caught_up_before_swap": caught_up,
+            "embedded_during_swap": embedded}
+
+
+def reembed_user(user_id: str, embedding: Optional[Dict[str, Any]] = None, rate: float = REEMBED_RATE,
+                 batch_size: int = EMBED_BATCH_SIZE) -> Dict[str, Any]:
+    """Re-embed one user's memories with a model and swap the new index in.
+
+    Resumes a previous run for the same model.
+
+    Args:
+        user_id: User identifier
+        embedding: Target model tag ({"model", "dim"}, default: EMBEDDING_MODEL)
+        rate: Largest number of texts embedded per second (0: unthrottled)
+        batch_size: Texts per embedding request
+
+    Returns:
+        Migration statistics
+    """
+    embedding = embedding or default_embedding()
+    stats: Dict[str, Any] = {"user_id": user_id, "model": embedding["model"], "dim": embedding["dim"]}
+    memory_path = get_memory_index_path(user_id)
+    in_progress = (get_reembed_dir(user_id) / "manifest.json").exists()
+    if read_index_embedding(user_id) == embedding and not in_progress:
+        logger.info(f"User {user_id} already uses {embedding['model']} ({embedding['dim']} dimensions)")
+        return {**stats, "skipped": True}
+    if not memory_path.exists():
+        write_index_embedding(user_id, embedding)
+        return {**stats, "entries": 0, "vectors": 0}
+
+    start = time.perf_counter()
+    shadow = ShadowStore(user_id, embedding)
+    if shadow.offsets:
+        logger.info(f"Resuming re-embedding of user {user_id} after {len(shadow.offsets)} memories")
+    throttle = Throttle(rate)
+    # Streamed: the vectors of the whole memory index are never held at once
+    _embed_batches(
+        shadow,
+        ((entry.get("id"), chunk_texts(entry)) for entry in iter_json_array(memory_path) if entry.get("id") not in shadow),
+        throttle,
+        batch_size
+    )
+
+    stats.update(_swap(user_id, shadow, throttle, batch_size))
+    stats["seconds"] = time.perf_counter() - start
+    logger.info(f"Re-embedded user {user_id} with {embedding['model']}: {stats['vectors']} vectors from "
+                f"{stats['entries']} entries in {stats['seconds']:.1f}s")
+    return stats
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Re-embed users' memories with another embedding model")
+    parser.add_argument("--user", action="append", help="User to migrate (repeatable; default: every user)")
+    parser.add_argument("--model", default=None, help="Target model (default: MEMOBRAIN_EMBEDDING_MODEL)")
+    parser.add_argument("--dim", type=int, default=None, help="Target dimension (default: MEMOBRAIN_EMBEDDING_DIM)")
+    parser.add_argument("--rate", type=float, default=REEMBED_RATE, help="Texts embedded per second (0: unthrottled)")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="Texts per embedding request")
+    args = parser.parse_args(argv)
+
+    embedding = default_embedding()
+    if args.model:
+        embedding["model"] = args.model
+    if args.dim:
+        embedding["dim"] = args.dim
+    for user_id in args.user or list_users():
+        print(json.dumps(reembed_user(user_id, embedding, args.rate, args.batch_size)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""Shared local retrieval daemon.
+
+One long-lived process owns every loaded user index and answers retrieval
+requests from any number of Streamlit sessions or replicas. Requests that
+arrive within a few milliseconds of each other are coalesced: their queries
+are embedded in one provider call and searched with one FAISS call per user.
+
+The protocol is one JSON object per line over a Unix socket or a localhost
+TCP socket:
+
+    -> {"op": "retrieve", "query": "...", "user_id": "alice", "top_k": 5, "options": {"mmr": true}}
+    <- {"results": [...]}            or  {"error": "..."}
+
+Start the daemon from the app directory (user data paths are relative):
+
+    python -m core.retrieval_service --address /tmp/memobrain-retrieval.sock
+
+and point the app at it with MEMOBRAIN_RETRIEVAL_ADDRESS set to the same
+value. retrieve_relevant_chunks then goes through the daemon and falls back
+to searching locally if it cannot be reached.
+"""
+import os
+import json
+import time
+import queue
+import socket
+import argparse
+import threading
+import socketserver
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from core.retriever import RETRIEVAL_MODE, embed_queries, search_chunks
+from core.embedding_config import user_embedding
+from core.metrics import increment
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BATCH_WINDOW_MS = float(os.getenv("MEMOBRAIN_RETRIEVAL_BATCH_MS", "3"))
+MAX_BATCH_SIZE = int(os.getenv("MEMOBRAIN_RETRIEVAL_MAX_BATCH", "64"))
+CLIENT_TIMEOUT = float(os.getenv("MEMOBRAIN_RETRIEVAL_TIMEOUT", "30"))
+
+
+def parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    """Parse a service address.
+
+    Args:
+        address: "unix:///path", a filesystem path, or "tcp://host:port" / "host:port"
+
+    Returns:
+        Socket path (str) for Unix sockets, (host, port) for TCP
+    """
+    if address.startswith("unix://"):
+        return address[len("unix://"):]
+    if address.startswith("tcp://"):
+        address = address[len("tcp://"):]
+    elif "/" in address or ":" not in address:
+        return address
+    host, port = address.rsplit(":", 1)
+    return (host or "127.0.0.1", int(port))
+
+
+class _Request:
+    def __init__(self, query: str, user_id: str, top_k: int, options: Dict[str, Any]):
+        self.query = query
+        self.user_id = user_id
+        self.top_k = top_k
+        self.options = options
+        # Requests are searched together only if they share user and search
+        # options; MMR and compact search results also depend on top_k through
+        # the candidate pool, and relationship expansion appends up to top_k
+        # extra results
+        exact_k = (options.get("mmr") or options.get("expand_hops")
+                   or (options.get("mode") or RETRIEVAL_MODE) == "compact")
+        self.group = (user_id, json.dumps(options, sort_keys=True), top_k if exact_k else None)
+        self.future: Future = Future()
+
+
+class SearchBatcher:
+    """Coalesces concurrent retrieval requests into batched embedding and FAISS calls."""
+
+    def __init__(self, window_ms: float = BATCH_WINDOW_MS, max_batch: int = MAX_BATCH_SIZE, workers: int = 4):
+        """
+        Args:
+            window_ms: How long the first request of a batch waits for others
+            max_batch: Largest number of requests processed together
+            workers: Batches processed concurrently (e.g. while one waits on the embedding API)
+        """
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="retrieval-batch")
+        threading.Thread(target=self._collect, daemon=True).start()
+
+    def submit(self, query: str, user_id: str, top_k: int, options: Optional[Dict[str, Any]] = None) -> Future:
+        request = _Request(query, user_id, top_k, options or {})
+        self._queue.put(request)
+        return request.future
+
+    def _collect(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._executor.submit(self._process, batch)
+
+    def _process(self, batch: List[_Request]) -> None:
+        increment("retrieval_service_batches_total")
+        increment("retrieval_service_requests_total", len(batch))
+        # Each user's queries are embedded with the model of that user's index
+        embeddings = {r.user_id: user_embedding(r.user_id) for r in batch}
+        by_model: Dict[str, List[int]] = {}
+        for i, r in enumerate(batch):
+            by_model.setdefault(json.dumps(embeddings[r.user_id], sort_keys=True), []).append(i)
+        vectors: List[Any] = [None] * len(batch)
+        try:
+            for positions in by_model.values():
+                embedded = embed_queries([batch[i].query for i in positions], embeddings[batch[positions[0]].user_id])
+                for i, vector in zip(positions, embedded):
+                    vectors[i] = vector
+        except Exception as e:
+            for r in batch:
+                r.future.set_exception(e)
+            return
+
+        groups: Dict[Tuple[str, str, Optional[int]], List[int]] = {}
+        for i, r in enumerate(batch):
+            groups.setdefault(r.group, []).append(i)
+
+        for positions in groups.values():
+            first = batch[positions[0]]
+            try:
+                results = search_chunks(np.array([vectors[i] for i in positions]), first.user_id,
+                                        max(batch[i].top_k for i in positions), **first.options)
+                for i, result in zip(positions, results):
+                    batch[i].future.set_result(result if first.group[2] is not None else result[:batch[i].top_k])
+            except Exception as e:
+                for i in positions:
+                    batch[i].future.set_exception(e)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                op = request.get("op", "retrieve")
+                if op == "ping":
+                    response = {"ok": True}
+                elif op == "retrieve":
+                    future = self.server.batcher.submit(
+                        request["query"], request["user_id"], int(request.get("top_k", 5)), request.get("options")
+                    )
+                    response = {"results": future.result()}
+                elif op == "retrieve_batch":
+                    # Submitted together, so the queries land in the same batch
+                    futures = [
+                        self.server.batcher.submit(q, request["user_id"], int(request.get("top_k", 5)),
+                                                   request.get("options"))
+                        for q in request["queries"]
+                    ]
+                    response = {"results": [f.result() for f in futures]}
+                else:
+                    response = {"error": f"Unknown op: {op}"}
+            except Exception as e:
+                logger.error(f"Error handling retrieval request: {str(e)}")
+                response = {"error": str(e)}
+            self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # Every session opens its own connection; the default backlog of 5
+    # refuses bursts of new sessions
+    request_queue_size = 128
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+def start_retrieval_service(address: str, batcher: Optional[SearchBatcher] = None) -> socketserver.BaseServer:
+    """Start the retrieval service in a background thread.
+
+    Args:
+        address: Address to listen on (see parse_address)
+        batcher: Request batcher, a default one is created if omitted
+
+    Returns:
+        The running server; call shutdown() to stop it
+    """
+    parsed = parse_address(address)
+    if isinstance(parsed, str):
+        if os.path.exists(parsed):
+            os.remove(parsed)
+        server = _UnixServer(parsed, _Handler)
+    else:
+        server = _TCPServer(parsed, _Handler)
+    server.batcher = batcher or SearchBatcher()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Retrieval service listening on {address}")
+    return server
+
+
+class RetrievalClient:
+    """Client for the retrieval service with one persistent connection per thread."""
+
+    def __init__(self, address: str, timeout: float = CLIENT_TIMEOUT):
+        self.address = parse_address(address)
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self):
+        family = socket.AF_UNIX if isinstance(self.address, str) else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.address)
+        return sock, sock.makefile("rwb")
+
+    def _call(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        payload = (json.dumps(request) + "\n").encode("utf-8")
+        # A pooled connection may have been closed by a daemon restart, so
+        # retry once on a fresh one
+        for attempt in range(2):
+            conn = getattr(self._local, "conn", None)
+            if conn is None:
+                conn = self._local.conn = self._connect()
+            sock, stream = conn
+            try:
+                stream.write(payload)
+                stream.flush()
+                line = stream.readline()
+                if not line:
+                    raise ConnectionError("Retrieval service closed the connection")
+                return json.loads(line)
+            except (OSError, ValueError):
+                self._local.conn = None
+                stream.close()
+                sock.close()
+                if attempt:
+                    raise
+
+    def ping(self) -> bool:
+        return bool(self._call({"op": "ping"}).get("ok"))
+
+    def retrieve(self, query: str, user_id: str, top_k: int = 5, **search_options) -> List[dict]:
+        """Retrieve the most relevant chunks through the service.
+
+        Args:
+            query: Search query
+            user_id: User identifier
+            top_k: Number of results
+            search_options: Passed to search_chunks (mmr, fetch_k, mmr_lambda, max_per_doc, expand_hops, ...)
+
+        Returns:
+            Chunk metadata dicts with scores, as retrieve_relevant_chunks
+
+        Raises:
+            RuntimeError: If the service reported an error
+            OSError: If the service cannot be reached
+        """
+        response = self._call({"op": "retrieve", "query": query, "user_id": user_id, "top_k": top_k,
+                               "options": search_options})
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response["results"]
+
+    def retrieve_batch(self, queries: List[str], user_id: str, top_k: int = 5,
+                       **search_options) -> List[List[dict]]:
+        """Retrieve chunks for several queries in one round trip.
+
+        Args:
+            queries: Search queries
+            user_id: User identifier
+            top_k: Number of results per query
+            search_options: Passed to search_chunks (mmr, fetch_k, mmr_lambda, max_per_doc, expand_hops, ...)
+
+        Returns:
+            One result list per query, as retrieve_relevant_chunks_batch
+        """
+        response = self._call({"op": "retrieve_batch", "queries": queries, "user_id": user_id, "top_k": top_k,
+                               "options": search_options})
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response["results"]
+
+
+_clients: Dict[str, RetrievalClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(address: str) -> RetrievalClient:
+    """Return the shared client for an address."""
+    with _clients_lock:
+        if address not in _clients:
+            _clients[address] = RetrievalClient(address)
+        return _clients[address]
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="MemoBrain shared retrieval service")
+    parser.add_argument("--address", default=os.getenv("MEMOBRAIN_RETRIEVAL_ADDRESS", "/tmp/memobrain-retrieval.sock"),
+                        help="Unix socket path or host:port to listen on")
+    parser.add_argument("--batch-ms", type=float, default=BATCH_WINDOW_MS,
+                        help="Micro-batching window in milliseconds")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH_SIZE, help="Largest batch of requests")
+    args = parser.parse_args(argv)
+
+    from core.metrics import start_exporters_from_env
+    start_exporters_from_env()
+
+    server = start_retrieval_service(args.address, SearchBatcher(args.batch_ms, args.max_batch))
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,52 +1,318 @@
 import os
-import json
+import logging
 import numpy as np
 import faiss
-from openai import OpenAI
-from dotenv import load_dotenv
 from core.user_paths import get_faiss_index_path, get_metadata_path
+from core.index_store import load_index, load_memory_rows, load_metadata
+from core.edge_store import load_edge_store
+from core.doc_index import document_key, load_doc_index
+from core.compact_index import RERANK_FACTOR, SEARCH_DIM, load_compact_index, supports_truncation, truncate
+from core.embedding_config import default_embedding, request_options, user_embedding
+from core.llm_client import embed
+from core.metrics import span, timed
 
-load_dotenv()
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Address of a shared retrieval service (see core/retrieval_service.py); when
+# unset, or when the service is unreachable, searches run in this process
+RETRIEVAL_ADDRESS = os.getenv("MEMOBRAIN_RETRIEVAL_ADDRESS")
+
+# Maximal marginal relevance defaults: lambda trades relevance (1.0) against
+# diversity (0.0), and the candidate pool is top_k * MMR_FETCH_FACTOR
+MMR_LAMBDA = float(os.getenv("MEMOBRAIN_MMR_LAMBDA", "0.5"))
+MMR_FETCH_FACTOR = int(os.getenv("MEMOBRAIN_MMR_FETCH_FACTOR", "4"))
+
+# "flat" searches every chunk; "hierarchical" first picks the HIER_DOC_K
+# documents closest to the query by their mean vector, then searches only
+# their chunks (see core/doc_index.py); "compact" searches SEARCH_DIM-wide
+# truncated vectors and re-ranks the best candidates with full vectors (see
+# core/compact_index.py)
+RETRIEVAL_MODE = os.getenv("MEMOBRAIN_RETRIEVAL_MODE", "flat")
+HIER_DOC_K = int(os.getenv("MEMOBRAIN_HIER_DOC_K", "20"))
 
 # INDEX_PATH = os.path.join("core", "memory_store", "index.faiss")
 # METADATA_PATH = os.path.join("core", "memory_store", "metadata.json")
 
-def embed_query(query: str) -> np.ndarray:
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=[query]
+@timed("retrieval_embed")
+def embed_queries(queries: list[str], embedding: dict | None = None) -> np.ndarray:
+    # Queries must be embedded with the model of the index they search, see user_embedding
+    response = embed(
+        "query",
+        input=queries,
+        **request_options(embedding or default_embedding())
     )
-    return np.array(response.data[0].embedding, dtype=np.float32).reshape(1, -1)
+    return np.array([d.embedding for d in response.data], dtype=np.float32)
+
+def embed_query(query: str, embedding: dict | None = None) -> np.ndarray:
+    return embed_queries([query], embedding)
+
+def mmr_select(query_vec: np.ndarray, candidate_vecs: np.ndarray, k: int, lambda_mult=MMR_LAMBDA,
+               doc_keys: list[str] | None = None, max_per_doc: int | None = None) -> list[int]:
+    """Pick a relevant but diverse subset of candidates by maximal marginal relevance.
+
+    Cosine similarities to the query and between all candidates are computed
+    with two matrix products up front; each of the k greedy steps is then a
+    handful of vector operations.
+
+    Args:
+        query_vec: Query embedding
+        candidate_vecs: One embedding per candidate, shape (n, d)
+        k: Number of candidates to select
+        lambda_mult: 1.0 ranks by relevance only, 0.0 by diversity only
+        doc_keys: Document of each candidate, used with max_per_doc
+        max_per_doc: Most candidates selected from any one document
+
+    Returns:
+        Positions of the selected candidates, in selection order
+    """
+    n = len(candidate_vecs)
+    if n == 0 or k <= 0:
+        return []
+
+    def normalize(x):
+        norms = np.linalg.norm(x, axis=-1, keepdims=True)
+        return x / np.where(norms == 0, 1.0, norms)
+
+    candidates = normalize(np.asarray(candidate_vecs, dtype=np.float32))
+    query_sim = candidates @ normalize(np.asarray(query_vec, dtype=np.float32).reshape(-1))
+    pairwise_sim = candidates @ candidates.T
+
+    if doc_keys is not None and max_per_doc:
+        _, doc_codes = np.unique(np.asarray(doc_keys, dtype=object).astype(str), return_inverse=True)
+        doc_counts = np.zeros(doc_codes.max() + 1, dtype=int)
+    else:
+        doc_codes = None
+
+    available = np.ones(n, dtype=bool)
+    max_sim_to_selected = np.full(n, -np.inf, dtype=np.float32)
+    selected = []
+    for _ in range(min(k, n)):
+        redundancy = np.where(np.isfinite(max_sim_to_selected), max_sim_to_selected, 0.0)
+        scores = lambda_mult * query_sim - (1.0 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        if not np.isfinite(scores[best]):
+            break
+        selected.append(best)
+        available[best] = False
+        max_sim_to_selected = np.maximum(max_sim_to_selected, pairwise_sim[best])
+        if doc_codes is not None:
+            doc_counts[doc_codes[best]] += 1
+            if doc_counts[doc_codes[best]] >= max_per_doc:
+                available &= doc_codes != doc_codes[best]
+    return selected
+
+def expand_results(query_vec: np.ndarray, results: list[dict], user_id: str, index, metadata: dict,
+                   hops=1, types=None, limit=5) -> list[dict]:
+    """Find chunks of memories related to the retrieved ones.
+
+    Follows up to hops relationship edges (of the given types) from each
+    retrieved document through the edge store, and returns the chunk of each
+    related document closest to the query, nearest first. Documents already
+    in results are skipped.
+
+    Returns copies of the chunk metadata with "score", "expanded_from" (the
+    retrieved document the relationship starts at) and "relationship_hops".
+    """
+    edge_store = load_edge_store(user_id)
+    if not len(edge_store):
+        return []
+    seen = {document_key(r) for r in results}
+    origins = {}
+    for result in results:
+        source = document_key(result)
+        for neighbor, distance in edge_store.neighbors(source, hops, types).items():
+            key = document_key({"memory_id": neighbor})
+            if key not in seen and (key not in origins or distance < origins[key][1]):
+                origins[key] = (source, distance)
+    if not origins:
+        return []
+
+    memory_rows = load_memory_rows(get_metadata_path(user_id))
+    keys, rows = [], []
+    for key in origins:
+        for row in memory_rows.get(key, []) + memory_rows.get(f"{key}_summary", []):
+            keys.append(key)
+            rows.append(row)
+    if not rows:
+        return []
+    vectors = index.reconstruct_batch(np.array(rows, dtype=np.int64))
+    distances = ((vectors - np.asarray(query_vec, dtype=np.float32).reshape(1, -1)) ** 2).sum(axis=1)
+
+    best = {}
+    for key, row, distance in zip(keys, rows, distances.tolist()):
+        if key not in best or distance < best[key][1]:
+            best[key] = (row, distance)
+    expanded = []
+    for key, (row, distance) in sorted(best.items(), key=lambda item: item[1][1])[:limit]:
+        result = dict(metadata[str(row)])
+        result.setdefault("title", "[Untitled]")
+        result["score"] = float(distance)
+        result["expanded_from"], result["relationship_hops"] = origins[key]
+        expanded.append(result)
+    return expanded
+
+def _exact_search(query_vec: np.ndarray, rows: np.ndarray, index, distances: np.ndarray,
+                  indices: np.ndarray) -> None:
+    # Exact L2 search of one query over some rows of the full index, written
+    # into the (pre-padded) distances and indices rows of the caller
+    if not len(rows):
+        return
+    n = min(len(distances), len(rows))
+    row_distances, order = faiss.knn(np.ascontiguousarray(query_vec.reshape(1, -1), dtype=np.float32),
+                                     index.reconstruct_batch(rows), n)
+    distances[:n] = row_distances[0]
+    indices[:n] = rows[order[0]]
 
-def retrieve_relevant_chunks(query: str, user_id: str, top_k=5) -> list[dict]:
+def search_hierarchical(query_vecs: np.ndarray, user_id: str, index, metadata: dict, k: int,
+                        doc_k=HIER_DOC_K) -> tuple[np.ndarray, np.ndarray]:
+    """Two-stage search: the doc_k closest documents, then exact search over their chunks.
+
+    Returns (distances, row ids) shaped like index.search, padded with inf
+    and -1 where fewer than k chunks were found.
+    """
+    doc_index = load_doc_index(user_id, index, metadata)
+    memory_rows = load_memory_rows(get_metadata_path(user_id))
+    _, doc_positions = doc_index.search(query_vecs, doc_k)
+
+    distances = np.full((len(query_vecs), k), np.inf, dtype=np.float32)
+    indices = np.full((len(query_vecs), k), -1, dtype=np.int64)
+    for q, (query_vec, positions) in enumerate(zip(query_vecs, doc_positions)):
+        rows = []
+        for p in positions:
+            if p >= 0:
+                key = doc_index.keys[p]
+                rows.extend(memory_rows.get(key, []) + memory_rows.get(f"{key}_summary", []))
+        # The document index may cover rows committed after index was loaded
+        _exact_search(query_vec, np.array([row for row in rows if row < index.ntotal], dtype=np.int64),
+                      index, distances[q], indices[q])
+    return distances, indices
+
+def search_compact(query_vecs: np.ndarray, user_id: str, index, k: int, search_dim=SEARCH_DIM,
+                   rerank_factor=RERANK_FACTOR) -> tuple[np.ndarray, np.ndarray]:
+    """Two-stage search: k * rerank_factor candidates from the compact index, re-ranked with full vectors.
+
+    Returns (distances, row ids) shaped like index.search, padded with inf
+    and -1 where fewer than k chunks were found.
+    """
+    compact = load_compact_index(user_id, index, search_dim)
+    _, candidates = compact.search(truncate(query_vecs, search_dim), k * rerank_factor)
+
+    distances = np.full((len(query_vecs), k), np.inf, dtype=np.float32)
+    indices = np.full((len(query_vecs), k), -1, dtype=np.int64)
+    for q, (query_vec, rows) in enumerate(zip(query_vecs, candidates)):
+        # The compact index may cover rows committed after index was loaded
+        _exact_search(query_vec, rows[(rows >= 0) & (rows < index.ntotal)], index, distances[q], indices[q])
+    return distances, indices
+
+def search_chunks(query_vecs: np.ndarray, user_id: str, top_k=5, mmr=False, fetch_k=None,
+                  mmr_lambda=MMR_LAMBDA, max_per_doc=None, expand_hops=0, expand_types=None,
+                  expand_k=None, mode=None, doc_k=HIER_DOC_K, search_dim=SEARCH_DIM,
+                  rerank_factor=RERANK_FACTOR) -> list[list[dict]]:
+    """Search a user's index with already embedded queries in one FAISS call.
+
+    mode is "flat", "hierarchical" or "compact" (default RETRIEVAL_MODE);
+    hierarchical search only looks at the chunks of the doc_k best
+    documents, compact search scans search_dim-wide vectors and re-ranks
+    rerank_factor times the wanted number of candidates. Compact search
+    falls back to flat for models whose vectors cannot be truncated.
+
+    With mmr=True a larger candidate pool (fetch_k, default top_k *
+    MMR_FETCH_FACTOR) is retrieved and diversified with mmr_select, at most
+    max_per_doc chunks per document.
+
+    With expand_hops > 0, up to expand_k (default top_k) chunks of memories
+    within expand_hops relationships of the results are appended after
+    them, see expand_results.
+
+    Returns one result list per query row, each holding copies of the chunk
+    metadata with a "score" (L2 distance) added.
+    """
     index_path = get_faiss_index_path(user_id)
     metadata_path = get_metadata_path(user_id)
     if not os.path.exists(index_path) or not os.path.exists(metadata_path):
-        return []
+        return [[] for _ in range(len(query_vecs))]
+
+    # Load FAISS index (memory-mapped and cached across calls)
+    with span("retrieval_index_load"):
+        index = load_index(index_path)
 
-    # Load FAISS index
-    index = faiss.read_index(str(index_path))
+    if query_vecs.shape[1] != index.d:
+        # The index was re-embedded with another model after the queries were embedded
+        logger.warning(f"Query dimension {query_vecs.shape[1]} does not match the index of user {user_id} ({index.d})")
+        return [[] for _ in range(len(query_vecs))]
 
-    # Embed query
-    query_vec = embed_query(query)
+    # Load metadata (cached until metadata.json changes)
+    with span("retrieval_metadata_load"):
+        metadata = load_metadata(metadata_path)
 
     # Search
-    distances, indices = index.search(query_vec, top_k)
-    indices = indices.flatten()
-
-    # Load metadata
-    with open(metadata_path, "r") as f:
-        metadata = json.load(f)
-
-    results = []
-    for i, idx in enumerate(indices):
-        str_idx = str(idx)
-        if str_idx in metadata:
-            result = metadata[str_idx]
+    search_k = max(fetch_k or top_k * MMR_FETCH_FACTOR, top_k) if mmr else top_k
+    mode = mode or RETRIEVAL_MODE
+    if mode == "compact" and (search_dim >= index.d or not supports_truncation(user_embedding(user_id))):
+        mode = "flat"
+    if mode == "hierarchical":
+        with span("retrieval_search_hierarchical"):
+            distances, indices = search_hierarchical(query_vecs, user_id, index, metadata, search_k, doc_k)
+    elif mode == "compact":
+        with span("retrieval_search_compact"):
+            distances, indices = search_compact(query_vecs, user_id, index, search_k, search_dim, rerank_factor)
+    else:
+        with span("retrieval_search"):
+            distances, indices = index.search(query_vecs, search_k)
+
+    all_results = []
+    for query_vec, row_distances, row_indices in zip(query_vecs, distances, indices):
+        positions = [p for p, idx in enumerate(row_indices) if str(idx) in metadata]
+        if mmr and positions:
+            with span("retrieval_mmr"):
+                ids = row_indices[positions]
+                order = mmr_select(
+                    query_vec, index.reconstruct_batch(ids), top_k, mmr_lambda,
+                    [document_key(metadata[str(idx)]) for idx in ids], max_per_doc
+                )
+            positions = [positions[o] for o in order]
+
+        results = []
+        for p in positions:
+            result = dict(metadata[str(row_indices[p])])
             result.setdefault("title", "[Untitled]")
-            result["score"] = float(distances[0][i])
+            result["score"] = float(row_distances[p])
             results.append(result)
+        if expand_hops and results:
+            with span("retrieval_expand"):
+                results.extend(expand_results(query_vec, results, user_id, index, metadata, expand_hops,
+                                              expand_types, expand_k or top_k))
+        all_results.append(results)
+    return all_results
+
+@timed("retrieval")
+def retrieve_relevant_chunks_batch(queries: list[str], user_id: str, top_k=5, **search_options) -> list[list[dict]]:
+    """Retrieve the most relevant chunks for several queries at once.
+
+    All queries are embedded in one provider call and searched with one
+    FAISS call, and metadata is resolved once for the whole batch.
+    search_options (mmr, fetch_k, mmr_lambda, max_per_doc, expand_hops,
+    expand_types, expand_k, mode, doc_k, search_dim, rerank_factor) are
+    passed to search_chunks.
+
+    Returns one result list per query, in order.
+    """
+    if not queries:
+        return []
+    if RETRIEVAL_ADDRESS:
+        from core.retrieval_service import get_client
+        try:
+            return get_client(RETRIEVAL_ADDRESS).retrieve_batch(queries, user_id, top_k, **search_options)
+        except (OSError, RuntimeError) as e:
+            logger.warning(f"Retrieval service unavailable, searching locally: {str(e)}")
+
+    if not os.path.exists(get_faiss_index_path(user_id)) or not os.path.exists(get_metadata_path(user_id)):
+        return [[] for _ in queries]
+
+    return search_chunks(embed_queries(queries, user_embedding(user_id)), user_id, top_k, **search_options)
 
-    return results
+def retrieve_relevant_chunks(query: str, user_id: str, top_k=5, **search_options) -> list[dict]:
+    return retrieve_relevant_chunks_batch([query], user_id, top_k, **search_options)[0]
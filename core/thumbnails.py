@@ -0,0 +1,201 @@
+"""Thumbnails for image and PDF memories.
+
+Thumbnails are small JPEGs stored in the user's thumbs directory and keyed
+by the file's source_hash, so duplicate uploads share one. They are
+generated at ingest in a background worker pool and backfilled the same way
+for older files the first time a view asks for them; views show the
+thumbnail and only read the original when a full preview is opened.
+"""
+import io
+import os
+import tempfile
+import threading
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from PIL import Image
+
+from core.user_paths import get_thumbs_dir
+from core.metrics import increment, timed
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_TYPES = {"png", "jpg", "jpeg", "pdf"}
+# Longest side of a thumbnail in pixels
+THUMB_SIZE = int(os.getenv("MEMOBRAIN_THUMB_SIZE", "320"))
+THUMB_QUALITY = 80
+# PIL and MuPDF release the GIL while decoding and scaling, so threads are enough
+THUMB_WORKERS = int(os.getenv("MEMOBRAIN_THUMB_WORKERS", "2"))
+
+_pool = ThreadPoolExecutor(max_workers=THUMB_WORKERS, thread_name_prefix="thumbnails")
+_pending: Dict[str, Future] = {}
+_pending_lock = threading.Lock()
+
+
+def _encode(image: Image.Image) -> bytes:
+    if image.mode not in ("RGB", "L"):
+        # Flatten transparency onto white rather than black
+        background = Image.new("RGB", image.size, "white")
+        rgba = image.convert("RGBA")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=THUMB_QUALITY, optimize=True)
+    return buffer.getvalue()
+
+
+@timed("thumbnail_render")
+def make_thumbnail(source: Union[bytes, str, Path], filetype: str, size: int = THUMB_SIZE) -> bytes:
+    """Render a JPEG thumbnail of an image or of a PDF's first page.
+
+    Args:
+        source: File bytes or path
+        filetype: File extension (png, jpg, jpeg or pdf)
+        size: Longest side of the thumbnail in pixels
+
+    Returns:
+        JPEG bytes
+
+    Raises:
+        ValueError: If the file type has no thumbnail
+    """
+    filetype = filetype.lower().strip(".")
+    if filetype == "pdf":
+        import pymupdf
+        doc = pymupdf.open(stream=source, filetype="pdf") if isinstance(source, bytes) else pymupdf.open(str(source))
+        try:
+            page = doc[0]
+            # Rasterize the page directly at thumbnail scale
+            scale = size / max(page.rect.width, page.rect.height)
+            pix = page.get_pixmap(matrix=pymupdf.Matrix(scale, scale), alpha=False)
+            image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        finally:
+            doc.close()
+    elif filetype in ("png", "jpg", "jpeg"):
+        image = Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+        # JPEGs are decoded at a reduced scale instead of full resolution
+        image.draft("RGB", (size, size))
+        image.thumbnail((size, size))
+    else:
+        raise ValueError(f"No thumbnail for {filetype} files")
+    return _encode(image)
+
+
+def thumbnail_path(user_id: str, source_hash: str) -> Path:
+    return get_thumbs_dir(user_id) / f"{source_hash}.jpg"
+
+
+def _write_thumbnail(path: Path, source: Union[bytes, str, Path], filetype: str) -> Optional[bytes]:
+    try:
+        data = make_thumbnail(source, filetype)
+    except Exception as e:
+        logger.warning(f"Could not create thumbnail {path.name}: {str(e)}")
+        increment("thumbnail_errors_total")
+        return None
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False) as tmp_file:
+        tmp_file.write(data)
+        tmp_path = tmp_file.name
+    os.replace(tmp_path, path)
+    increment("thumbnails_generated_total")
+    return data
+
+
+def ensure_thumbnail(user_id: str, source_hash: str, filetype: str,
+                     source: Union[bytes, str, Path]) -> Optional[bytes]:
+    """Return a file's thumbnail, rendering and storing it first if needed.
+
+    Args:
+        user_id: User identifier
+        source_hash: Content hash of the file
+        filetype: File extension
+        source: File bytes or path, read only if the thumbnail is missing
+
+    Returns:
+        JPEG bytes, or None if the file has no thumbnail
+    """
+    if filetype.lower() not in THUMBNAIL_TYPES or not source_hash:
+        return None
+    path = thumbnail_path(user_id, source_hash)
+    if path.exists():
+        return path.read_bytes()
+    return _write_thumbnail(path, source, filetype)
+
+
+def remove_thumbnail(user_id: str, source_hash: str) -> None:
+    """Delete a stored thumbnail, once no memory has that content any more."""
+    if source_hash:
+        thumbnail_path(user_id, source_hash).unlink(missing_ok=True)
+
+
+def schedule_thumbnail(user_id: str, entry: dict) -> Optional[Future]:
+    """Generate a memory's thumbnail in the background worker pool.
+
+    Args:
+        user_id: User identifier
+        entry: Memory entry with source_hash, filetype and filepath
+
+    Returns:
+        Future resolving to the JPEG bytes, or None if there is nothing to do
+    """
+    source_hash = entry.get("source_hash")
+    filetype = (entry.get("filetype") or "").lower()
+    filepath = entry.get("filepath")
+    if filetype not in THUMBNAIL_TYPES or not source_hash or not filepath:
+        return None
+    if thumbnail_path(user_id, source_hash).exists():
+        return None
+
+    key = f"{user_id}/{source_hash}"
+    with _pending_lock:
+        future = _pending.get(key)
+        if future is None:
+            future = _pool.submit(ensure_thumbnail, user_id, source_hash, filetype, filepath)
+            _pending[key] = future
+            future.add_done_callback(lambda _: _forget(key))
+    return future
+
+
+def _forget(key: str) -> None:
+    with _pending_lock:
+        _pending.pop(key, None)
+
+
+def schedule_thumbnails(user_id: str, entries: List[dict]) -> List[Future]:
+    """Queue thumbnail generation for newly ingested memories."""
+    futures = [schedule_thumbnail(user_id, e) for e in entries]
+    return [f for f in futures if f is not None]
+
+
+def get_thumbnail(user_id: str, entry: dict, wait: bool = False) -> Optional[bytes]:
+    """Return a memory's stored thumbnail.
+
+    A missing thumbnail (e.g. for a file ingested before thumbnails existed)
+    is queued for generation; views show it on a later rerun instead of
+    blocking on it.
+
+    Args:
+        user_id: User identifier
+        entry: Memory entry
+        wait: Block until a missing thumbnail has been generated
+
+    Returns:
+        JPEG bytes, or None if there is no thumbnail (yet)
+    """
+    source_hash = entry.get("source_hash")
+    if not source_hash or (entry.get("filetype") or "").lower() not in THUMBNAIL_TYPES:
+        return None
+    path = thumbnail_path(user_id, source_hash)
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        pass
+    if not entry.get("filepath") or not os.path.exists(entry["filepath"]):
+        return None
+    future = schedule_thumbnail(user_id, entry)
+    if wait and future is not None:
+        return future.result()
+    return None
@@ -0,0 +1,260 @@
+import json
+import threading
+import logging
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.user_paths import get_time_index_path
+from core.memory_stats import source_key
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+TIME_INDEX_SCHEMA_VERSION = 2
+DEFAULT_CREATED_AT = "2000-01-01"
+# created_at values are naive local timestamps; epochs are counted from this
+# naive origin so day buckets match the stored dates exactly
+EPOCH = datetime(1970, 1, 1)
+SECONDS_PER_DAY = 86400
+# The timeline shows at most this much of a memory's preview
+PREVIEW_CHARS = 500
+
+_cache: Dict[str, Tuple[Tuple[int, int], "TimeIndex"]] = {}
+_cache_lock = threading.Lock()
+
+
+def created_epoch(entry: Dict[str, Any]) -> float:
+    """Return a memory's creation time as seconds since EPOCH."""
+    created_at = entry.get("temporal_metadata", {}).get("created_at", DEFAULT_CREATED_AT)
+    try:
+        created = datetime.fromisoformat(created_at).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        created = datetime.fromisoformat(DEFAULT_CREATED_AT)
+    return (created - EPOCH).total_seconds()
+
+
+def display_fields(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the light fields the timeline renders (and thumbnails need) for a memory."""
+    temporal = entry.get("temporal_metadata", {})
+    return {
+        "id": entry.get("id"),
+        "title": entry.get("title"),
+        "category": entry.get("category", "uncategorized"),
+        "text_preview": (entry.get("text_preview") or "")[:PREVIEW_CHARS],
+        "tags": entry.get("tags", []),
+        "notes": entry.get("notes"),
+        "importance": entry.get("importance", 3),
+        "temporal_metadata": {
+            "created_at": temporal.get("created_at", DEFAULT_CREATED_AT),
+            "last_accessed": temporal.get("last_accessed", DEFAULT_CREATED_AT)
+        },
+        "access_count": entry.get("access_count", 0),
+        "source_hash": entry.get("source_hash"),
+        "filetype": entry.get("filetype"),
+        "filepath": entry.get("filepath")
+    }
+
+
+def date_epoch(day: date) -> float:
+    return (datetime.combine(day, time.min) - EPOCH).total_seconds()
+
+
+def epoch_datetime(epoch: float) -> datetime:
+    return EPOCH + timedelta(seconds=epoch)
+
+
+def epoch_day(epoch: float) -> int:
+    return int(epoch // SECONDS_PER_DAY)
+
+
+def day_date(day: int) -> date:
+    return (EPOCH + timedelta(days=day)).date()
+
+
+class TimeIndex:
+    """Memory ids sorted by creation time, with the fields the timeline filters on and shows.
+
+    Kept as parallel lists in ascending created_at order, so date ranges are
+    two bisections and new memories (normally the newest) are appended. The
+    display column holds each memory's display_fields, so a page of the
+    timeline renders without reading the memory index.
+    """
+
+    def __init__(self, epochs: Optional[List[float]] = None, ids: Optional[List[str]] = None,
+                 categories: Optional[List[str]] = None, importance: Optional[List[int]] = None,
+                 display: Optional[List[Dict[str, Any]]] = None):
+        self.epochs = epochs or []
+        self.ids = ids or []
+        self.categories = categories or []
+        self.importance = importance or []
+        self.display = display or []
+        # Source key of the memory index file this was loaded for
+        self.source: Any = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        epoch = created_epoch(entry)
+        pos = bisect_right(self.epochs, epoch)
+        self.epochs.insert(pos, epoch)
+        self.ids.insert(pos, entry.get("id"))
+        self.categories.insert(pos, entry.get("category", "uncategorized"))
+        self.importance.insert(pos, entry.get("importance", 3))
+        self.display.insert(pos, display_fields(entry))
+
+    def remove(self, memory_id: str, epoch: float) -> bool:
+        """Remove a memory, located by its id and its creation epoch.
+
+        Returns:
+            True if the memory was found
+        """
+        pos = bisect_left(self.epochs, epoch)
+        while pos < len(self.epochs) and self.epochs[pos] == epoch:
+            if self.ids[pos] == memory_id:
+                for column in (self.epochs, self.ids, self.categories, self.importance, self.display):
+                    del column[pos]
+                return True
+            pos += 1
+        return False
+
+    def update(self, before_epoch: float, entry: Dict[str, Any]) -> None:
+        """Re-index a memory changed in place, given its creation epoch before the change."""
+        self.remove(entry.get("id"), before_epoch)
+        self.add(entry)
+
+    def query(self, start: Optional[date] = None, end: Optional[date] = None,
+              categories: Optional[List[str]] = None, importance: Optional[List[int]] = None) -> List[int]:
+        """Find memories created within a date range and matching the filters.
+
+        Args:
+            start: First day, inclusive (default: no lower bound)
+            end: Last day, inclusive (default: no upper bound)
+            categories: Allowed categories (default: any)
+            importance: Allowed importance values (default: any)
+
+        Returns:
+            Positions in the index, newest first
+        """
+        lo = bisect_left(self.epochs, date_epoch(start)) if start else 0
+        hi = bisect_left(self.epochs, date_epoch(end + timedelta(days=1))) if end else len(self.epochs)
+        positions = range(hi - 1, lo - 1, -1)
+        if not categories and not importance:
+            return list(positions)
+        allowed_categories = set(categories or [])
+        allowed_importance = set(importance or [])
+        return [
+            p for p in positions
+            if (not allowed_categories or self.categories[p] in allowed_categories)
+            and (not allowed_importance or self.importance[p] in allowed_importance)
+        ]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "schema_version": TIME_INDEX_SCHEMA_VERSION,
+            "epochs": self.epochs,
+            "ids": self.ids,
+            "categories": self.categories,
+            "importance": self.importance,
+            "display": self.display
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TimeIndex":
+        return cls(data["epochs"], data["ids"], data["categories"], data["importance"], data["display"])
+
+
+def build_time_index(index: List[Dict[str, Any]]) -> TimeIndex:
+    """Build the time index for a whole memory index.
+
+    Args:
+        index: Memory entries
+
+    Returns:
+        Time index
+    """
+    rows = sorted(
+        ((created_epoch(e), e.get("id"), e.get("category", "uncategorized"), e.get("importance", 3), display_fields(e))
+         for e in index),
+        key=lambda row: row[:2]
+    )
+    columns = [list(c) for c in zip(*rows)] if rows else [[], [], [], [], []]
+    return TimeIndex(*columns)
+
+
+def read_time_index_file(user_id: str) -> Optional[Tuple[TimeIndex, Any]]:
+    """Read a user's stored time index.
+
+    Returns:
+        Tuple of (time index, source key it was built from), or None if it is
+        missing or unreadable
+    """
+    path = get_time_index_path(user_id)
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        logger.warning(f"Ignoring unreadable time index for user {user_id}: {str(e)}")
+        return None
+    if data.get("schema_version") != TIME_INDEX_SCHEMA_VERSION:
+        return None
+    return TimeIndex.from_dict(data), data.get("source")
+
+
+def write_time_index(user_id: str, time_index: TimeIndex) -> None:
+    # Imported lazily: commit_queue imports this module
+    from core.commit_queue import atomic_write_json
+    data = time_index.to_dict()
+    data["source"] = source_key(user_id)
+    atomic_write_json(get_time_index_path(user_id), data)
+
+
+def load_time_index(user_id: str) -> TimeIndex:
+    """Return a user's time index.
+
+    The index maintained by the commit path is parsed once per change and
+    shared between reruns; the returned object must not be mutated. If it is
+    missing or was built from a different memory index file, it is rebuilt
+    once and saved.
+
+    Args:
+        user_id: User identifier
+
+    Returns:
+        Time index
+    """
+    path = get_time_index_path(user_id)
+    key = source_key(user_id)
+    if key is None:
+        return TimeIndex()
+
+    if path.exists():
+        stat = path.stat()
+        file_key = (stat.st_mtime_ns, stat.st_size)
+        with _cache_lock:
+            cached = _cache.get(user_id)
+        if cached is not None and cached[0] == file_key and cached[1].source == key:
+            return cached[1]
+        stored = read_time_index_file(user_id)
+        if stored is not None and stored[1] == key:
+            time_index = stored[0]
+            time_index.source = key
+            with _cache_lock:
+                _cache[user_id] = (file_key, time_index)
+            return time_index
+
+    from core.commit_queue import load_memory_index, user_write_lock
+    with user_write_lock(user_id):
+        stored = read_time_index_file(user_id)
+        key = source_key(user_id)
+        if stored is not None and stored[1] == key:
+            time_index = stored[0]
+        else:
+            time_index = build_time_index(load_memory_index(user_id))
+            write_time_index(user_id, time_index)
+    time_index.source = key
+    return time_index
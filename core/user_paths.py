@@ -18,3 +18,48 @@ def get_user_data_dir(user_id: str) -> Path:
     path = get_user_base_path(user_id) / "docs"
     path.mkdir(parents=True, exist_ok=True)
     return path
+
+def get_write_lock_path(user_id: str) -> Path:
+    return get_user_base_path(user_id) / ".write.lock"
+
+def get_import_manifest_path(user_id: str) -> Path:
+    return get_user_base_path(user_id) / "import_manifest.json"
+
+def get_stats_path(user_id: str) -> Path:
+    return get_user_base_path(user_id) / "memory_stats.json"
+
+def get_thumbs_dir(user_id: str) -> Path:
+    path = get_user_base_path(user_id) / "thumbs"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+def get_preview_cache_dir(user_id: str) -> Path:
+    path = get_user_base_path(user_id) / "previews"
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+def get_time_index_path(user_id: str) -> Path:
+    return get_user_base_path(user_id) / "time_index.json"
+
+def get_graph_index_path(user_id: str) -> Path:
+    return get_user_base_path(user_id) / "graph_index.json"
+
+def get_graph_layout_path(user_id: str) -> Path:
+    return get_user_base_path(user_id) / "graph_layout.json"
+
+def get_edge_log_path(user_id: str) -> Path:
+    return get_user_base_path(user_id) / "edges.jsonl"
+
+def get_doc_index_path(user_id: str) -> Path:
+    return get_user_base_path(user_id) / "doc_index.npz"
+
+def get_compact_index_path(user_id: str) -> Path:
+    return get_user_base_path(user_id) / "index_compact.faiss"
+
+def get_index_info_path(user_id: str) -> Path:
+    return get_user_base_path(user_id) / "index_info.json"
+
+def get_reembed_dir(user_id: str) -> Path:
+    path = get_user_base_path(user_id) / "reembed"
+    path.mkdir(exist_ok=True)
+    return path
@@ -1,40 +1,20 @@
 from pathlib import Path
 import streamlit as st
-import json
-import os
-import openai
 import hashlib
 from datetime import datetime
 from dotenv import load_dotenv
 import sys
 import logging
 from typing import List, Dict, Any, Optional
-import plotly.express as px
-import plotly.graph_objects as go
-from collections import Counter
-import uuid
-
-from ui.my_files import render_my_files_tab
-from ui.timeline import render_timeline_view
-from ui.relationships import render_relationships_view
-from core.memory_handler import (
-    save_uploaded_file, 
-    update_memory_access,
-    add_memory_relationship,
-    MemoryType,
-    MemoryImportance
-)
-from core.retriever import retrieve_relevant_chunks
-from core.embedder import embed_and_store
-from core.context_formatter import format_context_with_metadata
+
+# Only what the login screen needs is imported here. Pages import their
+# modules (plotly, faiss, openai, PDF and OCR libraries, ...) when first
+# shown, so a cold start renders the login screen without loading them.
+from core.metrics import span, start_exporters_from_env
 from core.user_paths import get_memory_index_path
 from ui.login import login_screen, get_logged_in_user
 import base64
-from core.preprocess import extract_text
-from core.metadata_suggester import generate_metadata
-from streamlit_option_menu import option_menu
-from ui.sidebar import render_sidebar
-from ui.file_preview import render_file_preview
+from ui.profiler import begin_rerun, end_rerun, profile_section, profiled, load_json, render_profile_panel
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -42,7 +22,9 @@ logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
+
+# Export pipeline metrics if MEMOBRAIN_METRICS is set
+start_exporters_from_env()
 
 # Application constants
 DEFAULT_CATEGORIES = [
@@ -58,8 +40,12 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Start timing this rerun if the profiler is switched on
+begin_rerun()
+
 # Apply custom CSS for modern OS-like interface
-st.markdown("""
+with profile_section("inject_css"):
+    st.markdown("""
 <style>
     /* Modern OS-like interface */
     .main {
@@ -132,25 +118,57 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+@st.cache_data(show_spinner=False, max_entries=64)
+def build_stats_figures(user_id: str, version: int, source: list, _stats: dict):
+    """Build the dashboard charts once per stats version.
+    
+    Args:
+        user_id: User identifier (cache key)
+        version: Stats version (cache key)
+        source: Memory index file key the stats were computed from (cache key)
+        _stats: Stats dict, not hashed
+        
+    Returns:
+        Tuple of (importance pie, categories bar) figures
+    """
+    import plotly.express as px
+
+    importance_levels = _stats["importance"]
+    categories = _stats["categories"]
+    importance_fig = px.pie(
+        values=list(importance_levels.values()),
+        names=[f"Level {k}" for k in importance_levels.keys()],
+        title=""
+    )
+    categories_fig = px.bar(
+        x=list(categories.keys()),
+        y=list(categories.values()),
+        labels={'x': 'Category', 'y': 'Count'},
+        title=""
+    )
+    return importance_fig, categories_fig
+
+@profiled()
 def render_dashboard(user_id: str):
     """Render the main dashboard with memory statistics and insights."""
+    from core.memory_stats import load_stats
+    from core.graph_index import load_graph_index, load_layout
+    from core.edge_store import load_edge_store
+
     st.title("🧠 MemoBrain OS Dashboard")
     st.markdown('<div style="color:#a0a0a0; font-size:1.1rem; margin-bottom:1.5rem;">Your Personal Memory Operating System</div>', unsafe_allow_html=True)
     
-    # Load memory data
-    memory_path = get_memory_index_path(user_id)
-    if not memory_path.exists():
+    # Load memory statistics (maintained incrementally by the commit path)
+    stats = load_stats(user_id)
+    if not stats["total_memories"]:
         st.info("No memories found. Start by uploading some files or creating notes!")
         return
-        
-    with open(memory_path, "r") as f:
-        memories = json.load(f)
     
     # Calculate statistics
-    total_memories = len(memories)
-    total_size = sum(m.get("file_size", 0) for m in memories)
-    categories = Counter(m.get("category", "uncategorized") for m in memories)
-    importance_levels = Counter(m.get("importance", 3) for m in memories)
+    total_memories = stats["total_memories"]
+    total_size = stats["total_size"]
+    categories = stats["categories"]
+    importance_fig, categories_fig = build_stats_figures(user_id, stats["version"], stats["source"], stats)
     
     # Create dashboard layout
     st.markdown('<hr style="border: 0; border-top: 1px solid #3e3e3e; margin: 1rem 0 1.5rem 0;" />', unsafe_allow_html=True)
@@ -173,34 +191,19 @@ def render_dashboard(user_id: str):
     
     with col2:
         st.markdown("<div class='dashboard-card'><h3>Memory Importance</h3><div style='color:#a0a0a0; font-size:0.95rem; margin-bottom:0.5rem;'>Distribution of memories by importance level.</div>", unsafe_allow_html=True)
-        fig = px.pie(
-            values=list(importance_levels.values()),
-            names=[f"Level {k}" for k in importance_levels.keys()],
-            title=""
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(importance_fig, use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
     
     with col3:
         st.markdown("<div class='dashboard-card'><h3>Memory Categories</h3><div style='color:#a0a0a0; font-size:0.95rem; margin-bottom:0.5rem;'>How your memories are organized by category.</div>", unsafe_allow_html=True)
-        fig = px.bar(
-            x=list(categories.keys()),
-            y=list(categories.values()),
-            labels={'x': 'Category', 'y': 'Count'},
-            title=""
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(categories_fig, use_container_width=True)
         st.markdown("</div>", unsafe_allow_html=True)
     
     st.markdown('<hr style="border: 0; border-top: 1px solid #3e3e3e; margin: 1.5rem 0;" />', unsafe_allow_html=True)
     # Recent memories timeline
     st.markdown("### 📅 Recent Memories")
     st.markdown('<div style="color:#a0a0a0; font-size:0.95rem; margin-bottom:0.5rem;">Your 5 most recently accessed memories.</div>', unsafe_allow_html=True)
-    recent_memories = sorted(
-        memories,
-        key=lambda x: x.get("temporal_metadata", {}).get("last_accessed", ""),
-        reverse=True
-    )[:5]
+    recent_memories = stats["recent"][:5]
     if not recent_memories:
         st.info("No recent memories found.")
     for memory in recent_memories:
@@ -211,7 +214,7 @@ def render_dashboard(user_id: str):
             with col2:
                 st.markdown(f"""
                     <div class="timeline-item">
-                        <p>Last accessed: {memory.get('temporal_metadata', {}).get('last_accessed', 'Never')}</p>
+                        <p>Last accessed: {memory.get('last_accessed') or 'Never'}</p>
                         <p>Access count: {memory.get('access_count', 0)}</p>
                         <p>Importance: {memory.get('importance', 3)}</p>
                     </div>
@@ -219,37 +222,44 @@ def render_dashboard(user_id: str):
     
     # Memory relationships graph
     st.markdown("### 🔄 Memory Relationships")
-    if any(m.get("relationships") for m in memories):
-        # Create a simple network graph of relationships
-        nodes = []
-        edges = []
-        for memory in memories:
-            if memory.get("relationships"):
-                nodes.append(memory["id"])
-                for rel in memory["relationships"]:
-                    edges.append((memory["id"], rel["target_id"]))
+    edge_store = load_edge_store(user_id)
+    graph = load_graph_index(user_id) if len(edge_store) else None
+    edges = [(rel["source_id"], rel["target_id"]) for rel in graph.iter_edges(edge_store)] if graph else []
+    if edges:
+        import plotly.graph_objects as go
+
+        # Only memories with relationships are drawn, at their cached layout positions
+        pos = load_layout(user_id, graph, edge_store)
+        nodes = sorted({memory_id for edge in edges for memory_id in edge})
+        
+        edge_x = []
+        edge_y = []
+        for source_id, target_id in edges:
+            edge_x.extend([pos[source_id][0], pos[target_id][0], None])
+            edge_y.extend([pos[source_id][1], pos[target_id][1], None])
         
         fig = go.Figure(data=[
             go.Scatter(
-                x=[i for i in range(len(nodes))],
-                y=[0] * len(nodes),
+                x=edge_x,
+                y=edge_y,
+                mode='lines',
+                line=dict(color="gray", width=2),
+                hoverinfo='none'
+            ),
+            go.Scatter(
+                x=[pos[n][0] for n in nodes],
+                y=[pos[n][1] for n in nodes],
                 mode='markers+text',
-                text=nodes,
+                text=[graph.title(n) for n in nodes],
                 textposition="top center",
                 marker=dict(size=20)
             )
         ])
-        
-        # Add edges
-        for edge in edges:
-            source_idx = nodes.index(edge[0])
-            target_idx = nodes.index(edge[1])
-            fig.add_shape(
-                type="line",
-                x0=source_idx, y0=0,
-                x1=target_idx, y1=0,
-                line=dict(color="gray", width=2)
-            )
+        fig.update_layout(
+            showlegend=False,
+            xaxis=dict(showgrid=False, zeroline=False, showticklabels=False),
+            yaxis=dict(showgrid=False, zeroline=False, showticklabels=False)
+        )
         
         st.plotly_chart(fig, use_container_width=True)
     else:
@@ -267,124 +277,149 @@ def render_dashboard(user_id: str):
 # Page title
 st.title("MemoBrain OS")
 
-# User authentication
-user_id = get_logged_in_user()
-if not user_id:
-    login_screen()
-    st.stop()
-
-# Render sidebar navigation
-render_sidebar(user_id)
-
-# Get current page from session state
-page = st.session_state.get("current_page", "📊 Dashboard")
-
-# Clear any previous page state
-if "previous_page" not in st.session_state:
-    st.session_state["previous_page"] = page
-elif st.session_state["previous_page"] != page:
-    # Clear any page-specific state when changing pages
-    for key in list(st.session_state.keys()):
-        if key.startswith("page_"):
-            del st.session_state[key]
-    st.session_state["previous_page"] = page
-
-# Dashboard Tab
-if page == "📊 Dashboard":
-    render_dashboard(user_id)
-
-# My Files Tab
-elif page == "📂 My Files":
-    render_my_files_tab(user_id)
-
-# Memory Manager Tab
-elif page == "📦 Memory Manager":
-    st.title("🧠 Memory Manager")
-    st.markdown("Upload documents or write memory notes. Everything becomes searchable.")
-
-    # File uploader
-    uploaded_files = st.file_uploader(
-        "Upload one or more files (PDF, image, or text)",
-        type=["pdf", "png", "jpg", "jpeg", "txt"],
-        accept_multiple_files=True
-    )
+# The rerun is profiled up to here even when it ends in st.stop() or st.rerun()
+user_id = None
+page = ""
+try:
+    # User authentication
+    user_id = get_logged_in_user()
+    if not user_id:
+        login_screen()
+        st.stop()
+
+    # Render sidebar navigation
+    from ui.sidebar import render_sidebar
+    render_sidebar(user_id)
+
+    # Get current page from session state
+    page = st.session_state.get("current_page", "📊 Dashboard")
+
+    # Clear any previous page state
+    if "previous_page" not in st.session_state:
+        st.session_state["previous_page"] = page
+    elif st.session_state["previous_page"] != page:
+        # Clear any page-specific state when changing pages
+        for key in list(st.session_state.keys()):
+            if key.startswith("page_"):
+                del st.session_state[key]
+        st.session_state["previous_page"] = page
+
+    # Dashboard Tab
+    if page == "📊 Dashboard":
+        render_dashboard(user_id)
+
+    # My Files Tab
+    elif page == "📂 My Files":
+        from ui.my_files import render_my_files_tab
+        render_my_files_tab(user_id)
+
+    # Memory Manager Tab
+    elif page == "📦 Memory Manager":
+        from core.memory_handler import save_uploaded_file, save_uploaded_files, save_note
+        from core.thumbnails import THUMBNAIL_TYPES, make_thumbnail
+        from core.preprocess import extract_text
+        from core.metadata_suggester import generate_metadata
+
+        st.title("🧠 Memory Manager")
+        st.markdown("Upload documents or write memory notes. Everything becomes searchable.")
+
+        # File uploader
+        uploaded_files = st.file_uploader(
+            "Upload one or more files (PDF, image, or text)",
+            type=["pdf", "png", "jpg", "jpeg", "txt"],
+            accept_multiple_files=True
+        )
 
-    if uploaded_files:
-        st.write("### Enter details for each uploaded file")
+        if uploaded_files:
+            st.write("### Enter details for each uploaded file")
+            pending_uploads = []
 
-        for uploaded_file in uploaded_files:
-            st.markdown(f"### 📄 File: {uploaded_file.name}")
+            for uploaded_file in uploaded_files:
+                st.markdown(f"### 📄 File: {uploaded_file.name}")
             
-            # Create a hash for the file
-            file_bytes = uploaded_file.read()
-            file_hash = hashlib.md5(file_bytes).hexdigest()
-            ext = Path(uploaded_file.name).suffix.lower().strip(".")
-            filename = f"{file_hash}_{uploaded_file.name}"
-
-            # Save to temp file to extract text
-            temp_path = Path("temp") / filename
-            temp_path.parent.mkdir(exist_ok=True)
-            with open(temp_path, "wb") as f:
-                f.write(file_bytes)
-
-            # Extract text with error handling
-            try:
-                extracted_text = extract_text(temp_path, ext)
-                if not extracted_text.strip():
-                    st.warning(f"⚠️ No text could be extracted from {uploaded_file.name}")
-            except Exception as e:
-                st.error(f"Error extracting text: {str(e)}")
-                extracted_text = f"[Error extracting text: {str(e)}]"
-
-            # Generate metadata suggestions
-            with st.spinner("Generating metadata suggestions..."):
-                suggested = generate_metadata(extracted_text[:1000], uploaded_file.name)
-
-            # File metadata form
-            with st.expander(f"📝 {uploaded_file.name}", expanded=True):
-                # Two-column layout for metadata
-                col1, col2 = st.columns([3, 2])
+                # Create a hash for the file
+                file_bytes = uploaded_file.read()
+                file_hash = hashlib.md5(file_bytes).hexdigest()
+                ext = Path(uploaded_file.name).suffix.lower().strip(".")
+                filename = f"{file_hash}_{uploaded_file.name}"
+
+                # Save to temp file to extract text
+                temp_path = Path("temp") / filename
+                temp_path.parent.mkdir(exist_ok=True)
+                with open(temp_path, "wb") as f:
+                    f.write(file_bytes)
+
+                # Extract text with error handling
+                try:
+                    extracted_text = extract_text(temp_path, ext)
+                    if not extracted_text.strip():
+                        st.warning(f"⚠️ No text could be extracted from {uploaded_file.name}")
+                except Exception as e:
+                    st.error(f"Error extracting text: {str(e)}")
+                    extracted_text = f"[Error extracting text: {str(e)}]"
+
+                # Generate metadata suggestions
+                with st.spinner("Generating metadata suggestions..."):
+                    suggested = generate_metadata(extracted_text[:1000], uploaded_file.name)
+
+                # File metadata form
+                with st.expander(f"📝 {uploaded_file.name}", expanded=True):
+                    # Two-column layout for metadata
+                    col1, col2 = st.columns([3, 2])
                 
-                with col1:
-                    title = st.text_input("Title", value=suggested.get("title", ""), key=f"title_{filename}")
-                    tags_input = st.text_input("Tags (comma-separated)", value=", ".join(suggested.get("tags", [])), key=f"tags_{filename}")
-                    tags = [t.strip() for t in tags_input.split(",") if t.strip()]
-                    category = st.selectbox(
-                        "Category",
-                        DEFAULT_CATEGORIES + ["[Other]"],
-                        key=f"category_{uploaded_file.name}"
-                    )
-                    notes = st.text_area("Notes", value=suggested.get("notes", ""), key=f"notes_{filename}")
+                    with col1:
+                        title = st.text_input("Title", value=suggested.get("title", ""), key=f"title_{filename}")
+                        tags_input = st.text_input("Tags (comma-separated)", value=", ".join(suggested.get("tags", [])), key=f"tags_{filename}")
+                        tags = [t.strip() for t in tags_input.split(",") if t.strip()]
+                        category = st.selectbox(
+                            "Category",
+                            DEFAULT_CATEGORIES + ["[Other]"],
+                            key=f"category_{uploaded_file.name}"
+                        )
+                        notes = st.text_area("Notes", value=suggested.get("notes", ""), key=f"notes_{filename}")
                 
-                with col2:
-                    # Show file preview based on type
-                    st.markdown("### Preview")
-                    if ext in ["png", "jpg", "jpeg"]:
-                        st.image(file_bytes, caption=uploaded_file.name, width=250)
-                    elif ext == "txt":
-                        st.text_area("Content Preview", value=extracted_text[:500] + "...", height=200, disabled=True)
-                    elif ext == "pdf":
-                        st.markdown(f"PDF file: {len(extracted_text.split())} words extracted")
-                        st.text_area("Content Preview", value=extracted_text[:500] + "...", height=200, disabled=True)
+                    with col2:
+                        # Show file preview based on type
+                        st.markdown("### Preview")
+                        # Rendered in memory; the stored thumbnail is made once the file is saved
+                        if ext in THUMBNAIL_TYPES:
+                            try:
+                                st.image(make_thumbnail(file_bytes, ext), caption=uploaded_file.name, width=250)
+                            except Exception as e:
+                                st.warning(f"Could not render a preview: {str(e)}")
+                        if ext == "txt":
+                            st.text_area("Content Preview", value=extracted_text[:500] + "...", height=200, disabled=True)
+                        elif ext == "pdf":
+                            st.markdown(f"PDF file: {len(extracted_text.split())} words extracted")
+                            st.text_area("Content Preview", value=extracted_text[:500] + "...", height=200, disabled=True)
                     
-                    # Display file size
-                    file_size_kb = len(file_bytes) / 1024
-                    file_size_display = f"{file_size_kb:.1f} KB" if file_size_kb < 1024 else f"{file_size_kb/1024:.1f} MB"
-                    st.info(f"File size: {file_size_display}")
-
-                # Save button
-                if st.button(f"Save {uploaded_file.name}", key=f"save_{uploaded_file.name}"):
-                    with st.spinner("Processing file..."):
-                        try:
-                            entry, summary = save_uploaded_file(
-                                uploaded_file, title, tags, category, notes, user_id, extracted_text
-                            )
-                            st.success(f"{uploaded_file.name} saved to memory ✅")
+                        # Display file size
+                        file_size_kb = len(file_bytes) / 1024
+                        file_size_display = f"{file_size_kb:.1f} KB" if file_size_kb < 1024 else f"{file_size_kb/1024:.1f} MB"
+                        st.info(f"File size: {file_size_display}")
+
+                    pending_uploads.append({
+                        "file": uploaded_file,
+                        "title": title,
+                        "tags": tags,
+                        "category": category,
+                        "notes": notes,
+                        "extracted_text": extracted_text
+                    })
+
+                    # Save button
+                    if st.button(f"Save {uploaded_file.name}", key=f"save_{uploaded_file.name}"):
+                        with st.spinner("Processing file..."):
+                            try:
+                                entry, summary = save_uploaded_file(
+                                    uploaded_file, title, tags, category, notes, user_id, extracted_text
+                                )
+                                st.success(f"{uploaded_file.name} saved to memory ✅")
                             
-                            # Show summary if available
-                            if summary:
-                                st.markdown("#### 🧠 Auto Summary")
-                                st.markdown(f"""
+                                # Show summary if available
+                                if summary:
+                                    st.markdown("#### 🧠 Auto Summary")
+                                    st.markdown(f"""
                                     <div style="
                                         background-color: rgba(49, 51, 63, 0.1); 
                                         border-left: 4px solid #FF4B4B; 
@@ -402,158 +437,124 @@ elif page == "📦 Memory Manager":
                                         <div style="margin-left: 1.7rem;">{summary}</div>
                                     </div>
                                 """, unsafe_allow_html=True)
-                            else:
-                                st.info("[No summary generated for this file.]")
-                        except Exception as e:
-                            st.error(f"Error saving file: {str(e)}")
-
-    # Add a manual note section
-    st.divider()
-    st.subheader("Add a Manual Note")
+                                else:
+                                    st.info("[No summary generated for this file.]")
+                            except Exception as e:
+                                st.error(f"Error saving file: {str(e)}")
+
+            # Save every uploaded file with one embedding pass and one index commit
+            if len(pending_uploads) > 1 and st.button(f"💾 Save all {len(pending_uploads)} files", key="save_all_uploads"):
+                with st.spinner(f"Processing {len(pending_uploads)} files..."):
+                    try:
+                        results = save_uploaded_files(pending_uploads, user_id)
+                        st.success(f"{len(results)} files saved to memory ✅")
+                        for entry, summary in results:
+                            if summary:
+                                with st.expander(f"🧠 Auto Summary: {entry['filename']}"):
+                                    st.markdown(summary)
+                    except Exception as e:
+                        st.error(f"Error saving files: {str(e)}")
+
+        # Add a manual note section
+        st.divider()
+        st.subheader("Add a Manual Note")
     
-    # Form for manual notes
-    with st.form("manual_note_form"):
-        note_text = st.text_area("Memory Content", height=200)
-        col1, col2 = st.columns(2)
+        # Form for manual notes
+        with st.form("manual_note_form"):
+            note_text = st.text_area("Memory Content", height=200)
+            col1, col2 = st.columns(2)
         
-        with col1:
-            note_title = st.text_input("Title")
-            note_tags = st.text_input("Tags (comma-separated)")
+            with col1:
+                note_title = st.text_input("Title")
+                note_tags = st.text_input("Tags (comma-separated)")
         
-        with col2:
-            note_category = st.selectbox("Category", DEFAULT_CATEGORIES)
-            note_notes = st.text_input("Additional notes")
+            with col2:
+                note_category = st.selectbox("Category", DEFAULT_CATEGORIES)
+                note_notes = st.text_input("Additional notes")
         
-        submit_button = st.form_submit_button("Save Note")
+            submit_button = st.form_submit_button("Save Note")
         
-        if submit_button and note_text.strip():
-            with st.spinner("Processing note..."):
-                try:
-                    from core.preprocess import chunk_text
-                    chunks = chunk_text(note_text)
-                    vectors = embed_and_store(chunks, user_id)
-
-                    # Create note entry
-                    entry = {
-                        "id": str(uuid.uuid4()),
-                        "filename": f"user_note_{datetime.now().isoformat()}.txt",
-                        "filetype": "txt",
-                        "filepath": "",
-                        "text_preview": note_text[:500],
-                        "date_uploaded": datetime.now().isoformat(),
-                        "embedding_chunks": [
-                            {"text": c, "vector": v.tolist() if hasattr(v, 'tolist') else v} 
-                            for c, v in zip(chunks, vectors)
-                        ],
-                        "source_hash": hashlib.md5(note_text.encode()).hexdigest(),
-                        "title": note_title,
-                        "tags": [t.strip() for t in note_tags.split(",") if t],
-                        "category": note_category,
-                        "notes": note_notes,
-                        "file_size": len(note_text.encode()),
-                        "importance": 3,  # Default medium importance
-                        "version": 1,
-                        "access_count": 0,
-                        "last_accessed": datetime.now().isoformat(),
-                        "relationships": [],
-                        "context": {
-                            "created_at": datetime.now().isoformat(),
-                            "created_by": user_id,
-                            "source": "manual_note",
-                            "location": ""
-                        },
-                        "temporal_metadata": {
-                            "created_at": datetime.now().isoformat(),
-                            "modified_at": datetime.now().isoformat(),
-                            "last_accessed": datetime.now().isoformat(),
-                            "access_count": 0
-                        }
-                    }
-
-                    # Save to memory index
-                    memory_path = get_memory_index_path(user_id)
+            if submit_button and note_text.strip():
+                with st.spinner("Processing note..."):
                     try:
-                        memory = json.load(open(memory_path)) if memory_path.exists() else []
-                    except json.JSONDecodeError:
-                        memory = []
-                        
-                    memory.append(entry)
-                    
-                    # Use atomic write pattern
-                    import tempfile
-                    import shutil
-                    with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-                        json.dump(memory, tmp_file, indent=2)
-                        tmp_path = tmp_file.name
-                    
-                    shutil.move(tmp_path, memory_path)
-                    st.success("Note saved to memory ✅")
-                except Exception as e:
-                    st.error(f"Error saving note: {str(e)}")
-        elif submit_button:
-            st.warning("Please enter some content for your note.")
-
-# Timeline Tab
-elif page == "📅 Timeline":
-    render_timeline_view(user_id)
-
-# Relationships Tab
-elif page == "🔄 Relationships":
-    render_relationships_view(user_id)
-
-# Search Tab
-elif page == "🔍 Search":
-    st.title("🔍 Memory Search")
+                        save_note(
+                            note_text,
+                            note_title,
+                            [t.strip() for t in note_tags.split(",") if t],
+                            note_category,
+                            note_notes,
+                            user_id
+                        )
+                        st.success("Note saved to memory ✅")
+                    except Exception as e:
+                        st.error(f"Error saving note: {str(e)}")
+            elif submit_button:
+                st.warning("Please enter some content for your note.")
+
+    # Timeline Tab
+    elif page == "📅 Timeline":
+        from ui.timeline import render_timeline_view
+        render_timeline_view(user_id)
+
+    # Relationships Tab
+    elif page == "🔄 Relationships":
+        from ui.relationships import render_relationships_view
+        render_relationships_view(user_id)
+
+    # Search Tab
+    elif page == "🔍 Search":
+        from core.memory_handler import update_memory_access, MemoryImportance
+
+        st.title("🔍 Memory Search")
     
-    # Search interface
-    search_query = st.text_input("Search your memories", placeholder="Enter your search query...")
+        # Search interface
+        search_query = st.text_input("Search your memories", placeholder="Enter your search query...")
     
-    if search_query:
-        with st.spinner("Searching memories..."):
-            # Load memories
-            memory_path = get_memory_index_path(user_id)
-            if memory_path.exists():
-                with open(memory_path, "r") as f:
-                    memories = json.load(f)
+        if search_query:
+            with st.spinner("Searching memories..."):
+                # Load memories
+                memory_path = get_memory_index_path(user_id)
+                if memory_path.exists():
+                    memories = load_json(memory_path)
                 
-                # Search through memories
-                results = []
-                for memory in memories:
-                    # Check if query matches any metadata
-                    if (search_query.lower() in memory.get("title", "").lower() or
-                        search_query.lower() in memory.get("text_preview", "").lower() or
-                        any(search_query.lower() in tag.lower() for tag in memory.get("tags", [])) or
-                        search_query.lower() in memory.get("category", "").lower() or
-                        search_query.lower() in memory.get("notes", "").lower()):
-                        results.append(memory)
+                    # Search through memories
+                    results = []
+                    for memory in memories:
+                        # Check if query matches any metadata
+                        if (search_query.lower() in memory.get("title", "").lower() or
+                            search_query.lower() in memory.get("text_preview", "").lower() or
+                            any(search_query.lower() in tag.lower() for tag in memory.get("tags", [])) or
+                            search_query.lower() in memory.get("category", "").lower() or
+                            search_query.lower() in memory.get("notes", "").lower()):
+                            results.append(memory)
                 
-                if results:
-                    st.markdown(f"### Found {len(results)} results")
+                    if results:
+                        st.markdown(f"### Found {len(results)} results")
                     
-                    # Display results
-                    for memory in results:
-                        with st.expander(f"{memory.get('title', 'Untitled')} ({memory.get('category', 'uncategorized')})"):
-                            col1, col2 = st.columns([3, 1])
+                        # Display results
+                        for memory in results:
+                            with st.expander(f"{memory.get('title', 'Untitled')} ({memory.get('category', 'uncategorized')})"):
+                                col1, col2 = st.columns([3, 1])
                             
-                            with col1:
-                                # Memory content
-                                st.markdown(memory.get("text_preview", "")[:500] + "...")
+                                with col1:
+                                    # Memory content
+                                    st.markdown(memory.get("text_preview", "")[:500] + "...")
                                 
-                                # Tags
-                                if memory.get("tags"):
-                                    st.markdown(
-                                        " ".join(f"`{tag}`" for tag in memory.get("tags", [])),
-                                        unsafe_allow_html=True
-                                    )
+                                    # Tags
+                                    if memory.get("tags"):
+                                        st.markdown(
+                                            " ".join(f"`{tag}`" for tag in memory.get("tags", [])),
+                                            unsafe_allow_html=True
+                                        )
                                 
-                                # Notes
-                                if memory.get("notes"):
-                                    st.markdown("**Notes:**")
-                                    st.markdown(memory.get("notes"))
+                                    # Notes
+                                    if memory.get("notes"):
+                                        st.markdown("**Notes:**")
+                                        st.markdown(memory.get("notes"))
                             
-                            with col2:
-                                # Metadata
-                                st.markdown(f"""
+                                with col2:
+                                    # Metadata
+                                    st.markdown(f"""
                                     <div style="
                                         border-left: 3px solid #007bff;
                                         padding-left: 10px;
@@ -565,78 +566,90 @@ elif page == "🔍 Search":
                                     </div>
                                 """, unsafe_allow_html=True)
                                 
-                                # Actions
-                                if st.button("View Details", key=f"view_{memory.get('id', '')}"):
-                                    update_memory_access(memory["id"], user_id)
-                                    st.session_state["selected_memory"] = memory
-                                    st.session_state["current_page"] = "📦 Memory Manager"
+                                    # Actions
+                                    if st.button("View Details", key=f"view_{memory.get('id', '')}"):
+                                        update_memory_access(memory["id"], user_id)
+                                        st.session_state["selected_memory"] = memory
+                                        st.session_state["current_page"] = "📦 Memory Manager"
                                 
-                                if st.button("View Relationships", key=f"rel_{memory.get('id', '')}"):
-                                    st.session_state["selected_memory"] = memory
-                                    st.session_state["current_page"] = "🔄 Relationships"
+                                    if st.button("View Relationships", key=f"rel_{memory.get('id', '')}"):
+                                        st.session_state["selected_memory"] = memory
+                                        st.session_state["current_page"] = "🔄 Relationships"
+                    else:
+                        st.info("No memories found matching your search query.")
                 else:
-                    st.info("No memories found matching your search query.")
-            else:
-                st.info("No memories found. Start by creating some memories!")
-
-# Ask MemoBrain Tab
-elif page == "💬 Ask MemoBrain":
-    st.title("💬 Ask MemoBrain")
-    st.markdown("Ask any question. MemoBrain will answer based on your uploaded memory.")
-
-    # Initialize chat history
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
-
-    # Display chat history
-    for msg in st.session_state.chat_history:
-        with st.chat_message(msg["role"]):
-            st.markdown(msg["content"])
-
-    # Chat input
-    prompt = st.chat_input("Ask a question about your memories...")
-    if prompt:
-        # Add user message to chat
-        st.chat_message("user").markdown(prompt)
-        st.session_state.chat_history.append({"role": "user", "content": prompt})
-
-        # Retrieve relevant chunks
-        with st.spinner("Searching your memories..."):
-            try:
-                top_chunks = retrieve_relevant_chunks(prompt, user_id=user_id, top_k=5)
-                # if not top_chunks:
-                #     st.warning("No relevant memories found. Try uploading more files or rephrasing your question.")
-                #     st.session_state.chat_history.append({
-                #         "role": "assistant", 
-                #         "content": "I couldn't find any relevant information in your memories. Try uploading more files or rephrasing your question."
-                #     })
-                #     st.rerun()
+                    st.info("No memories found. Start by creating some memories!")
+
+    # Ask MemoBrain Tab
+    elif page == "💬 Ask MemoBrain":
+        from core.llm_client import chat
+        from core.retriever import retrieve_relevant_chunks
+        from core.context_formatter import format_context_with_metadata
+
+        st.title("💬 Ask MemoBrain")
+        st.markdown("Ask any question. MemoBrain will answer based on your uploaded memory.")
+
+        # Initialize chat history
+        if "chat_history" not in st.session_state:
+            st.session_state.chat_history = []
+
+        # Display chat history
+        for msg in st.session_state.chat_history:
+            with st.chat_message(msg["role"]):
+                st.markdown(msg["content"])
+
+        # Chat input
+        prompt = st.chat_input("Ask a question about your memories...")
+        if prompt:
+            # Add user message to chat
+            st.chat_message("user").markdown(prompt)
+            st.session_state.chat_history.append({"role": "user", "content": prompt})
+
+            # Retrieve relevant chunks
+            with st.spinner("Searching your memories..."):
+                try:
+                    # Diversify so overlapping chunks and summaries don't crowd out other sources,
+                    # and bring in memories directly related to the ones found
+                    top_chunks = retrieve_relevant_chunks(prompt, user_id=user_id, top_k=5, mmr=True, max_per_doc=2,
+                                                          expand_hops=1, expand_k=2)
+                    # if not top_chunks:
+                    #     st.warning("No relevant memories found. Try uploading more files or rephrasing your question.")
+                    #     st.session_state.chat_history.append({
+                    #         "role": "assistant", 
+                    #         "content": "I couldn't find any relevant information in your memories. Try uploading more files or rephrasing your question."
+                    #     })
+                    #     st.rerun()
                     
-                context = format_context_with_metadata(top_chunks)
-
-                # Generate response
-                system_prompt = (
-                    "You are MemoBrain — a calm, helpful memory assistant. "
-                    "You should summarize clearly, reference file titles and dates when available, and admit when unsure."
-                )
-
-                response = openai.chat.completions.create(
-                    model="gpt-4",
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": f"Context:\n{context}\n\nQuestion:\n{prompt}"}
-                    ]
-                )
-
-                reply = response.choices[0].message.content.strip()
-                st.chat_message("assistant").markdown(reply)
-                st.session_state.chat_history.append({"role": "assistant", "content": reply})
-            except Exception as e:
-                error_message = f"Error processing your question: {str(e)}"
-                st.error(error_message)
-                st.session_state.chat_history.append({"role": "assistant", "content": error_message})
-
-    # Reset conversation button
-    if st.button("🔁 Reset Conversation"):
-        st.session_state.chat_history = []
-        st.rerun()
+                    context = format_context_with_metadata(top_chunks)
+
+                    # Generate response
+                    system_prompt = (
+                        "You are MemoBrain — a calm, helpful memory assistant. "
+                        "You should summarize clearly, reference file titles and dates when available, and admit when unsure."
+                    )
+
+                    with span("llm_chat"):
+                        response = chat(
+                            model="gpt-4",
+                            messages=[
+                                {"role": "system", "content": system_prompt},
+                                {"role": "user", "content": f"Context:\n{context}\n\nQuestion:\n{prompt}"}
+                            ]
+                        )
+
+                    reply = response.choices[0].message.content.strip()
+                    st.chat_message("assistant").markdown(reply)
+                    st.session_state.chat_history.append({"role": "assistant", "content": reply})
+                except Exception as e:
+                    error_message = f"Error processing your question: {str(e)}"
+                    st.error(error_message)
+                    st.session_state.chat_history.append({"role": "assistant", "content": error_message})
+
+        # Reset conversation button
+        if st.button("🔁 Reset Conversation"):
+            st.session_state.chat_history = []
+            st.rerun()
+finally:
+    # Profiler summary for this session (no-op unless profiling is switched on)
+    end_rerun(user_id, page)
+render_profile_panel()
@@ -1,13 +1,15 @@
 import streamlit as st
-import base64
 from datetime import datetime
+from functools import partial
+import mimetypes
 import os
-import json
-import tempfile
-import shutil
 from ui.styles import CARD_BG, TEXT_COLOR, TAG_COLOR, PADDING, RADIUS, BORDER
-from core.user_paths import get_memory_index_path
+from core.commit_queue import load_memory_index, remove_memory_entries
+from core.thumbnails import get_thumbnail, remove_thumbnail
+from core.preview import remove_preview_cache
+from ui.file_preview import render_file_preview
 from typing import Dict, Any
+from ui.profiler import read_bytes
 import logging
 
 # Setup logging
@@ -64,6 +66,11 @@ def render_file_card(entry: Dict[str, Any], user_id: str):
             unsafe_allow_html=True
         )
         
+        # Thumbnail; the original is only read when the preview is opened
+        thumbnail = get_thumbnail(user_id, entry)
+        if thumbnail:
+            st.image(thumbnail, width="stretch")
+        
         # Tags and category
         tags = entry.get('tags', [])
         if tags:
@@ -94,8 +101,8 @@ def render_file_card(entry: Dict[str, Any], user_id: str):
         col1, col2, col3 = st.columns(3)
         
         # Generate a unique identifier for this entry
-        # Use a more stable identifier based on hash and filename
-        entry_id = hash(f"{entry.get('source_hash', '')}-{entry.get('filename', '')}")
+        # Prefer the memory id: the same file can be uploaded more than once
+        entry_id = entry.get("id") or hash(f"{entry.get('source_hash', '')}-{entry.get('filename', '')}")
         
         # Preview button
         with col1:
@@ -126,14 +133,15 @@ def render_file_card(entry: Dict[str, Any], user_id: str):
         # File download
         with col2:
             if entry.get('filepath') and os.path.exists(entry['filepath']):
-                try:
-                    with open(entry['filepath'], "rb") as f:
-                        data = f.read()
-                    b64 = base64.b64encode(data).decode()
-                    href = f'<a href="data:file/{entry["filetype"]};base64,{b64}" download="{entry["filename"]}" style="text-decoration:none;">⬇️ Download</a>'
-                    st.markdown(href, unsafe_allow_html=True)
-                except Exception as e:
-                    st.error(f"File missing: {str(e)}")
+                # The bytes are only read when the button is clicked
+                st.download_button(
+                    "⬇️ Download",
+                    data=partial(read_bytes, entry['filepath']),
+                    file_name=entry.get("filename", "download"),
+                    mime=mimetypes.guess_type(entry.get("filename", ""))[0] or "application/octet-stream",
+                    key=f"download_{entry_id}",
+                    on_click="ignore"
+                )
 
         # Delete button
         with col3:
@@ -149,29 +157,22 @@ def render_file_card(entry: Dict[str, Any], user_id: str):
                         "filepath": entry.get("filepath", "")
                     }
                     
-                    # Load memory index
-                    memory_path = get_memory_index_path(user_id)
-                    if os.path.exists(memory_path):
-                        with open(memory_path, "r") as f:
-                            memory = json.load(f)
-                            
-                        # Filter out the entry to delete using multiple identifiers
-                        # This ensures we only delete the exact file we want
-                        memory = [m for m in memory if not (
-                            m.get("source_hash", "") == file_to_delete["source_hash"] and 
-                            m.get("filename", "") == file_to_delete["filename"]
-                        )]
-                        
-                        # Write with atomic pattern
-                        with tempfile.NamedTemporaryFile(mode='w', delete=False) as tmp_file:
-                            json.dump(memory, tmp_file, indent=2)
-                            tmp_path = tmp_file.name
-                        
-                        shutil.move(tmp_path, memory_path)
-                        
+                    # Remove the entry under the user's writer lock, matching on
+                    # multiple identifiers so we only delete the exact file we want
+                    removed = remove_memory_entries(user_id, lambda m: (
+                        m.get("source_hash", "") == file_to_delete["source_hash"] and 
+                        m.get("filename", "") == file_to_delete["filename"]
+                    ))
+                    if removed:
                         # Delete the actual file if it exists
                         if file_to_delete["filepath"] and os.path.exists(file_to_delete["filepath"]):
                             os.remove(file_to_delete["filepath"])
+
+                        # Thumbnails and preview pages are shared by content hash
+                        source_hash = file_to_delete["source_hash"]
+                        if not any(m.get("source_hash") == source_hash for m in load_memory_index(user_id)):
+                            remove_thumbnail(user_id, source_hash)
+                            remove_preview_cache(user_id, source_hash)
                             
                         st.success(f"File '{file_to_delete['filename']}' deleted successfully!")
                         # Add logging for debugging
@@ -189,11 +190,16 @@ def render_file_card(entry: Dict[str, Any], user_id: str):
             
             if preview_type == 'image' and entry.get('filepath') and os.path.exists(entry.get('filepath', '')):
                 try:
-                    with open(entry.get('filepath'), "rb") as f:
-                        image_data = f.read()
+                    image_data = read_bytes(entry.get('filepath'))
                     st.image(image_data, caption=entry.get('title', entry.get('filename', 'Image')))
                 except Exception as e:
                     st.error(f"Error loading image: {str(e)}")
+            elif preview_type == 'text' and entry.get('filepath') and os.path.exists(entry.get('filepath', '')):
+                # Paged preview of the stored file, one page read at a time
+                render_file_preview(
+                    entry['filepath'], entry.get('filetype', ''),
+                    user_id=user_id, source_hash=entry.get('source_hash'), key=f"card_preview_{entry_id}"
+                )
             elif preview_type == 'text' and entry.get('text_preview'):
                 st.text_area("Content", value=entry.get('text_preview', ''), height=200, disabled=True)
             else:
@@ -2,27 +2,53 @@ import streamlit as st
 import os
 from PIL import Image
 import io
+from functools import partial
 from pathlib import Path
 import logging
 from typing import Optional
+from core.preview import pdf_page_count, read_pdf_page, read_text_page, text_page_count
+from ui.profiler import read_bytes
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def render_file_preview(file_path: str, file_type: str, title: Optional[str] = None):
+def _page_selector(page_count: int, key: str) -> int:
+    """Render a page picker for a paged preview and return the zero-based page."""
+    if page_count <= 1:
+        return 0
+    page = st.number_input(
+        f"Page (of {page_count})",
+        min_value=1,
+        max_value=page_count,
+        value=1,
+        step=1,
+        key=f"{key}_page"
+    )
+    return int(page) - 1
+
+def render_file_preview(file_path: str, file_type: str, title: Optional[str] = None,
+                        user_id: Optional[str] = None, source_hash: Optional[str] = None,
+                        key: Optional[str] = None):
     """Render a preview of a file based on its type.
     
+    Text files and PDFs are shown one page at a time, so only the page on
+    screen is read from disk.
+    
     Args:
         file_path: Path to the file
         file_type: Type of file (pdf, txt, png, jpg, etc.)
         title: Optional title to display
+        user_id: User identifier, enables the PDF page text cache
+        source_hash: Content hash of the file, enables the PDF page text cache
+        key: Widget key prefix, needed when several previews are on one page
     """
     if not os.path.exists(file_path):
         st.error("File not found.")
         return
         
     file_type = file_type.lower()
+    key = key or f"file_preview_{source_hash or file_path}"
     
     # Display title if provided
     if title:
@@ -47,34 +73,34 @@ def render_file_preview(file_path: str, file_type: str, title: Optional[str] = N
         
         # Text file preview
         elif file_type == "txt":
-            with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read()
-            st.text_area("File Content", value=content, height=400)
+            page_count = text_page_count(file_path)
+            page = _page_selector(page_count, key)
+            content = read_text_page(file_path, page)
+            st.text_area("File Content", value=content, height=400, key=f"{key}_text_{page}")
             
-            # Display text statistics
-            word_count = len(content.split())
-            line_count = len(content.splitlines())
-            st.write(f"Word count: {word_count}, Line count: {line_count}")
+            file_size = os.path.getsize(file_path)
+            st.write(f"File size: {file_size / 1024:.1f} KB, page {page + 1} of {page_count}")
         
         # PDF preview
         elif file_type == "pdf":
             # Display PDF info
             file_size = os.path.getsize(file_path)
-            st.write(f"PDF file size: {file_size / 1024:.1f} KB")
+            page_count = pdf_page_count(file_path)
+            st.write(f"PDF file size: {file_size / 1024:.1f} KB, {page_count} pages")
             
-            # Extract text preview
-            from core.preprocess import extract_pdf_text
-            text_preview = extract_pdf_text(Path(file_path))[:1000] + "..."
-            st.text_area("PDF Content Preview", value=text_preview, height=300)
+            # Extract only the page being shown
+            page = _page_selector(page_count, key)
+            text_preview = read_pdf_page(file_path, page, user_id, source_hash) if page_count else ""
+            st.text_area("PDF Content Preview", value=text_preview, height=300, key=f"{key}_text_{page}")
             
-            # Provide download link
-            with open(file_path, "rb") as f:
-                pdf_bytes = f.read()
+            # The bytes are only read when the button is clicked
             st.download_button(
                 label="Download PDF",
-                data=pdf_bytes,
+                data=partial(read_bytes, file_path),
                 file_name=Path(file_path).name,
-                mime="application/pdf"
+                mime="application/pdf",
+                key=f"{key}_download",
+                on_click="ignore"
             )
         
         # Unsupported file type
@@ -83,4 +109,4 @@ def render_file_preview(file_path: str, file_type: str, title: Optional[str] = N
             
     except Exception as e:
         logger.error(f"Error rendering file preview: {str(e)}")
-        st.error(f"Error previewing file: {str(e)}")
\ No newline at end of file
+        st.error(f"Error previewing file: {str(e)}")
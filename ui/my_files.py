@@ -1,9 +1,12 @@
 import streamlit as st
+import os
 import json
+import math
 from datetime import datetime
 from core.user_paths import get_memory_index_path
 from ui.file_cards import render_file_card
 from ui.styles import CSS_VARIABLES
+from ui.profiler import profiled, load_json
 from typing import List, Dict, Any, Optional
 import logging
 
@@ -11,6 +14,10 @@ import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+PAGE_SIZE_OPTIONS = [12, 24, 48, 96]
+DEFAULT_PAGE_SIZE = int(os.getenv("MEMOBRAIN_FILES_PAGE_SIZE", "24"))
+
+@profiled()
 def render_my_files_tab(user_id: str):
     """Render the My Files tab with filtering and sorting options.
     
@@ -27,12 +34,11 @@ def render_my_files_tab(user_id: str):
 
     # Load memory index with error handling
     try:
-        with open(memory_index_path, "r") as f:
-            try:
-                memory = json.load(f)
-            except json.JSONDecodeError:
-                st.error("Corrupted memory index. Please contact support.")
-                return
+        try:
+            memory = load_json(memory_index_path)
+        except json.JSONDecodeError:
+            st.error("Corrupted memory index. Please contact support.")
+            return
     except Exception as e:
         st.error(f"Error loading files: {str(e)}")
         return
@@ -109,15 +115,39 @@ def render_my_files_tab(user_id: str):
     elif sort_by == "File Size (Smallest First)":
         filtered_memory.sort(key=lambda x: x.get("file_size", 0))
 
-    # Display results count
-    st.write(f"Showing {len(filtered_memory)} of {len(memory)} files")
-    
     if not filtered_memory:
+        st.write(f"Showing 0 of {len(memory)} files")
         st.warning("No results found matching your filters.")
-    else:
-        # Display files in a grid layout
-        cols = st.columns(3)
-        for i, item in enumerate(filtered_memory):
-            with cols[i % 3]:
-                render_file_card(item, user_id)
+        return
+
+    # Pagination: only one page of cards is rendered per rerun
+    page_sizes = sorted(set(PAGE_SIZE_OPTIONS + [DEFAULT_PAGE_SIZE]))
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        page_size = st.selectbox("Files per page", page_sizes,
+                                 index=page_sizes.index(DEFAULT_PAGE_SIZE), key="page_my_files_page_size")
+    total_pages = max(1, math.ceil(len(filtered_memory) / page_size))
+
+    # Go back to the first page whenever the result set changes
+    view = (selected_category, selected_filetype, search_text, sort_by, page_size)
+    if st.session_state.get("page_my_files_view") != view:
+        st.session_state["page_my_files_view"] = view
+        st.session_state["page_my_files_page"] = 1
+    elif st.session_state.get("page_my_files_page", 1) > total_pages:
+        st.session_state["page_my_files_page"] = total_pages
+
+    with col2:
+        page = st.number_input("Page", min_value=1, max_value=total_pages, step=1, key="page_my_files_page")
+    start = (page - 1) * page_size
+    page_items = filtered_memory[start:start + page_size]
+    with col3:
+        # Display results count
+        st.write(f"Showing {start + 1}–{start + len(page_items)} of {len(filtered_memory)} matching "
+                 f"({len(memory)} files total) • Page {page} of {total_pages}")
+
+    # Display files in a grid layout
+    cols = st.columns(3)
+    for i, item in enumerate(page_items):
+        with cols[i % 3]:
+            render_file_card(item, user_id)
 
@@ -0,0 +1,245 @@
+import streamlit as st
+import os
+import json
+import time
+import cProfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+import logging
+from core.metrics import observe
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# MEMOBRAIN_PROFILE=1 turns on rerun profiling, MEMOBRAIN_PROFILE_PSTATS=1 also
+# dumps a cProfile stats file for every rerun
+PROFILE_ENV_ENABLED = os.getenv("MEMOBRAIN_PROFILE", "").lower() in ("1", "true", "yes")
+PSTATS_ENV_ENABLED = os.getenv("MEMOBRAIN_PROFILE_PSTATS", "").lower() in ("1", "true", "yes")
+PROFILE_DIR = Path("data/profiles")
+HISTORY_SIZE = 20
+
+# Streamlit runs every session's script in its own thread, so the active
+# rerun profile is tracked per thread
+_local = threading.local()
+
+
+class RerunProfile:
+    """Timings and I/O counters collected during one script rerun."""
+
+    def __init__(self, use_cprofile: bool):
+        self.page = ""
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.total_seconds = 0.0
+        self.sections: Dict[str, float] = {}
+        self.bytes_read = 0
+        self.files_read = 0
+        self.json_parse_seconds = 0.0
+        self.pstats_path: Optional[str] = None
+        self.cprofile = cProfile.Profile() if use_cprofile else None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "page": self.page,
+            "started_at": self.started_at.isoformat(),
+            "total_ms": self.total_seconds * 1000,
+            "sections_ms": {k: v * 1000 for k, v in self.sections.items()},
+            "bytes_read": self.bytes_read,
+            "files_read": self.files_read,
+            "json_parse_ms": self.json_parse_seconds * 1000,
+            "pstats_path": self.pstats_path
+        }
+
+
+def profiling_enabled() -> bool:
+    """Return True if rerun profiling is on for this session."""
+    return PROFILE_ENV_ENABLED or st.session_state.get("profile_reruns", False)
+
+
+def _current() -> Optional[RerunProfile]:
+    return getattr(_local, "profile", None)
+
+
+def begin_rerun() -> None:
+    """Start profiling the current script run if profiling is enabled."""
+    # A run that died before end_rerun leaves its profiler enabled on this
+    # thread, and enabling another one would fail
+    stale = _current()
+    if stale is not None and stale.cprofile is not None:
+        stale.cprofile.disable()
+    _local.profile = None
+    if not profiling_enabled():
+        return
+    use_cprofile = PSTATS_ENV_ENABLED or st.session_state.get("profile_pstats", False)
+    profile = RerunProfile(use_cprofile)
+    if profile.cprofile is not None:
+        try:
+            profile.cprofile.enable()
+        except ValueError:
+            # Another profiler is already active in this thread
+            profile.cprofile = None
+    _local.profile = profile
+
+
+def end_rerun(user_id: Optional[str] = None, page: str = "") -> None:
+    """Finish the current profile and append it to the session history.
+
+    Args:
+        user_id: User identifier, used to file pstats dumps per user
+        page: Page that was rendered
+    """
+    profile = _current()
+    if profile is None:
+        return
+    _local.profile = None
+    profile.page = page
+    profile.total_seconds = time.perf_counter() - profile.start
+
+    if profile.cprofile is not None:
+        profile.cprofile.disable()
+        try:
+            out_dir = PROFILE_DIR / (user_id or "anonymous")
+            out_dir.mkdir(parents=True, exist_ok=True)
+            out_path = out_dir / f"rerun_{profile.started_at.strftime('%Y%m%d_%H%M%S_%f')}.pstats"
+            profile.cprofile.dump_stats(str(out_path))
+            profile.pstats_path = str(out_path)
+        except Exception as e:
+            logger.error(f"Error writing rerun profile: {str(e)}")
+
+    observe(profile.page or "rerun", profile.total_seconds, name="rerun_duration_seconds")
+    history = st.session_state.setdefault("profiler_history", [])
+    history.append(profile.to_dict())
+    del history[:-HISTORY_SIZE]
+
+
+@contextmanager
+def profile_section(name: str):
+    """Time a block of the current rerun under the given name.
+
+    Args:
+        name: Section name
+    """
+    profile = _current()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        profile.sections[name] = profile.sections.get(name, 0.0) + elapsed
+        observe(name, elapsed, name="render_duration_seconds")
+
+
+def profiled(name: Optional[str] = None):
+    """Decorator recording a render function's wall time in the rerun profile.
+
+    Args:
+        name: Section name, defaults to the function name
+    """
+    def decorator(func):
+        section = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current() is None:
+                return func(*args, **kwargs)
+            with profile_section(section):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_read(num_bytes: int, parse_seconds: float = 0.0) -> None:
+    """Account bytes read from disk (and JSON parse time) to the current rerun.
+
+    Args:
+        num_bytes: Bytes read
+        parse_seconds: Time spent parsing them
+    """
+    profile = _current()
+    if profile is None:
+        return
+    profile.bytes_read += num_bytes
+    profile.files_read += 1
+    profile.json_parse_seconds += parse_seconds
+
+
+def load_json(path: Union[str, Path]) -> Any:
+    """Read and parse a JSON file, accounting the I/O to the current rerun.
+
+    Raises the same exceptions as json.load.
+
+    Args:
+        path: JSON file path
+
+    Returns:
+        Parsed JSON value
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    start = time.perf_counter()
+    value = json.loads(data)
+    record_read(len(data), time.perf_counter() - start)
+    return value
+
+
+def read_bytes(path: Union[str, Path]) -> bytes:
+    """Read a whole file, accounting the I/O to the current rerun.
+
+    Args:
+        path: File path
+
+    Returns:
+        File contents
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    record_read(len(data))
+    return data
+
+
+def _format_bytes(num_bytes: int) -> str:
+    if num_bytes < 1024 * 1024:
+        return f"{num_bytes / 1024:.1f} KB"
+    return f"{num_bytes / (1024 * 1024):.1f} MB"
+
+
+def render_profile_panel() -> None:
+    """Render the profiler toggle and a summary of recent reruns in the sidebar."""
+    with st.sidebar.expander("⏱️ Performance Profiler"):
+        st.checkbox("Profile reruns", key="profile_reruns", value=PROFILE_ENV_ENABLED)
+        st.checkbox("Dump cProfile stats per rerun", key="profile_pstats", value=PSTATS_ENV_ENABLED)
+
+        history = st.session_state.get("profiler_history", [])
+        if not history:
+            st.caption("No reruns profiled yet.")
+            return
+
+        last = history[-1]
+        st.markdown(f"**Last rerun** ({last['page'] or 'unknown page'}): {last['total_ms']:.0f} ms")
+        st.markdown(
+            f"Disk reads: {last['files_read']} files, {_format_bytes(last['bytes_read'])} • "
+            f"JSON parse: {last['json_parse_ms']:.1f} ms"
+        )
+        for section, ms in sorted(last["sections_ms"].items(), key=lambda x: x[1], reverse=True):
+            st.markdown(f"- `{section}`: {ms:.1f} ms")
+        if last.get("pstats_path"):
+            st.caption(f"cProfile stats: {last['pstats_path']}")
+
+        st.markdown("**Recent reruns**")
+        st.dataframe(
+            [{
+                "page": h["page"],
+                "total_ms": round(h["total_ms"], 1),
+                "json_parse_ms": round(h["json_parse_ms"], 1),
+                "bytes_read": h["bytes_read"]
+            } for h in reversed(history)],
+            use_container_width=True
+        )
@@ -1,42 +1,18 @@
 import streamlit as st
-import json
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
-import networkx as nx
 import plotly.graph_objects as go
 from core.user_paths import get_memory_index_path
+from core.graph_index import load_graph_index, load_layout
+from core.edge_store import load_edge_store
 from core.memory_handler import (
     update_memory_access,
     add_memory_relationship,
     MemoryImportance
 )
+from ui.profiler import profiled
 
-def create_relationship_graph(memories: List[Dict[str, Any]]) -> nx.Graph:
-    """Create a NetworkX graph from memory relationships."""
-    G = nx.Graph()
-    
-    # Add nodes
-    for memory in memories:
-        G.add_node(
-            memory["id"],
-            title=memory.get("title", "Untitled"),
-            category=memory.get("category", "uncategorized"),
-            importance=memory.get("importance", 3)
-        )
-    
-    # Add edges
-    for memory in memories:
-        for rel in memory.get("relationships", []):
-            G.add_edge(
-                memory["id"],
-                rel["target_id"],
-                type=rel["type"],
-                description=rel.get("description", "")
-            )
-    
-    return G
-
+@profiled()
 def render_relationships_view(user_id: str):
     """Render the relationships view of memories."""
     # Initialize page state
@@ -56,13 +32,11 @@ def render_relationships_view(user_id: str):
         st.info("No memories found. Start by creating some memories!")
         return
     
-    with open(memory_path, "r") as f:
-        memories = json.load(f)
-    
-    # Create relationship graph
-    G = create_relationship_graph(memories)
+    # Titles come from the graph index and edges from the edge store, not the memory index
+    graph = load_graph_index(user_id)
+    edge_store = load_edge_store(user_id)
     
-    if not G.nodes():
+    if not graph.nodes:
         st.info("No memories found to create relationships.")
         return
     
@@ -74,7 +48,7 @@ def render_relationships_view(user_id: str):
         # Source memory selection
         source_memory = st.selectbox(
             "Source Memory",
-            options=[(m["id"], m.get("title", "Untitled")) for m in memories],
+            options=[(memory_id, node["title"]) for memory_id, node in graph.nodes.items()],
             format_func=lambda x: x[1],
             key="source_memory"
         )
@@ -85,7 +59,8 @@ def render_relationships_view(user_id: str):
         # Target memory selection
         target_memory = st.selectbox(
             "Target Memory",
-            options=[(m["id"], m.get("title", "Untitled")) for m in memories if m["id"] != source_memory[0]],
+            options=[(memory_id, node["title"]) for memory_id, node in graph.nodes.items()
+                     if memory_id != source_memory[0]],
             format_func=lambda x: x[1],
             key="target_memory"
         )
@@ -124,20 +99,20 @@ def render_relationships_view(user_id: str):
     # Visualize relationships
     st.markdown("### Relationship Graph")
     
-    if G.edges():
-        # Create a Plotly figure
-        pos = nx.spring_layout(G)
+    if any(True for _ in graph.iter_edges(edge_store)):
+        # Layouts are cached per graph version and updated incrementally
+        pos = load_layout(user_id, graph, edge_store)
         
         # Create edge trace
         edge_x = []
         edge_y = []
         edge_text = []
-        for edge in G.edges(data=True):
-            x0, y0 = pos[edge[0]]
-            x1, y1 = pos[edge[1]]
+        for rel in graph.iter_edges(edge_store):
+            x0, y0 = pos[rel["source_id"]]
+            x1, y1 = pos[rel["target_id"]]
             edge_x.extend([x0, x1, None])
             edge_y.extend([y0, y1, None])
-            edge_text.append(edge[2].get("type", ""))
+            edge_text.append(rel.get("type", ""))
         
         edge_trace = go.Scatter(
             x=edge_x, y=edge_y,
@@ -151,13 +126,13 @@ def render_relationships_view(user_id: str):
         node_y = []
         node_text = []
         node_color = []
-        for node in G.nodes(data=True):
-            x, y = pos[node[0]]
+        for memory_id, node in graph.nodes.items():
+            x, y = pos[memory_id]
             node_x.append(x)
             node_y.append(y)
-            node_text.append(f"{node[1]['title']} ({node[1]['category']})")
+            node_text.append(f"{node['title']} ({node['category']})")
             # Color nodes by importance
-            importance = node[1].get("importance", 3)
+            importance = node.get("importance", 3)
             node_color.append({
                 5: "#dc3545",  # Critical
                 4: "#fd7e14",  # High
@@ -196,12 +171,12 @@ def render_relationships_view(user_id: str):
         
         # Show relationship details
         st.markdown("### Relationship Details")
-        for memory in memories:
-            if memory.get("relationships"):
-                with st.expander(f"Relationships for: {memory.get('title', 'Untitled')}"):
-                    for rel in memory["relationships"]:
+        for source_id in list(edge_store.forward):
+            if source_id in graph.nodes:
+                with st.expander(f"Relationships for: {graph.title(source_id)}"):
+                    for rel in edge_store.out_edges(source_id):
                         # Find target memory
-                        target = next((m for m in memories if m["id"] == rel["target_id"]), None)
+                        target = graph.nodes.get(rel["target_id"])
                         if target:
                             st.markdown(f"""
                                 <div style="
@@ -216,5 +191,10 @@ def render_relationships_view(user_id: str):
                                     <p><strong>Created:</strong> {datetime.fromisoformat(rel['created_at']).strftime('%Y-%m-%d %H:%M')}</p>
                                 </div>
                             """, unsafe_allow_html=True)
+                    # Incoming edges come from the reverse adjacency, without a scan
+                    referenced_by = [graph.title(rel["source_id"]) for rel in edge_store.in_edges(source_id)
+                                     if rel["source_id"] in graph.nodes]
+                    if referenced_by:
+                        st.markdown(f"**Referenced by:** {', '.join(referenced_by)}")
     else:
         st.info("No relationships found. Create some relationships between memories to see them here!") 
\ No newline at end of file
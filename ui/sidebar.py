@@ -1,11 +1,12 @@
 import streamlit as st
 from typing import Optional
-import json
 from pathlib import Path
-from datetime import datetime, timedelta
-from core.user_paths import get_memory_index_path
+from datetime import datetime
+from core.memory_stats import load_stats, recent_activity
 from streamlit_option_menu import option_menu
+from ui.profiler import profiled
 
+@profiled()
 def render_sidebar(user_id: str):
     """Render the enhanced sidebar with OS-like navigation and features."""
     
@@ -162,15 +163,10 @@ def render_sidebar(user_id: str):
         # Memory insights with enhanced styling
         st.markdown('<div class="section-header">📊 Memory Insights</div>', unsafe_allow_html=True)
         st.markdown('<div style="color:#a0a0a0; font-size:0.95rem; margin-bottom:0.5rem;">Track your memory usage and recent activity (last 7 days).</div>', unsafe_allow_html=True)
-        memory_path = get_memory_index_path(user_id)
-        if memory_path.exists():
-            with open(memory_path, "r") as f:
-                memories = json.load(f)
-            
-            total_memories = len(memories)
-            recent_memories = sum(1 for m in memories 
-                                if datetime.fromisoformat(m.get("temporal_metadata", {}).get("last_accessed", "2000-01-01")) 
-                                > datetime.now() - timedelta(days=7))
+        stats = load_stats(user_id)
+        if stats["total_memories"]:
+            total_memories = stats["total_memories"]
+            recent_memories = recent_activity(stats, days=7)
             
             # Display metrics with enhanced styling
             st.markdown(f"""
@@ -185,10 +181,7 @@ def render_sidebar(user_id: str):
             """, unsafe_allow_html=True)
             
             # Memory categories with enhanced styling
-            categories = {}
-            for memory in memories:
-                cat = memory.get("category", "uncategorized")
-                categories[cat] = categories.get(cat, 0) + 1
+            categories = stats["categories"]
             
             st.markdown('<div class="section-header">Categories</div>', unsafe_allow_html=True)
             st.markdown('<div style="color:#a0a0a0; font-size:0.95rem; margin-bottom:0.5rem;">Distribution of your memories by category.</div>', unsafe_allow_html=True)
@@ -206,13 +199,8 @@ def render_sidebar(user_id: str):
         # Quick filters with enhanced styling
         st.markdown('<div class="section-header">🔍 Quick Filters</div>', unsafe_allow_html=True)
         st.markdown('<div style="color:#a0a0a0; font-size:0.95rem; margin-bottom:0.5rem;">Filter your memories by tags or importance.</div>', unsafe_allow_html=True)
-        if memory_path.exists():
-            with open(memory_path, "r") as f:
-                memories = json.load(f)
-            
-            all_tags = set()
-            for memory in memories:
-                all_tags.update(memory.get("tags", []))
+        if stats["total_memories"]:
+            all_tags = set(stats["tags"])
             
             if all_tags:
                 selected_tags = st.multiselect(
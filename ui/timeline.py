@@ -1,11 +1,19 @@
 import streamlit as st
-import json
+import os
+import math
+from collections import Counter
 from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any
 from core.user_paths import get_memory_index_path
 from core.memory_handler import update_memory_access, MemoryImportance
+from core.thumbnails import get_thumbnail
+from core.time_index import day_date, epoch_day, load_time_index
+from ui.profiler import profiled
 
+TIMELINE_PAGE_SIZE = int(os.getenv("MEMOBRAIN_TIMELINE_PAGE_SIZE", "50"))
+
+@profiled()
 def render_timeline_view(user_id: str):
     """Render the timeline view of memories."""
     # Initialize page state
@@ -18,20 +26,14 @@ def render_timeline_view(user_id: str):
     
     st.title("📅 Memory Timeline")
     
-    # Load memories
+    # The time index carries the fields shown for each memory, so the memory
+    # index itself is never read here
     memory_path = get_memory_index_path(user_id)
     if not memory_path.exists():
         st.info("No memories found. Start by creating some memories!")
         return
     
-    with open(memory_path, "r") as f:
-        memories = json.load(f)
-    
-    # Sort memories by creation date
-    memories.sort(
-        key=lambda x: x.get("temporal_metadata", {}).get("created_at", "2000-01-01"),
-        reverse=True
-    )
+    time_index = load_time_index(user_id)
     
     # Timeline filters
     col1, col2, col3 = st.columns(3)
@@ -46,7 +48,7 @@ def render_timeline_view(user_id: str):
     with col2:
         selected_categories = st.multiselect(
             "Categories",
-            options=sorted(set(m.get("category", "uncategorized") for m in memories)),
+            options=sorted(set(time_index.categories)),
             default=st.session_state["timeline_state"]["selected_categories"],
             key="timeline_categories"
         )
@@ -61,49 +63,57 @@ def render_timeline_view(user_id: str):
         )
         st.session_state["timeline_state"]["selected_importance"] = selected_importance
     
-    # Filter memories
-    filtered_memories = memories
+    # Filter memories: the date range is two bisections of the time index
+    start_date = end_date = None
     if date_range:
-        start_date, end_date = date_range
-        filtered_memories = [
-            m for m in filtered_memories
-            if start_date <= datetime.fromisoformat(
-                m.get("temporal_metadata", {}).get("created_at", "2000-01-01")
-            ).date() <= end_date
-        ]
-    
-    if selected_categories:
-        filtered_memories = [
-            m for m in filtered_memories
-            if m.get("category", "uncategorized") in selected_categories
-        ]
-    
-    if selected_importance:
-        filtered_memories = [
-            m for m in filtered_memories
-            if MemoryImportance(m.get("importance", 3)).name in selected_importance
-        ]
+        # While a range is being picked only its start is set
+        start_date, end_date = (date_range[0], date_range[-1]) if isinstance(date_range, (list, tuple)) else (date_range, date_range)
+    positions = time_index.query(
+        start_date,
+        end_date,
+        categories=selected_categories,
+        importance=[MemoryImportance[name].value for name in selected_importance]
+    )
     
     # Render timeline
-    if not filtered_memories:
+    if not positions:
         st.info("No memories found matching the selected filters.")
         return
     
-    # Group memories by date
+    # Pagination: only one page of memories is rendered per rerun
+    total_pages = max(1, math.ceil(len(positions) / TIMELINE_PAGE_SIZE))
+    view = (start_date, end_date, tuple(selected_categories), tuple(selected_importance))
+    if st.session_state.get("timeline_view") != view:
+        st.session_state["timeline_view"] = view
+        st.session_state["timeline_page"] = 1
+    elif st.session_state.get("timeline_page", 1) > total_pages:
+        st.session_state["timeline_page"] = total_pages
+    
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        page = st.number_input("Page", min_value=1, max_value=total_pages, step=1, key="timeline_page")
+    start = (int(page) - 1) * TIMELINE_PAGE_SIZE
+    page_positions = positions[start:start + TIMELINE_PAGE_SIZE]
+    with col2:
+        st.markdown(
+            f"Showing {start + 1}–{start + len(page_positions)} of {len(positions)} memories "
+            f"• Page {int(page)} of {total_pages}"
+        )
+    
+    # Day totals for the headers, counted over every match
+    day_counts = Counter(epoch_day(time_index.epochs[p]) for p in positions)
+    
+    # Group the page's memories by date bucket
     memories_by_date = {}
-    for memory in filtered_memories:
-        date = datetime.fromisoformat(
-            memory.get("temporal_metadata", {}).get("created_at", "2000-01-01")
-        ).date()
-        if date not in memories_by_date:
-            memories_by_date[date] = []
-        memories_by_date[date].append(memory)
+    for p in page_positions:
+        memories_by_date.setdefault(epoch_day(time_index.epochs[p]), []).append(time_index.display[p])
     
     # Render timeline entries
-    for date in sorted(memories_by_date.keys(), reverse=True):
-        st.markdown(f"### {date.strftime('%B %d, %Y')}")
+    for day in sorted(memories_by_date.keys(), reverse=True):
+        count = day_counts[day]
+        st.markdown(f"### {day_date(day).strftime('%B %d, %Y')} ({count} {'memory' if count == 1 else 'memories'})")
         
-        for memory in memories_by_date[date]:
+        for memory in memories_by_date[day]:
             # Create a unique key for each memory
             memory_key = f"memory_{memory.get('id', '')}"
             
@@ -141,6 +151,10 @@ def render_timeline_view(user_id: str):
                         st.markdown(memory.get("notes"))
                 
                 with col2:
+                    thumbnail = get_thumbnail(user_id, memory)
+                    if thumbnail:
+                        st.image(thumbnail, width="stretch")
+                    
                     # Metadata
                     st.markdown(f"""
                         <div style="